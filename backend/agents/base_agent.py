@@ -1,13 +1,19 @@
 """Base agent class for all agent types."""
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
+from backend.core.config import settings
+from loguru import logger
+import asyncio
 import uuid
 
 
 class BaseAgent(ABC):
     """Abstract base class for all agents."""
 
+    # Sequential LLM round-trips on this agent's critical path
+    SEQUENTIAL_STAGES = 1
+
     def __init__(
         self,
         agent_id: str = None,
@@ -58,3 +64,37 @@ class BaseAgent(ABC):
         """Update agent status."""
         self.status = status
         self.log_activity("status_change", {"new_status": status})
+
+    @property
+    def timeout_seconds(self) -> float:
+        """Time budget for execute(): AGENT_TIMEOUT_SECONDS per sequential stage."""
+        return settings.AGENT_TIMEOUT_SECONDS * self.SEQUENTIAL_STAGES
+
+
+async def run_agents(
+    agents: List[BaseAgent],
+    query: str,
+    context: Dict[str, Any]
+) -> List[Tuple[BaseAgent, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Execute agents concurrently, each under its own timeout.
+
+    A failing or slow agent does not cancel its siblings; it is reported
+    with an error instead so callers can work with partial results.
+
+    Returns:
+        (agent, result, error) tuples in the same order as ``agents``
+    """
+    async def run(agent: BaseAgent):
+        try:
+            result = await asyncio.wait_for(agent.execute(query, context), agent.timeout_seconds)
+            return agent, result, None
+        except asyncio.TimeoutError:
+            agent.update_status("timeout")
+            logger.warning(f"Agent {agent.name} timed out after {agent.timeout_seconds}s")
+            return agent, None, f"Timed out after {agent.timeout_seconds}s"
+        except Exception as e:
+            logger.error(f"Error from agent {agent.name}: {e}")
+            return agent, None, str(e)
+
+    return list(await asyncio.gather(*(run(agent) for agent in agents)))
@@ -1,8 +1,9 @@
 """Orchestrator Agent (Manager) - Top-level coordinator."""
 from typing import Dict, Any, List, Optional
-from backend.agents.base_agent import BaseAgent
+from backend.agents.base_agent import BaseAgent, run_agents
 from backend.agents.super_agent import SuperAgent
 from loguru import logger
+import asyncio
 
 
 class OrchestratorAgent(BaseAgent):
@@ -14,6 +15,9 @@ class OrchestratorAgent(BaseAgent):
     - Makes final decisions
     """
 
+    # Delegation planning runs alongside the super agents, then one aggregation call
+    SEQUENTIAL_STAGES = SuperAgent.SEQUENTIAL_STAGES + 1
+
     def __init__(
         self,
         agent_id: str = None,
@@ -47,8 +51,7 @@ class OrchestratorAgent(BaseAgent):
 
         try:
             # Import gemini service here to avoid circular imports
-            from backend.services.gemini_service import GeminiService
-            gemini_service = GeminiService()
+            from backend.services.gemini_service import gemini_service
 
             # Step 1: Analyze query and plan delegation
             delegation_prompt = f"""
@@ -68,29 +71,34 @@ class OrchestratorAgent(BaseAgent):
             Provide a clear delegation plan.
             """
 
-            delegation_plan = await gemini_service.generate_response(
-                prompt=delegation_prompt,
-                model=self.model,
-                context=context
+            # Step 2: Delegate to super agents concurrently with planning
+            # (the plan only feeds the aggregation step)
+            delegation_plan, super_agent_runs = await asyncio.gather(
+                gemini_service.generate_response(
+                    prompt=delegation_prompt,
+                    model=self.model,
+                    context=context
+                ),
+                run_agents(self.super_agents, query, context)
             )
 
-            # Step 2: Delegate to super agents
             super_agent_responses = []
-            for super_agent in self.super_agents:
-                try:
-                    response = await super_agent.execute(query, context)
-                    super_agent_responses.append({
-                        "agent_id": super_agent.agent_id,
-                        "agent_name": super_agent.name,
-                        "response": response
-                    })
-                except Exception as e:
-                    logger.error(f"Error from Super Agent {super_agent.name}: {e}")
-                    super_agent_responses.append({
-                        "agent_id": super_agent.agent_id,
-                        "agent_name": super_agent.name,
-                        "error": str(e)
-                    })
+            for super_agent, response, error in super_agent_runs:
+                entry = {
+                    "agent_id": super_agent.agent_id,
+                    "agent_name": super_agent.name
+                }
+                if error is None:
+                    entry["response"] = response
+                else:
+                    entry["error"] = error
+                super_agent_responses.append(entry)
+            partial = any(
+                "error" in entry
+                or entry["response"].get("status") != "success"
+                or entry["response"].get("partial", False)
+                for entry in super_agent_responses
+            )
 
             # Step 3: Aggregate responses and formulate final decision
             aggregation_prompt = f"""
@@ -130,7 +138,8 @@ class OrchestratorAgent(BaseAgent):
                 "delegation_plan": delegation_plan,
                 "super_agent_responses": super_agent_responses,
                 "final_response": final_response,
-                "confidence": "high"  # Could be calculated based on agent agreement
+                "partial": partial,
+                "confidence": "medium" if partial else "high"  # Could be calculated based on agent agreement
             }
 
         except Exception as e:
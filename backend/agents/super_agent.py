@@ -1,7 +1,8 @@
 """Super Agent (Team Lead) - Manages utility agents."""
 from typing import Dict, Any, List, Optional
-from backend.agents.base_agent import BaseAgent
+from backend.agents.base_agent import BaseAgent, run_agents
 from loguru import logger
+import asyncio
 
 
 class SuperAgent(BaseAgent):
@@ -13,6 +14,9 @@ class SuperAgent(BaseAgent):
     - Reports to orchestrator
     """
 
+    # Planning runs alongside the utility agents, then one synthesis call
+    SEQUENTIAL_STAGES = 2
+
     def __init__(
         self,
         agent_id: str = None,
@@ -46,8 +50,7 @@ class SuperAgent(BaseAgent):
 
         try:
             # Import gemini service
-            from backend.services.gemini_service import GeminiService
-            gemini_service = GeminiService()
+            from backend.services.gemini_service import gemini_service
 
             # Step 1: Plan subtask distribution
             planning_prompt = f"""
@@ -68,31 +71,33 @@ class SuperAgent(BaseAgent):
             Provide a clear task distribution plan.
             """
 
-            task_plan = await gemini_service.generate_response(
-                prompt=planning_prompt,
-                model=self.model,
-                context=context
+            # Step 2: Execute utility agents concurrently with planning
+            # (the plan only feeds the synthesis step)
+            task_plan, utility_runs = await asyncio.gather(
+                gemini_service.generate_response(
+                    prompt=planning_prompt,
+                    model=self.model,
+                    context=context
+                ),
+                run_agents(self.utility_agents, query, context)
             )
 
-            # Step 2: Execute utility agents
             utility_agent_results = []
-            for utility_agent in self.utility_agents:
-                try:
-                    result = await utility_agent.execute(query, context)
-                    utility_agent_results.append({
-                        "agent_id": utility_agent.agent_id,
-                        "agent_name": utility_agent.name,
-                        "task": utility_agent.task,
-                        "result": result
-                    })
-                except Exception as e:
-                    logger.error(f"Error from Utility Agent {utility_agent.name}: {e}")
-                    utility_agent_results.append({
-                        "agent_id": utility_agent.agent_id,
-                        "agent_name": utility_agent.name,
-                        "task": utility_agent.task,
-                        "error": str(e)
-                    })
+            for utility_agent, result, error in utility_runs:
+                entry = {
+                    "agent_id": utility_agent.agent_id,
+                    "agent_name": utility_agent.name,
+                    "task": utility_agent.task
+                }
+                if error is None:
+                    entry["result"] = result
+                else:
+                    entry["error"] = error
+                utility_agent_results.append(entry)
+            partial = any(
+                "error" in entry or entry["result"].get("status") != "success"
+                for entry in utility_agent_results
+            )
 
             # Step 3: Synthesize utility agent results
             synthesis_prompt = f"""
@@ -131,7 +136,8 @@ class SuperAgent(BaseAgent):
                 "super_agent": self.name,
                 "task_plan": task_plan,
                 "utility_agent_results": utility_agent_results,
-                "synthesis": synthesis
+                "synthesis": synthesis,
+                "partial": partial
             }
 
         except Exception as e:
@@ -13,8 +13,7 @@ async def compare_external_research(query: str, context: Dict[str, Any], model:
     - CSV database of research paper summaries
     """
     try:
-        from backend.services.gemini_service import GeminiService
-        gemini_service = GeminiService()
+        from backend.services.gemini_service import gemini_service
 
         # Load external research from CSV
         research_data = db.read_csv("research/external_papers/sepsis_studies.csv")
@@ -59,7 +58,8 @@ Focus on peer-reviewed, high-quality sources from the last 5 years.
             prompt=prompt,
             model=model,
             context=context,
-            use_grounding=True  # Enable Google Search grounding
+            use_grounding=True,  # Enable Google Search grounding
+            cache_task="compare_external_research"
         )
 
         return {
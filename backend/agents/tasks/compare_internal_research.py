@@ -9,8 +9,7 @@ async def compare_internal_research(query: str, context: Dict[str, Any], model:
     Compare patient case with internal hospital research and case studies.
     """
     try:
-        from backend.services.gemini_service import GeminiService
-        gemini_service = GeminiService()
+        from backend.services.gemini_service import gemini_service
 
         # Load internal research from CSV
         case_studies = db.read_csv("research/internal_research/case_studies.csv")
@@ -51,7 +50,8 @@ This is privileged internal data - focus on patterns within our institution.
         response = await gemini_service.generate_response(
             prompt=prompt,
             model=model,
-            context=context
+            context=context,
+            cache_task="compare_internal_research"
         )
 
         return {
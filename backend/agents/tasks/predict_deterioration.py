@@ -1,8 +1,9 @@
 """Task: Predict patient deterioration using ML and pattern recognition."""
 from typing import Dict, Any
-from backend.core.database import db
+from backend.core.database import vitals_store
+from backend.core.vitals_buffer import recent_vitals
+from backend.core.vitals_trends import VitalsTrendTracker, vitals_trends
 from loguru import logger
-import pandas as pd
 
 
 async def predict_deterioration(query: str, context: Dict[str, Any], model: str) -> Dict[str, Any]:
@@ -10,39 +11,30 @@ async def predict_deterioration(query: str, context: Dict[str, Any], model: str)
     Predict patient deterioration risk using vital signs patterns.
     """
     try:
-        from backend.services.gemini_service import GeminiService
-        gemini_service = GeminiService()
+        from backend.services.gemini_service import gemini_service
 
         # Extract patient_id from context
         patient_id = context.get('patient_id')
 
-        # Load vitals data
-        vitals = db.read_csv("vitals/vitals_history.csv")
-
-        if not vitals.empty and patient_id and 'patient_id' in vitals.columns:
-            # Filter for specific patient
-            patient_vitals = vitals[vitals['patient_id'] == patient_id]
-
-            # Sort by timestamp to get trajectory
-            if 'timestamp' in patient_vitals.columns:
-                patient_vitals = patient_vitals.sort_values('timestamp')
-
-            # Calculate trends
-            trends = {}
-            if not patient_vitals.empty:
-                for col in ['heart_rate', 'bp_systolic', 'bp_diastolic', 'o2_saturation', 'temperature']:
-                    if col in patient_vitals.columns:
-                        values = patient_vitals[col].dropna()
-                        if len(values) >= 2:
-                            trends[col] = {
-                                "current": values.iloc[-1],
-                                "previous": values.iloc[-2] if len(values) > 1 else values.iloc[-1],
-                                "trend": "increasing" if values.iloc[-1] > values.iloc[0] else "decreasing",
-                                "rate_of_change": (values.iloc[-1] - values.iloc[0]) / len(values) if len(values) > 0 else 0
-                            }
-        else:
-            patient_vitals = pd.DataFrame()
-            trends = {}
+        # Recent readings from memory, oldest first (storage only when not resident)
+        recent = []
+        if patient_id:
+            recent = list(reversed(recent_vitals.get_fresh(patient_id, 20, vitals_store)))
+
+        # Windowed slope/EWMA/variance kept up to date as readings arrive
+        trends = vitals_trends.get_trends(patient_id) if patient_id else {}
+        if not trends and recent:
+            # Not seen by this process yet: compute from what we loaded, in a
+            # tracker of our own (the shared one gets these readings when the
+            # live bus or the buffer replays them; seeding it would count them twice)
+            seeded = VitalsTrendTracker(
+                window_s=vitals_trends.window_s,
+                max_points=vitals_trends.max_points,
+                halflife_s=vitals_trends.halflife_s,
+                max_patients=1
+            )
+            seeded.update_many(recent)
+            trends = seeded.get_trends(patient_id)
 
         prompt = f"""
 You are a predictive analytics specialist for patient deterioration.
@@ -52,9 +44,9 @@ Query: {query}
 Patient Context: {context}
 
 Recent Vital Signs (time-ordered):
-{patient_vitals.tail(20).to_dict('records') if not patient_vitals.empty else "No vitals data available"}
+{recent if recent else "No vitals data available"}
 
-Calculated Trends:
+Calculated Trends (per vital: EWMA, window mean/std, least-squares slope per hour):
 {trends}
 
 Task:
@@ -78,7 +70,8 @@ Use established early warning scores (NEWS, MEWS) as reference.
         response = await gemini_service.generate_response(
             prompt=prompt,
             model=model,
-            context=context
+            context=context,
+            cache_task="predict_deterioration"
         )
 
         return {
@@ -86,7 +79,7 @@ Use established early warning scores (NEWS, MEWS) as reference.
             "patient_id": patient_id,
             "findings": response,
             "trends_analyzed": trends,
-            "vitals_data_points": len(patient_vitals) if not patient_vitals.empty else 0
+            "vitals_data_points": max((trend["count"] for trend in trends.values()), default=len(recent))
         }
 
     except Exception as e:
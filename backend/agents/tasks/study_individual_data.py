@@ -1,6 +1,6 @@
 """Task: Deep dive into individual patient data."""
 from typing import Dict, Any
-from backend.core.database import db
+from backend.core.database import db, vitals_store
 from loguru import logger
 import pandas as pd
 
@@ -10,8 +10,7 @@ async def study_individual_data(query: str, context: Dict[str, Any], model: str)
     Comprehensive analysis of a single patient.
     """
     try:
-        from backend.services.gemini_service import GeminiService
-        gemini_service = GeminiService()
+        from backend.services.gemini_service import gemini_service
 
         # Extract patient_id from context
         patient_id = context.get('patient_id')
@@ -24,15 +23,12 @@ async def study_individual_data(query: str, context: Dict[str, Any], model: str)
 
         # Load patient-specific data
         patients = db.read_csv("patients/patient_records.csv")
-        vitals = db.read_csv("vitals/vitals_history.csv")
 
         # Filter for specific patient
         patient_info = patients[patients['patient_id'] == patient_id] if not patients.empty and 'patient_id' in patients.columns else pd.DataFrame()
-        patient_vitals = vitals[vitals['patient_id'] == patient_id] if not vitals.empty and 'patient_id' in vitals.columns else pd.DataFrame()
 
-        # Sort vitals by timestamp if available
-        if not patient_vitals.empty and 'timestamp' in patient_vitals.columns:
-            patient_vitals = patient_vitals.sort_values('timestamp', ascending=False)
+        # Most recent vitals first
+        patient_vitals = pd.DataFrame(vitals_store.get_recent(patient_id, limit=50))
 
         prompt = f"""
 You are performing a comprehensive analysis of a single patient.
@@ -68,7 +64,8 @@ Focus on this individual patient's unique circumstances.
         response = await gemini_service.generate_response(
             prompt=prompt,
             model=model,
-            context=context
+            context=context,
+            cache_task="study_individual_data"
         )
 
         return {
@@ -9,8 +9,7 @@ async def study_medical_guidelines(query: str, context: Dict[str, Any], model: s
     Reference clinical guidelines and protocols.
     """
     try:
-        from backend.services.gemini_service import GeminiService
-        gemini_service = GeminiService()
+        from backend.services.gemini_service import gemini_service
 
         # Load medical guidelines from CSV
         guidelines = db.read_csv("guidelines/medical_guidelines.csv")
@@ -53,7 +52,8 @@ Focus on evidence-based, standard-of-care recommendations.
         response = await gemini_service.generate_response(
             prompt=prompt,
             model=model,
-            context=context
+            context=context,
+            cache_task="study_medical_guidelines"
         )
 
         return {
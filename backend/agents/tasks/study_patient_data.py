@@ -1,6 +1,6 @@
 """Task: Study batch patient data for patterns."""
 from typing import Dict, Any
-from backend.core.database import db
+from backend.core.database import db, vitals_store
 from loguru import logger
 import pandas as pd
 
@@ -10,12 +10,11 @@ async def study_patient_data(query: str, context: Dict[str, Any], model: str) ->
     Analyze patterns across multiple patients.
     """
     try:
-        from backend.services.gemini_service import GeminiService
-        gemini_service = GeminiService()
+        from backend.services.gemini_service import gemini_service
 
         # Load patient data from CSV
         patients = db.read_csv("patients/patient_records.csv")
-        vitals = db.read_csv("vitals/vitals_history.csv")
+        vitals = vitals_store.read_all()
 
         # Perform basic statistical analysis
         stats = {}
@@ -61,7 +60,8 @@ Provide:
         response = await gemini_service.generate_response(
             prompt=prompt,
             model=model,
-            context=context
+            context=context,
+            cache_task="study_patient_data"
         )
 
         return {
@@ -1,18 +1,76 @@
 """Patient management endpoints."""
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Request, Query
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from typing import List, Dict, Any, Tuple, Optional
 from backend.schemas.patient_schema import (
     PatientCreate,
     PatientResponse,
     VitalsCreate,
     VitalsResponse,
-    RiskScoreResponse
+    VitalsBatchAdapter,
+    VitalsBatchError,
+    VitalsBatchResponse,
+    RiskScoreResponse,
+    WardRiskScoresResponse,
+    TopRiskResponse,
+    PatientTrendsResponse,
+    PatientBaselineResponse,
+    CohortBaselineResponse
 )
 from backend.services.patient_service import PatientService
+from backend.services.streaming_service import StreamingService
+from backend.core.config import settings
+from backend.core.early_warning import early_warning, LEVEL_ORDER
+from backend.core.dedup import vitals_dedup
+from backend.streaming.live_bus import live_bus
 from loguru import logger
+import json
 
 router = APIRouter(prefix="/api/patients", tags=["patients"])
 patient_service = PatientService()
+streaming_service = StreamingService()
+
+
+def _parse_vitals_batch(body: bytes, ndjson: bool) -> Tuple[List[Any], List[VitalsBatchError]]:
+    """Decode a JSON array or NDJSON body into raw rows plus per-line parse errors."""
+    if not ndjson:
+        try:
+            rows = json.loads(body)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of vitals records")
+        return rows, []
+
+    rows, errors = [], []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except ValueError as e:
+            # Keep the row position so later rows keep their numbering
+            errors.append(VitalsBatchError(row=len(rows), message=f"Invalid JSON: {e}"))
+            rows.append(None)
+    return rows, errors
+
+
+def _validate_vitals_batch(rows: List[Any]) -> Tuple[List[Dict[str, Any]], List[VitalsBatchError]]:
+    """Validate all rows in one pass; on failure, keep the valid rows and report the rest."""
+    try:
+        return [vitals.model_dump() for vitals in VitalsBatchAdapter.validate_python(rows)], []
+    except ValidationError as e:
+        errors = []
+        failed = set()
+        for error in e.errors():
+            position = error["loc"][0] if error["loc"] else 0
+            failed.add(position)
+            field = ".".join(str(part) for part in error["loc"][1:]) or None
+            errors.append(VitalsBatchError(row=position, field=field, message=error["msg"]))
+
+        valid = VitalsBatchAdapter.validate_python([row for i, row in enumerate(rows) if i not in failed])
+        return [vitals.model_dump() for vitals in valid], errors
 
 
 @router.get("/", response_model=List[PatientResponse])
@@ -26,6 +84,55 @@ async def get_all_patients():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/risk-scores", response_model=WardRiskScoresResponse)
+async def get_ward_risk_scores(
+    min_level: Optional[str] = Query(None, pattern="^(low|medium|high|critical)$"),
+    limit: Optional[int] = Query(None, ge=1)
+):
+    """Early warning scores for every patient, highest risk first."""
+    try:
+        scores = patient_service.calculate_ward_risk_scores()
+        if min_level:
+            floor = LEVEL_ORDER.index(min_level)
+            scores = [score for score in scores if LEVEL_ORDER.index(score["risk_level"]) >= floor]
+        if limit:
+            scores = scores[:limit]
+        return {"status": "success", "score_model": early_warning.name, "count": len(scores), "scores": scores}
+    except Exception as e:
+        logger.error(f"Error calculating ward risk scores: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/top-risk", response_model=TopRiskResponse)
+async def get_top_risk(
+    k: int = Query(10, ge=1, le=1000),
+    min_level: Optional[str] = Query(None, pattern="^(low|medium|high|critical)$")
+):
+    """
+    The k patients most at risk right now: highest early warning level,
+    then score, then how fast the score is rising. Served from the
+    maintained risk index; membership changes of the top
+    RISK_INDEX_NOTIFY_K are pushed on /ws/stream as ``top_risk`` system events.
+    """
+    try:
+        patients = patient_service.get_top_risk(k, min_level)
+        return {"status": "success", "score_model": early_warning.name, "k": k, "count": len(patients), "patients": patients}
+    except Exception as e:
+        logger.error(f"Error getting top risk patients: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/baselines/cohort", response_model=CohortBaselineResponse)
+async def get_cohort_baseline(patients: Optional[str] = None):
+    """Baseline merged from several patients' sketches (comma-separated IDs; default all)."""
+    try:
+        patient_ids = [p.strip() for p in patients.split(",") if p.strip()] if patients else None
+        return patient_service.get_cohort_baseline(patient_ids)
+    except Exception as e:
+        logger.error(f"Error getting cohort baseline: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{patient_id}", response_model=PatientResponse)
 async def get_patient(patient_id: str):
     """Get patient by ID."""
@@ -68,10 +175,16 @@ async def get_patient_vitals(patient_id: str, limit: int = 100):
 
 @router.post("/vitals", response_model=dict)
 async def add_vital_signs(vitals: VitalsCreate):
-    """Add vital signs record."""
+    """Add vital signs record (a re-sent reading is acknowledged, not stored twice)."""
     try:
-        success = patient_service.add_vital_signs(vitals.model_dump())
+        vitals_data = vitals.model_dump()
+        if vitals_dedup is not None and vitals_dedup.is_duplicate(vitals_data):
+            return {"status": "duplicate", "patient_id": vitals.patient_id}
+        success = await patient_service.add_vital_signs(vitals_data)
         if success:
+            if vitals_dedup is not None:
+                vitals_dedup.remember(vitals_data)
+            live_bus.publish("vitals", vitals_data)
             return {"status": "success", "patient_id": vitals.patient_id}
         else:
             raise HTTPException(status_code=500, detail="Failed to add vital signs")
@@ -80,6 +193,80 @@ async def add_vital_signs(vitals: VitalsCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/vitals/batch", response_model=VitalsBatchResponse)
+async def add_vital_signs_batch(request: Request, publish: bool = False):
+    """
+    Add many vital signs records in one request.
+
+    The body is a JSON array of vitals records, or NDJSON (one record per
+    line) when sent as application/x-ndjson. Valid rows are stored with a
+    single write and, with ``publish=true``, forwarded to the vitals topic
+    as one producer batch. Invalid rows are reported individually;
+    readings already received within the dedup window are counted in
+    ``duplicates`` and skipped.
+    """
+    try:
+        body = await request.body()
+        ndjson = "ndjson" in request.headers.get("content-type", "")
+        rows, errors = _parse_vitals_batch(body, ndjson)
+
+        if len(rows) > settings.VITALS_BATCH_MAX_ROWS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch of {len(rows)} rows exceeds limit of {settings.VITALS_BATCH_MAX_ROWS}"
+            )
+
+        # Rows that failed to parse are already reported
+        unparsed = {error.row for error in errors}
+        vitals_list, validation_errors = _validate_vitals_batch(
+            [{} if i in unparsed else row for i, row in enumerate(rows)]
+        )
+        errors += [error for error in validation_errors if error.row not in unparsed]
+        errors.sort(key=lambda error: error.row)
+
+        duplicates = 0
+        if vitals_dedup is not None:
+            received = len(vitals_list)
+            vitals_list = vitals_dedup.filter(vitals_list)
+            duplicates = received - len(vitals_list)
+
+        accepted = 0
+        if vitals_list:
+            accepted = patient_service.add_vital_signs_batch(vitals_list)
+            if accepted == 0:
+                raise HTTPException(status_code=500, detail="Failed to add vital signs batch")
+            if vitals_dedup is not None and accepted == len(vitals_list):
+                vitals_dedup.remember_many(vitals_list)
+            for vitals_data in vitals_list:
+                live_bus.publish("vitals", vitals_data)
+
+        published = 0
+        if publish and accepted:
+            try:
+                published = await streaming_service.produce_vitals_batch(vitals_list)
+            except Exception as e:
+                logger.error(f"Error publishing vitals batch: {e}")
+
+        rejected = len({error.row for error in errors})
+        response = VitalsBatchResponse(
+            status="success" if not errors else ("partial" if accepted else "error"),
+            accepted=accepted,
+            rejected=rejected,
+            published=published,
+            duplicates=duplicates,
+            errors=errors
+        )
+        if not accepted and not duplicates and errors:
+            return JSONResponse(status_code=422, content=response.model_dump())
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error adding vital signs batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{patient_id}/risk-score", response_model=RiskScoreResponse)
 async def get_risk_score(patient_id: str):
     """Get patient risk score."""
@@ -89,3 +276,23 @@ async def get_risk_score(patient_id: str):
     except Exception as e:
         logger.error(f"Error calculating risk score: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{patient_id}/trends", response_model=PatientTrendsResponse)
+async def get_vitals_trends(patient_id: str):
+    """Get EWMA, windowed mean/std and slope for each vital sign channel."""
+    try:
+        return patient_service.get_vitals_trends(patient_id)
+    except Exception as e:
+        logger.error(f"Error getting trends for patient {patient_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{patient_id}/baseline", response_model=PatientBaselineResponse)
+async def get_baseline(patient_id: str):
+    """Get quantiles and the usual range of each vital sign for this patient."""
+    try:
+        return patient_service.get_baseline(patient_id)
+    except Exception as e:
+        logger.error(f"Error getting baseline for patient {patient_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
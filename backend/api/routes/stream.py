@@ -0,0 +1,64 @@
+"""Live vitals and alert stream for the dashboard (WebSocket)."""
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from typing import Optional
+from backend.streaming.live import live_hub, stream_message
+from loguru import logger
+import asyncio
+import json
+
+router = APIRouter(tags=["stream"])
+
+
+@router.websocket("/ws/stream")
+async def live_stream(websocket: WebSocket, types: Optional[str] = None, patients: Optional[str] = None):
+    """
+    Push live vitals, alerts and agent events.
+
+    Query parameters ``types`` (vitals,alert,agent_log,system) and
+    ``patients`` (comma-separated IDs) set the initial subscription; both
+    default to everything. The client can change it at any time by sending
+    ``{"action": "subscribe", "types": [...], "patients": [...]}``.
+    Vitals are coalesced to the latest reading per patient per frame.
+    """
+    await websocket.accept()
+    client = live_hub.connect(websocket, types=types, patients=patients)
+    if client is None:
+        await websocket.close(code=1013, reason="Too many live stream clients")
+        return
+
+    async def receive_commands():
+        while True:
+            text = await websocket.receive_text()
+            try:
+                command = json.loads(text)
+                if command.get("action") != "subscribe":
+                    raise ValueError(f"Unknown action {command.get('action')!r}")
+                client.subscribe(types=command.get("types"), patients=command.get("patients"))
+                reply = {"event": "subscribed", **client.subscription()}
+            except (ValueError, AttributeError) as e:
+                reply = {"event": "error", "message": str(e)}
+            await client.send(stream_message("system", reply))
+
+    sender = asyncio.ensure_future(client.run())
+    receiver = asyncio.ensure_future(receive_commands())
+    slow = False
+    try:
+        await client.send(stream_message("system", {"event": "subscribed", **client.subscription()}))
+        done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if isinstance(error, asyncio.TimeoutError):
+                slow = True
+            elif error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.error(f"Live stream error: {error}")
+    except (WebSocketDisconnect, asyncio.TimeoutError):
+        pass
+    finally:
+        live_hub.disconnect(client, slow=slow)
+        for task in (sender, receiver):
+            task.cancel()
+        if slow:
+            try:
+                await asyncio.wait_for(websocket.close(code=1008, reason="Client too slow"), live_hub.send_timeout)
+            except Exception:
+                pass
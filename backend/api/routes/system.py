@@ -0,0 +1,55 @@
+"""System metrics and dead-letter queue endpoints."""
+from fastapi import APIRouter, Query
+from backend.core.database import db
+from backend.core.alert_store import alert_store
+from backend.core.vitals_buffer import recent_vitals
+from backend.core.dedup import vitals_dedup
+from backend.core.vitals_trends import vitals_trends
+from backend.core.risk_index import risk_index
+from backend.core.baselines import vitals_baselines
+from backend.streaming.live import live_hub
+from backend.streaming.live_bus import live_bus
+from backend.streaming.supervisor import read_worker_metrics
+from backend.streaming.dead_letter import DeadLetterQueue
+from backend.services.gemini_service import gemini_service
+from backend.services.streaming_service import StreamingService
+import asyncio
+
+router = APIRouter(prefix="/api/system", tags=["system"])
+dead_letter_queue = DeadLetterQueue(StreamingService())
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Get storage, in-memory cache and consumer worker metrics."""
+    return {
+        "write_behind": db.get_write_stats(),
+        "vitals_buffer": recent_vitals.get_stats(),
+        "alert_store": alert_store.get_stats(),
+        "vitals_dedup": vitals_dedup.get_stats() if vitals_dedup else {},
+        "vitals_trends": vitals_trends.get_stats(),
+        "risk_index": risk_index.get_stats(),
+        "vitals_baselines": vitals_baselines.get_stats(),
+        "live_stream": live_hub.get_stats(),
+        "live_bus": live_bus.get_stats(),
+        "consumer_workers": read_worker_metrics(),
+        "gemini": gemini_service.get_stats()
+    }
+
+
+@router.get("/dlq")
+async def inspect_dead_letters(limit: int = Query(100, ge=1, le=5000)):
+    """List dead-lettered vitals messages with their error headers (not consumed)."""
+    messages = await asyncio.to_thread(dead_letter_queue.peek, limit)
+    return {
+        "topic": dead_letter_queue.topic,
+        "count": len(messages),
+        "messages": messages
+    }
+
+
+@router.post("/dlq/replay")
+async def replay_dead_letters(limit: int = Query(1000, ge=1, le=50000)):
+    """Re-send up to ``limit`` dead-lettered messages to their original topic."""
+    result = await dead_letter_queue.replay(limit)
+    return {"status": "success", "topic": dead_letter_queue.topic, **result}
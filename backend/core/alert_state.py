@@ -0,0 +1,285 @@
+"""Per-(patient, anomaly type) alert incidents with hysteresis and cooldown.
+
+An anomaly type is one channel breaching one side of its threshold
+(``heart_rate_high``). Each reading moves that type's incident through:
+
+- open: first breach with a reading of at least ``min_severity``;
+- update: still breaching (or inside the hysteresis band) at the same or
+  lower severity -- no new alert;
+- escalate: still breaching at a higher severity than the incident's peak;
+- clear: back inside the threshold by the hysteresis margin;
+- reopen: breaching again within ``cooldown_s`` of clearing -- continues
+  the cleared incident instead of opening a new one.
+
+Only open and escalate should reach storage, Kafka, email and the agents;
+the caller decides what each transition does, and calls ``revert`` when
+raising the alert for an open or escalate failed, so the reading's retry
+takes the same transition again.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from backend.core.config import settings
+from backend.core.early_warning import LEVEL_ORDER
+import uuid
+import math
+
+TRANSITIONS = ("open", "update", "escalate", "clear", "reopen")
+
+
+class Incident:
+    """One (patient, anomaly type) incident."""
+
+    __slots__ = (
+        "incident_id", "patient_id", "anomaly_type", "channel", "direction", "state",
+        "severity", "current_severity", "value", "opened_at", "last_seen", "cleared_at",
+        "updates", "alert_id", "previous"
+    )
+
+    # Fields a reading can change, saved so a failed open/escalate can be undone
+    _TRACKED = ("state", "severity", "current_severity", "value", "last_seen", "cleared_at", "updates")
+
+    def __init__(self, patient_id: str, channel: str, direction: str, severity: str, value: float, now: float):
+        """Initialize incident."""
+        self.incident_id = str(uuid.uuid4())
+        self.patient_id = patient_id
+        self.anomaly_type = f"{channel}_{direction}"
+        self.channel = channel
+        self.direction = direction
+        self.state = "open"
+        self.severity = severity
+        self.current_severity = severity
+        self.value = value
+        self.opened_at = now
+        self.last_seen = now
+        self.cleared_at: Optional[float] = None
+        self.updates = 0
+        self.alert_id: Optional[str] = None
+        # Field values before the last escalate (None: the last transition opened it)
+        self.previous: Optional[Tuple[Any, ...]] = None
+
+    def snapshot(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self._TRACKED)
+
+    @property
+    def message(self) -> str:
+        return f"{self.channel} too {self.direction} ({self.value:g})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "incident_id": self.incident_id,
+            "patient_id": self.patient_id,
+            "anomaly_type": self.anomaly_type,
+            "state": self.state,
+            "severity": self.severity,
+            "current_severity": self.current_severity,
+            "value": self.value,
+            "opened_at": self.opened_at,
+            "last_seen": self.last_seen,
+            "cleared_at": self.cleared_at,
+            "updates": self.updates,
+            "alert_id": self.alert_id,
+        }
+
+
+def _value(vitals_data: Dict[str, Any], channel: str) -> Optional[float]:
+    value = vitals_data.get(channel)
+    if value is None or value == "":
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+class AlertStateMachine:
+    """
+    Alert incidents for every patient, driven by the processor's thresholds.
+
+    ``hysteresis`` is a fraction of each channel's (max - min) range: an
+    incident opened above ``max`` only clears at or below
+    ``max - hysteresis * (max - min)`` (mirrored for ``min``), so readings
+    oscillating around a threshold do not open and clear repeatedly.
+    """
+
+    def __init__(
+        self,
+        thresholds: Dict[str, Dict[str, float]],
+        hysteresis: float = 0.05,
+        cooldown_s: float = 600,
+        min_severity: str = "medium",
+        stale_s: float = 3600
+    ):
+        """Initialize alert state machine."""
+        self.hysteresis = hysteresis
+        self.channels: List[Tuple[str, float, float, float]] = []
+        for channel, limits in thresholds.items():
+            margin = hysteresis * (limits['max'] - limits['min'])
+            self.channels.append((channel, float(limits['min']), float(limits['max']), margin))
+        self.cooldown_s = cooldown_s
+        self.min_level = LEVEL_ORDER.index(min_severity)
+        self.stale_s = max(stale_s, cooldown_s)
+
+        # patient_id -> {anomaly_type: Incident}
+        self._incidents: Dict[str, Dict[str, Incident]] = {}
+        self._last_prune = -math.inf
+
+        # Metrics
+        self.counts = {transition: 0 for transition in TRANSITIONS}
+
+    def tracks(self, patient_id: str) -> bool:
+        """True if the patient has open or cooling-down incidents (cheap pre-check)."""
+        return patient_id in self._incidents
+
+    def evaluate(
+        self,
+        patient_id: str,
+        vitals_data: Dict[str, Any],
+        severity: Optional[str],
+        now: float,
+        limits: Optional[Dict[str, Tuple[float, float]]] = None
+    ) -> List[Tuple[str, Incident]]:
+        """
+        Advance the patient's incidents with one reading.
+
+        Args:
+            patient_id: Patient ID
+            vitals_data: The reading
+            severity: The reading's risk level (None if not scored: breaches
+                then only update incidents that are already open)
+            now: The reading's time (epoch seconds)
+            limits: Per-channel (min, max) replacing the thresholds for this
+                patient (e.g. their baseline range)
+
+        Returns:
+            (transition, incident) pairs, in channel order
+        """
+        level = LEVEL_ORDER.index(severity) if severity in LEVEL_ORDER else -1
+        incidents = self._incidents.get(patient_id, {})
+        transitions: List[Tuple[str, Incident]] = []
+
+        for channel, low, high, margin in self.channels:
+            value = _value(vitals_data, channel)
+            if value is None:
+                continue
+            if limits and channel in limits:
+                low, high = limits[channel]
+                margin = self.hysteresis * max(high - low, 0.0)
+            for direction, breached, cleared in (
+                ("high", value > high, value <= high - margin),
+                ("low", value < low, value >= low + margin),
+            ):
+                incident = incidents.get(f"{channel}_{direction}")
+                if incident is not None and incident.state == "cleared" and now - incident.cleared_at > self.cooldown_s:
+                    del incidents[incident.anomaly_type]
+                    incident = None
+
+                if incident is None:
+                    if breached and level >= self.min_level:
+                        incident = Incident(patient_id, channel, direction, severity, value, now)
+                        incidents[incident.anomaly_type] = incident
+                        transitions.append(("open", incident))
+                    continue
+
+                if incident.state == "open" and cleared:
+                    incident.state = "cleared"
+                    incident.cleared_at = now
+                    incident.value = value
+                    incident.last_seen = now
+                    transitions.append(("clear", incident))
+                elif breached or (incident.state == "open" and not cleared):
+                    if incident.state == "cleared" and level < self.min_level:
+                        continue
+                    before = incident.snapshot()
+                    incident.value = value
+                    incident.last_seen = max(incident.last_seen, now)
+                    incident.updates += 1
+                    if level >= 0:
+                        incident.current_severity = severity
+                    if level > LEVEL_ORDER.index(incident.severity):
+                        incident.previous = before
+                        incident.severity = severity
+                        incident.state = "open"
+                        transitions.append(("escalate", incident))
+                    elif incident.state == "cleared":
+                        incident.state = "open"
+                        incident.cleared_at = None
+                        transitions.append(("reopen", incident))
+                    elif breached:
+                        transitions.append(("update", incident))
+
+        if incidents:
+            self._incidents[patient_id] = incidents
+        else:
+            self._incidents.pop(patient_id, None)
+        for transition, _ in transitions:
+            self.counts[transition] += 1
+        self._prune(now)
+        return transitions
+
+    def revert(self, incident: Incident):
+        """
+        Undo an incident's last open or escalate (its alert could not be
+        raised): an opened incident is forgotten, an escalated one gets
+        back the state it had before that reading.
+        """
+        incidents = self._incidents.get(incident.patient_id, {})
+        if incidents.get(incident.anomaly_type) is not incident:
+            return
+        if incident.previous is None:
+            del incidents[incident.anomaly_type]
+            if not incidents:
+                self._incidents.pop(incident.patient_id, None)
+            self.counts["open"] -= 1
+            return
+        for name, value in zip(Incident._TRACKED, incident.previous):
+            setattr(incident, name, value)
+        incident.previous = None
+        self.counts["escalate"] -= 1
+
+    def _prune(self, now: float):
+        """Forget incidents not seen for stale_s (patient gone quiet), at most once a minute."""
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        for patient_id in list(self._incidents):
+            incidents = self._incidents[patient_id]
+            for anomaly_type in [t for t, i in incidents.items() if now - i.last_seen > self.stale_s]:
+                del incidents[anomaly_type]
+            if not incidents:
+                del self._incidents[patient_id]
+
+    def get_incidents(self, patient_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Open and cooling-down incidents, optionally for one patient."""
+        patients = [patient_id] if patient_id else list(self._incidents)
+        return [
+            incident.to_dict()
+            for pid in patients
+            for incident in self._incidents.get(pid, {}).values()
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        open_count = sum(
+            1 for incidents in self._incidents.values() for i in incidents.values() if i.state == "open"
+        )
+        notified = self.counts["open"] + self.counts["escalate"]
+        suppressed = self.counts["update"] + self.counts["reopen"]
+        return {
+            **self.counts,
+            "open_incidents": open_count,
+            "tracked_patients": len(self._incidents),
+            "suppressed": suppressed,
+            "suppression_rate": round(suppressed / (suppressed + notified), 4) if suppressed + notified else 0.0,
+        }
+
+
+def create_alert_state(thresholds: Dict[str, Dict[str, float]]) -> Optional[AlertStateMachine]:
+    """Build the alert state machine from settings (None when disabled)."""
+    if not settings.ALERT_STATE_ENABLED:
+        return None
+    return AlertStateMachine(
+        thresholds,
+        hysteresis=settings.ALERT_HYSTERESIS,
+        cooldown_s=settings.ALERT_COOLDOWN_S,
+        min_severity=settings.ALERT_MIN_SEVERITY,
+        stale_s=settings.ALERT_INCIDENT_STALE_S
+    )
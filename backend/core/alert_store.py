@@ -0,0 +1,332 @@
+"""Indexed alert storage with append-only status transitions."""
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+from pathlib import Path
+from backend.core.config import settings
+from backend.core.database import db
+from backend.core.file_lock import FileLock
+from loguru import logger
+import threading
+import csv
+import io
+import os
+
+
+ALERT_COLUMNS = ["alert_id", "patient_id", "alert_type", "severity", "message", "timestamp", "status"]
+EVENT_COLUMNS = ["alert_id", "status", "timestamp"]
+
+
+def _csv_line(values: List[Any]) -> bytes:
+    """Encode one CSV record."""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(['' if v is None else v for v in values])
+    return buffer.getvalue().encode('utf-8')
+
+
+def _signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """(inode, size, mtime_ns) of a file, None if missing."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _iter_records(path: Path, start: int = 0) -> List[Tuple[int, List[str]]]:
+    """Read (byte offset, fields) for every record from ``start``, handling quoted newlines."""
+    records = []
+    if not path.exists():
+        return records
+    with open(path, 'rb') as f:
+        f.seek(start)
+        offset = start
+        pending = b''
+        start = 0
+        for line in f:
+            if not pending:
+                start = offset
+            pending += line
+            offset += len(line)
+            # A record is complete once its quotes are balanced
+            if pending.count(b'"') % 2 == 0:
+                fields = next(csv.reader(io.StringIO(pending.decode('utf-8'))), [])
+                records.append((start, fields))
+                pending = b''
+    return records
+
+
+class AlertStore:
+    """
+    Alert records in alert_history.csv plus an append-only event log.
+
+    Keeps an alert_id -> record byte offset index and each alert's current
+    status in memory. Acknowledge/resolve append one row to the event log
+    instead of rewriting the history file; the history file is rewritten
+    with the latest statuses only when the log is compacted.
+
+    Several processes (API, consumer workers) share the files: every
+    operation holds an flock on ``alerts/alert_history.lock`` and first
+    catches up with what the others wrote -- new records are read from the
+    end of the files when they grew, and the index is rebuilt when a file
+    was replaced (compacted) or rewritten.
+    """
+
+    def __init__(
+        self,
+        base_path: str = "./data",
+        alerts_file: str = "alerts/alert_history.csv",
+        events_file: str = "alerts/alert_events.csv",
+        compact_after: int = 1000
+    ):
+        """Initialize alert store."""
+        self.alerts_path = Path(base_path) / alerts_file
+        self.events_path = Path(base_path) / events_file
+        self.compact_after = max(1, compact_after)
+
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(self.alerts_path.with_suffix(".lock"))
+        self._alerts_seen: Optional[Tuple[int, int, int]] = None
+        self._events_seen: Optional[Tuple[int, int, int]] = None
+        self._header: List[str] = list(ALERT_COLUMNS)
+        self._offsets: Dict[str, int] = {}
+        self._status: Dict[str, str] = {}
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._event_count = 0
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    def _reset(self):
+        """Forget the index. Caller holds the locks."""
+        self._header = list(ALERT_COLUMNS)
+        self._offsets = {}
+        self._status = {}
+        self._active = {}
+        self._event_count = 0
+        self._alerts_seen = None
+        self._events_seen = None
+
+    def _sync(self):
+        """Catch up with records other processes wrote. Caller holds the locks."""
+        alerts = _signature(self.alerts_path)
+        events = _signature(self.events_path)
+        if alerts == self._alerts_seen and events == self._events_seen:
+            return
+
+        reload = (
+            self._alerts_seen is None
+            or alerts is None
+            or alerts[0] != self._alerts_seen[0]
+            or alerts[1] < self._alerts_seen[1]
+            or (alerts[1] == self._alerts_seen[1] and alerts[2] != self._alerts_seen[2])
+            or (self._events_seen is not None and (
+                events is None
+                or events[0] != self._events_seen[0]
+                or events[1] < self._events_seen[1]
+            ))
+        )
+        if reload:
+            self._reset()
+            self.alerts_path.parent.mkdir(parents=True, exist_ok=True)
+        alerts_from = self._alerts_seen[1] if self._alerts_seen else 0
+        events_from = self._events_seen[1] if self._events_seen else 0
+
+        if alerts is not None and alerts[1] > alerts_from:
+            self._index_alerts(alerts_from)
+        if events is not None and events[1] > events_from:
+            self._apply_events(events_from)
+
+        self._alerts_seen = alerts
+        self._events_seen = events
+        if reload:
+            logger.info(f"Alert index loaded: {len(self._offsets)} alerts, {len(self._active)} active")
+
+    def _index_alerts(self, start: int):
+        """Index alert records from byte ``start``. Caller holds the locks."""
+        records = _iter_records(self.alerts_path, start)
+        if start == 0 and records:
+            self._header = records[0][1]
+            records = records[1:]
+        id_index = self._header.index("alert_id") if "alert_id" in self._header else 0
+        status_index = self._header.index("status") if "status" in self._header else None
+
+        for offset, fields in records:
+            if len(fields) <= id_index:
+                continue
+            alert_id = fields[id_index]
+            self._offsets[alert_id] = offset
+            if status_index is not None and status_index < len(fields):
+                self._status[alert_id] = fields[status_index]
+            if self._status.get(alert_id) == "active":
+                self._active[alert_id] = dict(zip(self._header, fields))
+            else:
+                self._active.pop(alert_id, None)
+
+    def _apply_events(self, start: int):
+        """Replay status events from byte ``start``. Caller holds the locks."""
+        records = _iter_records(self.events_path, start)
+        if start == 0:
+            records = records[1:]
+        for _, fields in records:
+            if len(fields) < 2 or fields[0] not in self._offsets:
+                continue
+            alert_id, status = fields[0], fields[1]
+            self._status[alert_id] = status
+            self._event_count += 1
+            if status == "active":
+                record = self._read_record(alert_id)
+                if record:
+                    self._active[alert_id] = record
+            else:
+                self._active.pop(alert_id, None)
+
+    def _read_record(self, alert_id: str) -> Optional[Dict[str, Any]]:
+        """Read one alert record by its byte offset. Caller holds the lock."""
+        offset = self._offsets.get(alert_id)
+        if offset is None:
+            return None
+        with open(self.alerts_path, 'rb') as f:
+            f.seek(offset)
+            data = f.readline()
+            while data.count(b'"') % 2:
+                line = f.readline()
+                if not line:
+                    break
+                data += line
+        fields = next(csv.reader(io.StringIO(data.decode('utf-8'))), [])
+        record = dict(zip(self._header, fields))
+        record["status"] = self._status.get(alert_id, record.get("status"))
+        return record
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def append(self, alert: Dict[str, Any]) -> bool:
+        """Append a new alert record and index it."""
+        with self._lock, self._file_lock:
+            self._sync()
+            try:
+                new_file = not self.alerts_path.exists() or self.alerts_path.stat().st_size == 0
+                with open(self.alerts_path, 'ab') as f:
+                    if new_file:
+                        f.write(_csv_line(self._header))
+                    offset = f.tell()
+                    f.write(_csv_line([alert.get(column) for column in self._header]))
+                self._alerts_seen = _signature(self.alerts_path)
+
+                alert_id = str(alert["alert_id"])
+                status = str(alert.get("status", "active"))
+                self._offsets[alert_id] = offset
+                self._status[alert_id] = status
+                if status == "active":
+                    self._active[alert_id] = {
+                        column: '' if alert.get(column) is None else alert.get(column)
+                        for column in self._header
+                    }
+                return True
+            except Exception as e:
+                logger.error(f"Error appending alert: {e}")
+                return False
+
+    def update_status(self, alert_id: str, status: str) -> bool:
+        """
+        Record a status transition for an alert.
+
+        Returns:
+            False if the alert does not exist
+        """
+        with self._lock, self._file_lock:
+            self._sync()
+            if alert_id not in self._offsets:
+                return False
+
+            new_file = not self.events_path.exists() or self.events_path.stat().st_size == 0
+            with open(self.events_path, 'ab') as f:
+                if new_file:
+                    f.write(_csv_line(EVENT_COLUMNS))
+                f.write(_csv_line([alert_id, status, datetime.utcnow().isoformat()]))
+            self._events_seen = _signature(self.events_path)
+
+            self._status[alert_id] = status
+            if status == "active":
+                record = self._read_record(alert_id)
+                if record:
+                    self._active[alert_id] = record
+            else:
+                self._active.pop(alert_id, None)
+
+            self._event_count += 1
+            if self._event_count >= self.compact_after:
+                self.compact()
+            return True
+
+    def get(self, alert_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single alert by ID."""
+        with self._lock, self._file_lock:
+            self._sync()
+            if alert_id in self._active:
+                return dict(self._active[alert_id])
+            return self._read_record(alert_id)
+
+    def get_active(self, patient_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get active alerts (most recent first), optionally for one patient."""
+        with self._lock, self._file_lock:
+            self._sync()
+            alerts = [
+                dict(record) for record in self._active.values()
+                if patient_id is None or str(record.get("patient_id")) == patient_id
+            ]
+        alerts.sort(key=lambda record: str(record.get("timestamp", "")), reverse=True)
+        return alerts
+
+    def compact(self):
+        """Fold status events into alert_history.csv and truncate the event log."""
+        with self._lock, self._file_lock:
+            self._sync()
+            if self._event_count == 0:
+                return
+            try:
+                status_index = self._header.index("status") if "status" in self._header else None
+                id_index = self._header.index("alert_id")
+                tmp_path = self.alerts_path.with_suffix(".csv.tmp")
+                offsets: Dict[str, int] = {}
+
+                records = _iter_records(self.alerts_path)
+                with open(tmp_path, 'wb') as out:
+                    out.write(_csv_line(self._header))
+                    for _, fields in records[1:]:
+                        if len(fields) > id_index:
+                            alert_id = fields[id_index]
+                            if status_index is not None and status_index < len(fields):
+                                fields[status_index] = self._status.get(alert_id, fields[status_index])
+                            offsets[alert_id] = out.tell()
+                        out.write(_csv_line(fields))
+
+                os.replace(tmp_path, self.alerts_path)
+                if self.events_path.exists():
+                    self.events_path.unlink()
+                self._offsets = offsets
+                self._alerts_seen = _signature(self.alerts_path)
+                self._events_seen = None
+                logger.info(f"Compacted {self._event_count} alert status events")
+                self._event_count = 0
+            except Exception as e:
+                logger.error(f"Error compacting alert history: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size and pending event metrics."""
+        with self._lock:
+            return {
+                "indexed_alerts": len(self._offsets),
+                "active_alerts": len(self._active),
+                "pending_events": self._event_count,
+            }
+
+
+# Global alert store
+alert_store = AlertStore(
+    base_path=str(db.base_path),
+    compact_after=settings.ALERT_COMPACT_EVENTS
+)
@@ -0,0 +1,482 @@
+"""Per-patient vital sign baselines from streaming quantile sketches.
+
+Every stored reading feeds one KLL sketch (Karnin, Lang & Liberty 2016)
+per channel per patient. A sketch holds O(k) values whatever the number
+of readings, answers quantile queries with rank error of roughly 1.7/k,
+serializes to a plain dict, and merges with other sketches, so cohort
+baselines are the merge of their patients' sketches.
+
+A patient's usual range for a channel is the band between two quantiles
+(``lower_q``..``upper_q``), widened by ``tolerance`` times its width and
+by at least the channel's ``MIN_BAND_MARGIN``. Bands are only reported
+once ``min_readings`` readings have been seen. Baselines learn from every
+reading, so they describe the patient's stay as a whole: a deterioration
+over an hour moves a multi-day baseline very little.
+"""
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from backend.core.config import settings
+from backend.core.vitals_store import VITALS_CHANNELS, to_epoch
+from loguru import logger
+import threading
+import random
+import json
+import math
+import time
+import os
+
+# Narrowest half-margin added around a patient's band, in channel units
+MIN_BAND_MARGIN = {
+    "heart_rate": 10.0,
+    "bp_systolic": 10.0,
+    "bp_diastolic": 8.0,
+    "o2_saturation": 2.0,
+    "temperature": 0.5,
+    "respiratory_rate": 3.0,
+}
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch over floats.
+
+    Level h holds items of weight 2**h. When the sketch is full, the
+    lowest over-capacity level is sorted and every other item (random
+    offset) is promoted to the next level.
+    """
+
+    __slots__ = ("k", "c", "n", "compactors", "_size", "_max_size")
+
+    def __init__(self, k: int = 64, c: float = 2.0 / 3.0):
+        """Initialize KLL sketch."""
+        self.k = max(8, k)
+        self.c = c
+        self.n = 0
+        self.compactors: List[array] = [array('d')]
+        self._size = 0
+        self._max_size = 0
+        self._update_max_size()
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.compactors) - h - 1
+        return int(math.ceil(self.c ** depth * self.k)) + 1
+
+    def _update_max_size(self):
+        self._max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def add(self, value: float):
+        self.compactors[0].append(value)
+        self.n += 1
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self):
+        for h in range(len(self.compactors)):
+            level = self.compactors[h]
+            if len(level) < self._capacity(h):
+                continue
+            if h + 1 == len(self.compactors):
+                self.compactors.append(array('d'))
+                self._update_max_size()
+            items = sorted(level)
+            # An odd item out stays at this level so total weight is preserved
+            keep = array('d', items[-1:]) if len(items) % 2 else array('d')
+            pairs = items[:len(items) - len(keep)]
+            self.compactors[h + 1].extend(pairs[random.getrandbits(1)::2])
+            self.compactors[h] = keep
+            self._size = sum(len(level) for level in self.compactors)
+            if self._size < self._max_size:
+                break
+
+    def merge(self, other: "KLLSketch"):
+        """Fold another sketch into this one."""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append(array('d'))
+        self._update_max_size()
+        for h, level in enumerate(other.compactors):
+            self.compactors[h].extend(level)
+        self.n += other.n
+        self._size = sum(len(level) for level in self.compactors)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def _weighted(self) -> Tuple[List[float], List[int]]:
+        """Items in ascending order with their cumulative weights."""
+        items = sorted(
+            (value, 1 << h) for h, level in enumerate(self.compactors) for value in level
+        )
+        values, cumulative, total = [], [], 0
+        for value, weight in items:
+            total += weight
+            values.append(value)
+            cumulative.append(total)
+        return values, cumulative
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        """Approximate values at ranks ``qs`` (0..1); None while empty."""
+        values, cumulative = self._weighted()
+        if not values:
+            return [None for _ in qs]
+        total = cumulative[-1]
+        results = []
+        for q in qs:
+            target = min(max(q, 0.0), 1.0) * total
+            lo, hi = 0, len(cumulative) - 1
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if cumulative[mid] < target:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            results.append(values[lo])
+        return results
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles([q])[0]
+
+    def rank(self, value: float) -> float:
+        """Approximate fraction of readings <= value."""
+        total = below = 0
+        for h, level in enumerate(self.compactors):
+            weight = 1 << h
+            total += weight * len(level)
+            below += weight * sum(1 for item in level if item <= value)
+        return below / total if total else math.nan
+
+    @property
+    def retained(self) -> int:
+        """Values held (memory is about 8 bytes each)."""
+        return self._size
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "c": self.c, "n": self.n, "compactors": [list(level) for level in self.compactors]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(k=data["k"], c=data["c"])
+        sketch.compactors = [array('d', level) for level in data["compactors"]] or [array('d')]
+        sketch.n = int(data["n"])
+        sketch._size = sum(len(level) for level in sketch.compactors)
+        sketch._update_max_size()
+        return sketch
+
+
+class _PatientBaseline:
+    """One sketch per channel, plus the cached bands."""
+
+    __slots__ = ("sketches", "last_ts", "pending", "bands")
+
+    def __init__(self, k: int):
+        self.sketches = [KLLSketch(k) for _ in VITALS_CHANNELS]
+        self.last_ts = -math.inf
+        self.pending = 0  # readings since bands were computed
+        self.bands: Optional[Dict[str, Tuple[float, float]]] = None
+
+
+def _num(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+class VitalsBaselines:
+    """
+    Per-patient baselines for every vital sign channel.
+
+    Patients are kept in LRU order, as many as fit ``memory_budget_mb``
+    (estimated from the sketch size bound).
+    """
+
+    def __init__(
+        self,
+        k: int = 64,
+        lower_q: float = 0.05,
+        upper_q: float = 0.95,
+        tolerance: float = 0.25,
+        min_readings: int = 120,
+        refresh_every: int = 30,
+        memory_budget_mb: float = 128,
+        checkpoint_dir: Optional[str] = None,
+        checkpoint_interval_s: float = 300
+    ):
+        """Initialize vitals baselines."""
+        self.k = k
+        self.lower_q = lower_q
+        self.upper_q = upper_q
+        self.tolerance = tolerance
+        self.min_readings = max(1, min_readings)
+        self.refresh_every = max(1, refresh_every)
+        # KLL retains at most about k / (1 - c) + levels values per sketch
+        self.bytes_per_patient = len(VITALS_CHANNELS) * (3 * k + 16) * 8
+        self.max_patients = max(1, int(memory_budget_mb * 1024 * 1024) // self.bytes_per_patient)
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir else None
+        self.checkpoint_interval_s = checkpoint_interval_s
+        self.checkpoint_name = f"process-{os.getpid()}"
+
+        self._patients: "OrderedDict[str, _PatientBaseline]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_checkpoint = time.monotonic()
+        self._checkpointing = False
+
+        # Metrics
+        self.updates = 0
+        self.evictions = 0
+        self.checkpoints = 0
+        self.restored = 0
+
+    # ------------------------------------------------------------------ updates
+
+    def _patient(self, patient_id: str) -> _PatientBaseline:
+        """Get or create a patient's sketches, evicting LRU patients. Caller holds the lock."""
+        state = self._patients.get(patient_id)
+        if state is None:
+            while len(self._patients) >= self.max_patients:
+                self._patients.popitem(last=False)
+                self.evictions += 1
+            state = self._patients[patient_id] = _PatientBaseline(self.k)
+        else:
+            self._patients.move_to_end(patient_id)
+        return state
+
+    def _update(self, vitals_data: Dict[str, Any]):
+        patient_id = vitals_data.get("patient_id")
+        if patient_id is None:
+            return
+        state = self._patient(str(patient_id))
+        for sketch, channel in zip(state.sketches, VITALS_CHANNELS):
+            value = _num(vitals_data.get(channel))
+            if value is not None:
+                sketch.add(value)
+        try:
+            state.last_ts = max(state.last_ts, to_epoch(vitals_data.get("timestamp")))
+        except (TypeError, ValueError):
+            pass
+        state.pending += 1
+        self.updates += 1
+
+    def update(self, vitals_data: Dict[str, Any]):
+        """Fold one stored reading into its patient's sketches."""
+        with self._lock:
+            self._update(vitals_data)
+        self.maybe_checkpoint()
+
+    def update_many(self, vitals_list: List[Dict[str, Any]]):
+        """Fold a batch of stored readings (one lock acquisition)."""
+        with self._lock:
+            for vitals_data in vitals_list:
+                self._update(vitals_data)
+        self.maybe_checkpoint()
+
+    # ------------------------------------------------------------------ queries
+
+    def _band(self, channel: str, sketch: KLLSketch) -> Optional[Tuple[float, float]]:
+        if sketch.n < self.min_readings:
+            return None
+        low, high = sketch.quantiles((self.lower_q, self.upper_q))
+        margin = max(self.tolerance * (high - low), MIN_BAND_MARGIN.get(channel, 0.0))
+        return low - margin, high + margin
+
+    def bands(self, patient_id: str) -> Dict[str, Tuple[float, float]]:
+        """
+        The patient's usual (low, high) range per established channel.
+
+        Recomputed from the sketches every ``refresh_every`` readings;
+        empty when nothing is established yet.
+        """
+        with self._lock:
+            state = self._patients.get(str(patient_id))
+            if state is None:
+                return {}
+            if state.bands is None or state.pending >= self.refresh_every:
+                bands = {}
+                for channel, sketch in zip(VITALS_CHANNELS, state.sketches):
+                    band = self._band(channel, sketch)
+                    if band is not None:
+                        bands[channel] = band
+                state.bands = bands
+                state.pending = 0
+            return state.bands
+
+    def get_baseline(self, patient_id: str, qs: Sequence[float] = (0.05, 0.25, 0.5, 0.75, 0.95)) -> Dict[str, Any]:
+        """Quantiles, reading count and usual band per channel."""
+        with self._lock:
+            state = self._patients.get(str(patient_id))
+            if state is None:
+                return {}
+            sketches = [(channel, sketch) for channel, sketch in zip(VITALS_CHANNELS, state.sketches) if sketch.n]
+        return {channel: self._describe(channel, sketch, qs) for channel, sketch in sketches}
+
+    def cohort_baseline(
+        self,
+        patient_ids: Optional[Sequence[str]] = None,
+        qs: Sequence[float] = (0.05, 0.25, 0.5, 0.75, 0.95)
+    ) -> Dict[str, Any]:
+        """Merge the patients' sketches (all resident patients by default) per channel."""
+        merged = [KLLSketch(self.k) for _ in VITALS_CHANNELS]
+        patients = 0
+        with self._lock:
+            ids = [str(pid) for pid in patient_ids] if patient_ids else list(self._patients)
+            for patient_id in ids:
+                state = self._patients.get(patient_id)
+                if state is None:
+                    continue
+                patients += 1
+                for target, sketch in zip(merged, state.sketches):
+                    target.merge(sketch)
+        return {
+            "patients": patients,
+            "channels": {
+                channel: self._describe(channel, sketch, qs)
+                for channel, sketch in zip(VITALS_CHANNELS, merged) if sketch.n
+            },
+        }
+
+    def _describe(self, channel: str, sketch: KLLSketch, qs: Sequence[float]) -> Dict[str, Any]:
+        band = self._band(channel, sketch)
+        return {
+            "count": sketch.n,
+            "quantiles": {f"p{round(q * 100):g}": value for q, value in zip(qs, sketch.quantiles(qs))},
+            "band": list(band) if band else None,
+            "established": band is not None,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            retained = sum(sketch.retained for state in self._patients.values() for sketch in state.sketches)
+            return {
+                "patients": len(self._patients),
+                "max_patients": self.max_patients,
+                "retained_values": retained,
+                "memory_bytes": retained * 8,
+                "updates": self.updates,
+                "evictions": self.evictions,
+                "checkpoints": self.checkpoints,
+                "restored_patients": self.restored,
+            }
+
+    # ------------------------------------------------------------------ checkpoints
+
+    def checkpoint(self):
+        """
+        Write this process's sketches to ``<checkpoint_dir>/<name>.json``.
+
+        Processes sharing a name merge: patients another process saved
+        with newer readings are kept.
+        """
+        if self.checkpoint_dir is None:
+            return
+        with self._lock:
+            snapshot = {
+                patient_id: {
+                    "last_ts": state.last_ts if state.last_ts > -math.inf else None,
+                    "sketches": {c: s.to_dict() for c, s in zip(VITALS_CHANNELS, state.sketches) if s.n},
+                }
+                for patient_id, state in self._patients.items()
+            }
+        try:
+            self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+            path = self.checkpoint_dir / f"{self.checkpoint_name}.json"
+            if path.exists():
+                for patient_id, saved in self._read_checkpoint(path).items():
+                    ours = snapshot.get(patient_id)
+                    if ours is None or (saved.get("last_ts") or -math.inf) > (ours.get("last_ts") or -math.inf):
+                        snapshot[patient_id] = saved
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump({"version": 1, "patients": snapshot}, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+            self.checkpoints += 1
+        except Exception as e:
+            logger.error(f"Error writing vitals baselines checkpoint: {e}")
+
+    @staticmethod
+    def _read_checkpoint(path: Path) -> Dict[str, Any]:
+        with open(path) as f:
+            return json.load(f).get("patients", {})
+
+    def maybe_checkpoint(self):
+        """Checkpoint in the background every checkpoint_interval_s."""
+        if self.checkpoint_dir is None or self._checkpointing:
+            return
+        if time.monotonic() - self._last_checkpoint < self.checkpoint_interval_s:
+            return
+        self._checkpointing = True
+        self._last_checkpoint = time.monotonic()
+
+        def run():
+            try:
+                self.checkpoint()
+            finally:
+                self._checkpointing = False
+
+        threading.Thread(target=run, name="vitals-baselines-checkpoint", daemon=True).start()
+
+    def restore(self, buffer=None, name: Optional[str] = None) -> int:
+        """
+        Load every checkpoint in checkpoint_dir (newest state per patient
+        wins), then add readings from ``buffer`` (a RecentVitalsBuffer)
+        newer than the checkpoint.
+
+        Args:
+            buffer: Warmed recent vitals buffer to catch up from
+            name: Checkpoint file name this process writes to
+
+        Returns:
+            Number of patients restored from checkpoints
+        """
+        if name:
+            self.checkpoint_name = name
+        saved: Dict[str, Any] = {}
+        if self.checkpoint_dir is not None and self.checkpoint_dir.exists():
+            for path in sorted(self.checkpoint_dir.glob("*.json")):
+                try:
+                    for patient_id, state in self._read_checkpoint(path).items():
+                        newest = state.get("last_ts") or -math.inf
+                        if patient_id not in saved or newest > (saved[patient_id].get("last_ts") or -math.inf):
+                            saved[patient_id] = state
+                except Exception as e:
+                    logger.error(f"Error reading vitals baselines checkpoint {path}: {e}")
+
+        with self._lock:
+            self._patients.clear()
+            for patient_id, state in saved.items():
+                baseline = self._patient(patient_id)
+                for c, channel in enumerate(VITALS_CHANNELS):
+                    if channel in state["sketches"]:
+                        baseline.sketches[c] = KLLSketch.from_dict(state["sketches"][channel])
+                baseline.last_ts = state.get("last_ts") or -math.inf
+            self.restored = len(saved)
+
+        caught_up = 0
+        if buffer is not None:
+            for patient_id in buffer.patient_ids():
+                recent = buffer.get_recent(patient_id, buffer.capacity) or []
+                newest = (saved.get(patient_id, {}).get("last_ts") or -math.inf)
+                newer = [row for row in reversed(recent) if to_epoch(row.get("timestamp")) > newest]
+                if newer:
+                    self.update_many(newer)
+                    caught_up += len(newer)
+        self._last_checkpoint = time.monotonic()
+        logger.info(f"Vitals baselines restored for {len(saved)} patients, {caught_up} readings caught up")
+        return len(saved)
+
+
+# Global per-patient vitals baselines
+vitals_baselines = VitalsBaselines(
+    k=settings.BASELINE_SKETCH_K,
+    lower_q=settings.BASELINE_LOWER_QUANTILE,
+    upper_q=settings.BASELINE_UPPER_QUANTILE,
+    tolerance=settings.BASELINE_TOLERANCE,
+    min_readings=settings.BASELINE_MIN_READINGS,
+    refresh_every=settings.BASELINE_REFRESH_EVERY,
+    memory_budget_mb=settings.BASELINE_MEMORY_MB,
+    checkpoint_dir=settings.BASELINE_CHECKPOINT_DIR or None,
+    checkpoint_interval_s=settings.BASELINE_CHECKPOINT_INTERVAL_S
+)
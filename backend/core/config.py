@@ -1,6 +1,6 @@
 """Configuration management using pydantic-settings."""
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Dict
 import os
 
 
@@ -15,16 +15,48 @@ class Settings(BaseSettings):
     GEMINI_MODEL_NAME: str = "gemini-2.0-flash-exp"
     GEMINI_MAX_TOKENS: int = 8192
     GEMINI_TEMPERATURE: float = 0.7
+    GEMINI_MAX_CONCURRENCY: int = 8
+    GEMINI_RETRY_BASE_DELAY_MS: int = 500
+    GEMINI_RETRY_MAX_DELAY_MS: int = 8000
+    GEMINI_CACHE_ENABLED: bool = True
+    GEMINI_CACHE_BACKEND: str = "memory"
+    GEMINI_CACHE_MAX_ENTRIES: int = 1024
+    GEMINI_CACHE_TTL_SECONDS: int = 300
+    GEMINI_CACHE_TASK_TTLS: str = (
+        "study_medical_guidelines=3600,compare_external_research=3600,compare_internal_research=1800,"
+        "study_patient_data=300,study_individual_data=60,predict_deterioration=60"
+    )
 
     # Confluent Cloud (Kafka)
     CONFLUENT_BOOTSTRAP_SERVERS: str = "pkc-xxxxx.us-east-1.aws.confluent.cloud:9092"
     CONFLUENT_API_KEY: str = "your-confluent-api-key"
     CONFLUENT_API_SECRET: str = "your-confluent-api-secret"
     CONFLUENT_CLUSTER_ID: str = "lkc-xxxxx"
+    KAFKA_TRANSPORT: str = "confluent"
+    KAFKA_MEMORY_PARTITIONS: int = 6
+    KAFKA_MEMORY_ACK_MS: float = 0.0
     KAFKA_TOPIC_PATIENT_VITALS: str = "patient-vitals-stream"
     KAFKA_TOPIC_ALERTS: str = "patient-alerts-stream"
     KAFKA_TOPIC_AGENT_LOGS: str = "agent-logs-stream"
+    KAFKA_TOPIC_VITALS_DLQ: str = "patient-vitals-dlq"
+    KAFKA_VITALS_RETRY_DELAYS_S: str = "5,30,300"
     KAFKA_CONSUMER_GROUP: str = "monit-patient-consumer-group"
+    KAFKA_PRODUCER_LINGER_MS: int = 20
+    KAFKA_PRODUCER_BATCH_SIZE: int = 262144
+    KAFKA_PRODUCER_COMPRESSION: str = "lz4"
+    KAFKA_PRODUCER_QUEUE_MAX_MESSAGES: int = 100000
+    KAFKA_VITALS_CODEC: str = "json"
+    CONSUMER_MAX_IN_FLIGHT: int = 256
+    CONSUMER_COMMIT_INTERVAL_MS: int = 1000
+    CONSUMER_BATCH_MODE: bool = False
+    CONSUMER_BATCH_SIZE: int = 500
+    CONSUMER_BATCH_TIMEOUT_MS: int = 100
+    CONSUMER_STATS_INTERVAL_MS: int = 5000
+    CONSUMER_DEAD_LETTER_ENABLED: bool = True
+    CONSUMER_WORKERS: int = 2
+    CONSUMER_WORKER_REPORT_INTERVAL_S: float = 5.0
+    CONSUMER_WORKER_HEARTBEAT_TIMEOUT_S: float = 30.0
+    CONSUMER_METRICS_PATH: str = "./data/streaming/consumer_workers.json"
 
     # ElevenLabs Voice
     ELEVENLABS_API_KEY: str = "your-elevenlabs-api-key"
@@ -38,12 +70,49 @@ class Settings(BaseSettings):
     CSV_PATIENT_DATA_PATH: str = "./data/patients/patient_records.csv"
     CSV_VITALS_DATA_PATH: str = "./data/vitals/vitals_history.csv"
     CSV_MEDICAL_GUIDELINES_PATH: str = "./data/guidelines/medical_guidelines.csv"
+    VITALS_STORE_PATH: str = "./data/vitals/columnar"
+    VITALS_SEGMENT_ROWS: int = 4096
+    VITALS_BUFFER_CAPACITY: int = 256
+    VITALS_BUFFER_MEMORY_MB: float = 64
+    WRITE_BEHIND_ENABLED: bool = True
+    WRITE_BEHIND_MAX_ROWS: int = 500
+    WRITE_BEHIND_MAX_AGE_MS: int = 200
+    VITALS_BATCH_MAX_ROWS: int = 5000
+    VITALS_DEDUP_ENABLED: bool = True
+    VITALS_DEDUP_WINDOW_S: float = 600
+    VITALS_DEDUP_BACKEND: str = "lru"
+    VITALS_DEDUP_MAX_ENTRIES: int = 200000
+    VITALS_DEDUP_ERROR_RATE: float = 0.0001
+    TREND_WINDOW_S: float = 3600
+    TREND_MAX_POINTS: int = 240
+    TREND_EWMA_HALFLIFE_S: float = 900
+    TREND_MAX_PATIENTS: int = 20000
+    TREND_CHECKPOINT_DIR: str = "./data/trends"
+    TREND_CHECKPOINT_INTERVAL_S: float = 300
+    BASELINE_SKETCH_K: int = 64
+    BASELINE_LOWER_QUANTILE: float = 0.05
+    BASELINE_UPPER_QUANTILE: float = 0.95
+    BASELINE_TOLERANCE: float = 0.25
+    BASELINE_MIN_READINGS: int = 120
+    BASELINE_REFRESH_EVERY: int = 30
+    BASELINE_MEMORY_MB: float = 128
+    BASELINE_CHECKPOINT_DIR: str = "./data/baselines"
+    BASELINE_CHECKPOINT_INTERVAL_S: float = 300
+    ANOMALY_DETECTION_MODE: str = "absolute"
 
     # FastAPI Backend
     BACKEND_HOST: str = "0.0.0.0"
     BACKEND_PORT: int = 8000
     BACKEND_RELOAD: bool = True
     CORS_ORIGINS: str = "http://localhost:5173,http://localhost:3000"
+    LIVE_STREAM_FPS: float = 4.0
+    LIVE_STREAM_MAX_PENDING: int = 500
+    LIVE_STREAM_SEND_TIMEOUT_S: float = 2.0
+    LIVE_STREAM_MAX_CLIENTS: int = 200
+    LIVE_BUS_BACKEND: str = "memory"
+    LIVE_BUS_CHANNEL: str = "monit:live"
+    LIVE_BUS_FLUSH_MS: int = 50
+    LIVE_BUS_MAX_BATCH: int = 500
 
     # Agent Configuration
     MAX_ORCHESTRATOR_AGENTS: int = 1
@@ -51,6 +120,11 @@ class Settings(BaseSettings):
     MAX_UTILITY_AGENTS: int = 6
     AGENT_TIMEOUT_SECONDS: int = 30
     AGENT_MAX_RETRIES: int = 3
+    AGENT_QUEUE_MAX_SIZE: int = 100
+    AGENT_QUEUE_WORKERS: int = 4
+    RISK_SCORE_MODEL: str = "news2"
+    RISK_INDEX_TREND_ALPHA: float = 0.2
+    RISK_INDEX_NOTIFY_K: int = 10
 
     # Alert System
     SMTP_SERVER: str = "smtp.gmail.com"
@@ -58,6 +132,12 @@ class Settings(BaseSettings):
     SMTP_USERNAME: str = "your-email@gmail.com"
     SMTP_PASSWORD: str = "your-app-specific-password"
     ALERT_EMAIL_FROM: str = "alerts@monitpatient.com"
+    ALERT_COMPACT_EVENTS: int = 1000
+    ALERT_STATE_ENABLED: bool = True
+    ALERT_HYSTERESIS: float = 0.05
+    ALERT_COOLDOWN_S: float = 600
+    ALERT_MIN_SEVERITY: str = "medium"
+    ALERT_INCIDENT_STALE_S: float = 3600
 
     # Redis
     REDIS_HOST: str = "localhost"
@@ -88,6 +168,21 @@ class Settings(BaseSettings):
         """Convert CORS_ORIGINS string to list."""
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
 
+    @property
+    def gemini_cache_task_ttls(self) -> Dict[str, int]:
+        """Convert GEMINI_CACHE_TASK_TTLS ("task=seconds,...") to a dict."""
+        ttls = {}
+        for item in self.GEMINI_CACHE_TASK_TTLS.split(","):
+            if "=" in item:
+                task, seconds = item.split("=", 1)
+                ttls[task.strip()] = int(seconds)
+        return ttls
+
+    @property
+    def vitals_retry_delays(self) -> List[int]:
+        """Convert KAFKA_VITALS_RETRY_DELAYS_S ("5,30,300") to retry tier delays."""
+        return [int(delay) for delay in self.KAFKA_VITALS_RETRY_DELAYS_S.split(",") if delay.strip()]
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -2,6 +2,11 @@
 import pandas as pd
 from pathlib import Path
 from typing import List, Dict, Optional, Any
+from backend.core.config import settings
+from backend.core.write_behind import WriteBehindBuffer
+import threading
+import asyncio
+import csv
 import os
 
 
@@ -12,6 +17,10 @@ class CSVDatabase:
         """Initialize CSV database."""
         self.base_path = Path(base_path)
         self.ensure_directories()
+        self.write_behind = WriteBehindBuffer(
+            max_rows=settings.WRITE_BEHIND_MAX_ROWS,
+            max_age_ms=settings.WRITE_BEHIND_MAX_AGE_MS
+        )
 
     def ensure_directories(self):
         """Create necessary data directories if they don't exist."""
@@ -31,10 +40,15 @@ class CSVDatabase:
     def read_csv(self, file_path: str) -> pd.DataFrame:
         """Read CSV file and return DataFrame."""
         full_path = self.base_path / file_path
+        # Read-your-writes: make buffered appends visible first
+        if self.write_behind.has_pending(full_path):
+            self.write_behind.flush(full_path)
         if not full_path.exists():
             return pd.DataFrame()
         try:
-            return pd.read_csv(full_path)
+            # Other processes append under the same lock: never read a half-written row
+            with self.write_behind.io_lock, self.write_behind.file_lock(full_path):
+                return pd.read_csv(full_path)
         except Exception as e:
             print(f"Error reading CSV {file_path}: {e}")
             return pd.DataFrame()
@@ -44,21 +58,61 @@ class CSVDatabase:
         full_path = self.base_path / file_path
         full_path.parent.mkdir(parents=True, exist_ok=True)
 
-        try:
-            if mode == 'a' and full_path.exists():
-                data.to_csv(full_path, mode='a', header=False, index=False)
-            else:
-                data.to_csv(full_path, mode='w', header=True, index=False)
-            return True
-        except Exception as e:
-            print(f"Error writing CSV {file_path}: {e}")
-            return False
+        with self.write_behind.io_lock, self.write_behind.file_lock(full_path):
+            # Keep buffered appends ordered before this write
+            self.write_behind.flush(full_path)
+            try:
+                if mode == 'a' and full_path.exists():
+                    data.to_csv(full_path, mode='a', header=False, index=False)
+                else:
+                    data.to_csv(full_path, mode='w', header=True, index=False)
+                    self.write_behind.forget_header(full_path)
+                return True
+            except Exception as e:
+                print(f"Error writing CSV {file_path}: {e}")
+                return False
 
     def append_row(self, file_path: str, row_data: Dict[str, Any]):
-        """Append a single row to CSV file."""
+        """
+        Append a single row to CSV file.
+
+        With write-behind enabled the row is buffered and written by a
+        background flush; use append_row_durable to wait for the disk write.
+        """
         full_path = self.base_path / file_path
-        df = pd.DataFrame([row_data])
-        return self.write_csv(file_path, df, mode='a')
+        if not settings.WRITE_BEHIND_ENABLED:
+            return self.write_behind.write_rows(full_path, [(row_data, None)])
+        self.write_behind.enqueue(full_path, row_data)
+        return True
+
+    def append_rows(self, file_path: str, rows: List[Dict[str, Any]]) -> bool:
+        """Append many rows to CSV file in a single write, matching the existing header."""
+        if not rows:
+            return True
+        full_path = self.base_path / file_path
+        with self.write_behind.io_lock:
+            self.write_behind.flush(full_path)
+            return self.write_behind.write_rows(full_path, [(row, None) for row in rows])
+
+    async def append_row_durable(self, file_path: str, row_data: Dict[str, Any]) -> bool:
+        """Append a single row and wait until it has been written to disk."""
+        full_path = self.base_path / file_path
+        if not settings.WRITE_BEHIND_ENABLED:
+            return self.write_behind.write_rows(full_path, [(row_data, None)])
+        future = self.write_behind.enqueue(full_path, row_data, urgent=True)
+        return await asyncio.wrap_future(future)
+
+    def flush(self):
+        """Write all buffered rows to disk."""
+        self.write_behind.flush()
+
+    def close(self):
+        """Flush buffered rows and stop the background writer."""
+        self.write_behind.close()
+
+    def get_write_stats(self) -> Dict[str, Any]:
+        """Write-behind queue depth and flush latency metrics."""
+        return self.write_behind.get_stats()
 
     def query(self, file_path: str, filters: Dict[str, Any]) -> pd.DataFrame:
         """Query CSV with filters."""
@@ -74,26 +128,195 @@ class CSVDatabase:
 
     def update_row(self, file_path: str, row_id: str, id_column: str, updates: Dict[str, Any]):
         """Update a specific row in CSV."""
-        df = self.read_csv(file_path)
-        if df.empty:
-            return False
+        full_path = self.base_path / file_path
+        # Hold the file lock across read and rewrite so no other process's append is lost
+        with self.write_behind.io_lock, self.write_behind.file_lock(full_path):
+            df = self.read_csv(file_path)
+            if df.empty:
+                return False
 
-        mask = df[id_column] == row_id
-        for column, value in updates.items():
-            if column in df.columns:
-                df.loc[mask, column] = value
+            mask = df[id_column] == row_id
+            for column, value in updates.items():
+                if column in df.columns:
+                    df.loc[mask, column] = value
 
-        return self.write_csv(file_path, df)
+            return self.write_csv(file_path, df)
 
     def delete_row(self, file_path: str, row_id: str, id_column: str):
         """Delete a specific row from CSV."""
-        df = self.read_csv(file_path)
-        if df.empty:
+        full_path = self.base_path / file_path
+        with self.write_behind.io_lock, self.write_behind.file_lock(full_path):
+            df = self.read_csv(file_path)
+            if df.empty:
+                return False
+
+            df = df[df[id_column] != row_id]
+            return self.write_csv(file_path, df)
+
+
+class CSVVitalsStore:
+    """Vitals store backed by the single vitals_history.csv file."""
+
+    def __init__(self, database: CSVDatabase, file_path: str = "vitals/vitals_history.csv"):
+        """Initialize CSV vitals store."""
+        self.database = database
+        self.file_path = file_path
+
+        # Per-patient row counts behind version(), caught up by parsing only
+        # the bytes appended (by any process) since the last call
+        self._versions_lock = threading.Lock()
+        self._signature = None
+        self._offset = 0
+        self._last_line = b""
+        self._id_column: Optional[int] = None
+        self._generation = 0
+        self._counts: Dict[str, int] = {}
+
+    def append(self, vitals_data: Dict[str, Any]) -> bool:
+        """Append a single vitals reading, written before returning."""
+        return self.database.append_rows(self.file_path, [vitals_data])
+
+    async def append_durable(self, vitals_data: Dict[str, Any]) -> bool:
+        """
+        Append a single vitals reading through the write-behind queue.
+
+        Readings arriving together (the consumer processes many messages
+        concurrently) share one flush. Resolves once the row is on disk,
+        so callers can commit the message offset.
+        """
+        return await self.database.append_row_durable(self.file_path, vitals_data)
+
+    def append_many(self, vitals_list: List[Dict[str, Any]]) -> int:
+        """Append a batch of vitals readings."""
+        if not vitals_list:
+            return 0
+        success = self.database.append_rows(self.file_path, vitals_list)
+        return len(vitals_list) if success else 0
+
+    def get_recent(self, patient_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get a patient's most recent vitals, most recent first."""
+        patient_vitals = self.get_history(patient_id)
+        if patient_vitals.empty:
+            return []
+        return patient_vitals.iloc[::-1].head(limit).to_dict('records')
+
+    def iter_recent(self, limit: int):
+        """Yield (patient_id, most recent vitals) for every stored patient."""
+        vitals_df = self.read_all()
+        if vitals_df.empty or 'patient_id' not in vitals_df.columns:
+            return
+        if 'timestamp' in vitals_df.columns:
+            vitals_df = vitals_df.sort_values('timestamp', ascending=False, kind='stable')
+        for patient_id, rows in vitals_df.groupby('patient_id', sort=True):
+            yield patient_id, rows.head(limit).to_dict('records')
+
+    def get_history(self, patient_id: str) -> pd.DataFrame:
+        """Get a patient's full vitals history, oldest first."""
+        vitals_df = self.read_all()
+        if vitals_df.empty or 'patient_id' not in vitals_df.columns:
+            return pd.DataFrame()
+
+        patient_vitals = vitals_df[vitals_df['patient_id'] == patient_id]
+        if 'timestamp' in patient_vitals.columns:
+            patient_vitals = patient_vitals.sort_values('timestamp', kind='stable')
+        return patient_vitals
+
+    def patient_ids(self) -> List[str]:
+        """List patients with stored vitals."""
+        vitals_df = self.read_all()
+        if vitals_df.empty or 'patient_id' not in vitals_df.columns:
+            return []
+        return sorted(vitals_df['patient_id'].dropna().astype(str).unique().tolist())
+
+    def read_all(self) -> pd.DataFrame:
+        """Read the full vitals history for all patients."""
+        return self.database.read_csv(self.file_path)
+
+    def version(self, patient_id: str):
+        """
+        Token that changes whenever a patient's stored vitals change (any process).
+
+        One stat per call; when the file grew, only the appended rows are
+        parsed, so a write for one patient leaves the others' versions
+        alone. A rewritten file changes every version. None when nothing
+        is stored for the patient.
+        """
+        with self._versions_lock:
+            if not self._sync_versions():
+                return None
+            count = self._counts.get(str(patient_id))
+            return None if count is None else (self._generation, count)
+
+    def _reset_versions(self):
+        """Forget the parsed rows (file replaced, rewritten or removed). Caller holds the lock."""
+        self._generation += 1
+        self._offset = 0
+        self._last_line = b""
+        self._id_column = None
+        self._counts = {}
+
+    def _sync_versions(self) -> bool:
+        """Count the rows appended since the last call; False if the file does not exist."""
+        path = self.database.base_path / self.file_path
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            if self._signature is not None:
+                self._signature = None
+                self._reset_versions()
             return False
+        signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if signature == self._signature:
+            return True
 
-        df = df[df[id_column] != row_id]
-        return self.write_csv(file_path, df)
+        with open(path, 'rb') as f:
+            rewritten = (
+                self._signature is None
+                or st.st_ino != self._signature[0]
+                or st.st_size < self._offset
+            )
+            if not rewritten and self._last_line:
+                # Appends keep what was already parsed; a rewrite in place does not
+                f.seek(self._offset - len(self._last_line))
+                rewritten = f.read(len(self._last_line)) != self._last_line
+            if rewritten:
+                self._reset_versions()
+            f.seek(self._offset)
+            data = f.read(st.st_size - self._offset)
+        self._signature = signature
+
+        # Only complete lines: another process may be mid-append
+        end = data.rfind(b"\n") + 1
+        if not end:
+            return True
+        rows = csv.reader(data[:end].decode('utf-8', errors='replace').splitlines())
+        if self._offset == 0:
+            header = next(rows, [])
+            self._id_column = header.index('patient_id') if 'patient_id' in header else None
+        if self._id_column is not None:
+            for fields in rows:
+                if len(fields) > self._id_column:
+                    patient_id = fields[self._id_column]
+                    self._counts[patient_id] = self._counts.get(patient_id, 0) + 1
+        self._last_line = data[data.rfind(b"\n", 0, end - 1) + 1:end]
+        self._offset += end
+        return True
+
+
+def create_vitals_store(database: CSVDatabase):
+    """Create the vitals store selected by settings.USE_CSV_DATABASE."""
+    if settings.USE_CSV_DATABASE:
+        return CSVVitalsStore(database)
+
+    from backend.core.vitals_store import ColumnarVitalsStore
+    return ColumnarVitalsStore(
+        root_path=settings.VITALS_STORE_PATH,
+        segment_rows=settings.VITALS_SEGMENT_ROWS
+    )
 
 
 # Global database instance
 db = CSVDatabase()
+
+# Global vitals store (CSV or columnar, see settings.USE_CSV_DATABASE)
+vitals_store = create_vitals_store(db)
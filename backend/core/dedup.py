@@ -0,0 +1,269 @@
+"""Time-bounded duplicate detection for ingested vitals readings."""
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from backend.core.config import settings
+import threading
+import hashlib
+import json
+import math
+import time
+
+
+def dedup_key(vitals_data: Dict[str, Any]) -> Optional[bytes]:
+    """
+    16-byte key over (patient_id, timestamp, payload hash).
+
+    Readings without a timestamp get one assigned at write time, so two
+    identical ones cannot be told apart from a retry: they have no key.
+    """
+    patient_id = vitals_data.get("patient_id")
+    timestamp = vitals_data.get("timestamp")
+    if not patient_id or not timestamp:
+        return None
+    payload = json.dumps(vitals_data, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.blake2b(payload.encode("utf-8"), digest_size=16)
+    digest.update(f"{patient_id}|{timestamp}".encode("utf-8"))
+    return digest.digest()
+
+
+class LRUKeySet:
+    """
+    Exact set of keys first seen within the last ``window_s`` seconds.
+
+    Bounded by ``max_entries`` too: the oldest keys are dropped first, so
+    under extreme load the effective window shrinks instead of memory
+    growing.
+    """
+
+    def __init__(self, window_s: float, max_entries: int):
+        """Initialize LRU key set."""
+        self.window_s = window_s
+        self.max_entries = max(1, max_entries)
+        self._keys: "OrderedDict[bytes, float]" = OrderedDict()
+        self.evictions = 0
+
+    def _expire(self, now: float):
+        keys = self._keys
+        horizon = now - self.window_s
+        while keys:
+            oldest, seen_at = next(iter(keys.items()))
+            if seen_at > horizon and len(keys) < self.max_entries:
+                break
+            del keys[oldest]
+            if seen_at > horizon:
+                self.evictions += 1
+
+    def contains(self, key: bytes, now: float) -> bool:
+        """True if ``key`` was added within the window."""
+        self._expire(now)
+        return key in self._keys
+
+    def add(self, key: bytes, now: float):
+        if key not in self._keys:
+            self._expire(now)
+            self._keys[key] = now
+
+    def check_and_add(self, key: bytes, now: float) -> bool:
+        """True if ``key`` was already present; adds it otherwise."""
+        if self.contains(key, now):
+            return True
+        self.add(key, now)
+        return False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def memory_bytes(self) -> int:
+        # Key bytes object + float + OrderedDict node overhead (approx.)
+        return len(self._keys) * (16 + 33 + 24 + 100)
+
+
+class RotatingBloomFilter:
+    """
+    Two-generation Bloom filter.
+
+    Keys go into the current generation; lookups check both. The current
+    generation becomes the previous one every ``window_s`` seconds (or
+    early, once it holds ``capacity`` keys, to keep the false-positive
+    rate), so a key is remembered for between one and two windows.
+    False positives (a new reading reported as a duplicate) occur at
+    about ``error_rate`` per lookup.
+    """
+
+    def __init__(self, window_s: float, capacity: int, error_rate: float = 1e-4):
+        """Initialize rotating Bloom filter."""
+        self.window_s = window_s
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.num_bits = max(64, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+
+        self._current = bytearray((self.num_bits + 7) // 8)
+        self._previous = bytearray(len(self._current))
+        self._count = 0
+        self._started: Optional[float] = None
+        self.rotations = 0
+        self.early_rotations = 0
+
+    def _positions(self, key: bytes) -> List[int]:
+        """Bit positions for a key (double hashing over the 16-byte key)."""
+        h1 = int.from_bytes(key[:8], "little")
+        h2 = int.from_bytes(key[8:16], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def _rotate(self, now: float):
+        self._previous = self._current
+        self._current = bytearray(len(self._previous))
+        self._count = 0
+        self._started = now
+        self.rotations += 1
+
+    def _maybe_rotate(self, now: float):
+        if self._started is None:
+            self._started = now
+        elif now - self._started >= self.window_s:
+            self._rotate(now)
+        elif self._count >= self.capacity:
+            self.early_rotations += 1
+            self._rotate(now)
+
+    def contains(self, key: bytes, now: float) -> bool:
+        """True if ``key`` was (probably) added within the last one or two windows."""
+        self._maybe_rotate(now)
+        positions = self._positions(key)
+        for generation in (self._current, self._previous):
+            if all(generation[bit >> 3] & (1 << (bit & 7)) for bit in positions):
+                return True
+        return False
+
+    def add(self, key: bytes, now: float):
+        self._maybe_rotate(now)
+        current = self._current
+        positions = self._positions(key)
+        if all(current[bit >> 3] & (1 << (bit & 7)) for bit in positions):
+            return
+        for bit in positions:
+            current[bit >> 3] |= 1 << (bit & 7)
+        self._count += 1
+
+    def check_and_add(self, key: bytes, now: float) -> bool:
+        """True if ``key`` was (probably) present; adds it otherwise."""
+        if self.contains(key, now):
+            return True
+        self.add(key, now)
+        return False
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._current) + len(self._previous)
+
+
+class VitalsDeduplicator:
+    """
+    Drop readings already seen within a time window.
+
+    ``backend`` is "lru" (exact, ~170 bytes per key) or "bloom" (fixed
+    memory, ~2.4 bytes per key at 1e-4 error rate, rare false positives).
+    """
+
+    def __init__(
+        self,
+        window_s: float = 600,
+        backend: str = "lru",
+        max_entries: int = 200000,
+        error_rate: float = 1e-4
+    ):
+        """Initialize vitals deduplicator."""
+        self.backend = backend.lower()
+        if self.backend == "bloom":
+            self._seen = RotatingBloomFilter(window_s, max_entries, error_rate)
+        elif self.backend == "lru":
+            self._seen = LRUKeySet(window_s, max_entries)
+        else:
+            raise ValueError(f"Unknown dedup backend '{backend}' (use lru or bloom)")
+        self.window_s = window_s
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.checked = 0
+        self.duplicates = 0
+        self.unkeyed = 0
+
+    def is_duplicate(self, vitals_data: Dict[str, Any]) -> bool:
+        """
+        True if the reading was already processed within the window.
+
+        Only checks: call ``remember`` once the reading has been processed,
+        so a reading whose processing failed is not dropped on retry.
+        """
+        key = dedup_key(vitals_data)
+        with self._lock:
+            self.checked += 1
+            if key is None:
+                self.unkeyed += 1
+                return False
+            duplicate = self._seen.contains(key, time.monotonic())
+            if duplicate:
+                self.duplicates += 1
+            return duplicate
+
+    def remember(self, vitals_data: Dict[str, Any]):
+        """Record a successfully processed reading."""
+        self.remember_many([vitals_data])
+
+    def remember_many(self, vitals_list: List[Dict[str, Any]]):
+        """Record successfully processed readings."""
+        keys = [key for key in map(dedup_key, vitals_list) if key is not None]
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                self._seen.add(key, now)
+
+    def filter(self, vitals_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Readings that are not duplicates (of the window or each other); records nothing."""
+        kept, batch_keys = [], set()
+        for vitals_data in vitals_list:
+            key = dedup_key(vitals_data)
+            if key is not None and key in batch_keys:
+                with self._lock:
+                    self.checked += 1
+                    self.duplicates += 1
+                continue
+            if not self.is_duplicate(vitals_data):
+                kept.append(vitals_data)
+                if key is not None:
+                    batch_keys.add(key)
+        return kept
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Duplicate counts and index size."""
+        return {
+            "backend": self.backend,
+            "window_s": self.window_s,
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "duplicate_rate": round(self.duplicates / self.checked, 4) if self.checked else 0.0,
+            "unkeyed": self.unkeyed,
+            "entries": len(self._seen),
+            "memory_bytes": self._seen.memory_bytes,
+        }
+
+
+def create_vitals_dedup() -> Optional[VitalsDeduplicator]:
+    """Build the vitals deduplicator from settings (None when disabled)."""
+    if not settings.VITALS_DEDUP_ENABLED:
+        return None
+    return VitalsDeduplicator(
+        window_s=settings.VITALS_DEDUP_WINDOW_S,
+        backend=settings.VITALS_DEDUP_BACKEND,
+        max_entries=settings.VITALS_DEDUP_MAX_ENTRIES,
+        error_rate=settings.VITALS_DEDUP_ERROR_RATE
+    )
+
+
+# Global vitals deduplicator for the ingest API (each VitalsProcessor has its own)
+vitals_dedup = create_vitals_dedup()
@@ -0,0 +1,237 @@
+"""Vectorized early-warning scores (NEWS2 / MEWS) over whole batches of readings.
+
+Each model is data: per-channel bands of ``(upper bound, points)``, read
+as "value <= upper bound scores points" in increasing order, plus the
+aggregate thresholds that map a total to a risk level. Scoring N readings
+is one ``np.searchsorted`` per channel.
+
+Only the physiological parameters present in the vitals feed are scored;
+consciousness (ACVPU) and supplemental oxygen are not recorded, so the
+totals are lower bounds of the full charts.
+
+NEWS2 clinical response -> risk level (alerts are raised from "medium";
+"high" and "critical" also queue agent analysis and email):
+
+    aggregate 0-4                    low       ward-based monitoring
+    any single parameter scoring 3   high      urgent review by a clinician
+    aggregate 5-6                    medium    urgent ward review
+    aggregate 7+                     critical  emergency response
+
+A reading gets the higher of its aggregate and single-parameter levels.
+
+The model total is returned as ``early_warning_score``. ``risk_score``
+keeps its original 0-100 meaning (RISK_POINTS for each vital outside its
+normal range), whichever model sets the level.
+"""
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from backend.core.config import settings
+from bisect import bisect_left, bisect_right
+import numpy as np
+import math
+
+INF = math.inf
+
+# Royal College of Physicians NEWS2 (2017), SpO2 scale 1
+NEWS2 = {
+    "bands": {
+        "respiratory_rate": ((8, 3), (11, 1), (20, 0), (24, 2), (INF, 3)),
+        "o2_saturation": ((91, 3), (93, 2), (95, 1), (INF, 0)),
+        "bp_systolic": ((90, 3), (100, 2), (110, 1), (219, 0), (INF, 3)),
+        "heart_rate": ((40, 3), (50, 1), (90, 0), (110, 1), (130, 2), (INF, 3)),
+        "temperature": ((35.0, 3), (36.0, 1), (38.0, 0), (39.0, 1), (INF, 2)),
+    },
+    # (minimum total, level), highest first: 5-6 calls for an urgent ward
+    # review, 7+ for an emergency response
+    "levels": ((7, "critical"), (5, "medium"), (0, "low")),
+    # A single parameter scoring this much (a red score) is at least "high"
+    "single_parameter": (3, "high"),
+}
+
+# Modified Early Warning Score (Subbe et al. 2001), without AVPU
+MEWS = {
+    "bands": {
+        "bp_systolic": ((70, 3), (80, 2), (100, 1), (199, 0), (INF, 2)),
+        "heart_rate": ((40, 2), (50, 1), (100, 0), (110, 1), (129, 2), (INF, 3)),
+        "respiratory_rate": ((8, 2), (14, 0), (20, 1), (29, 2), (INF, 3)),
+        "temperature": ((34.9, 2), (38.4, 0), (INF, 2)),
+    },
+    "levels": ((5, "critical"), (4, "high"), (3, "medium"), (0, "low")),
+    "single_parameter": (3, "medium"),
+}
+
+MODELS = {"news2": NEWS2, "mews": MEWS}
+
+# (channel, low, high, points): a value below low or above high adds points
+# to the 0-100 risk_score
+RISK_POINTS = (
+    ("heart_rate", 50, 120, 30),
+    ("bp_systolic", 90, 180, 25),
+    ("o2_saturation", 92, INF, 35),
+    ("temperature", 36.0, 38.5, 10),
+)
+
+LEVEL_ORDER = ("low", "medium", "high", "critical")
+
+
+def _value(record: Dict[str, Any], channel: str) -> float:
+    """A channel's value as float, NaN where missing or invalid."""
+    value = record.get(channel)
+    if value is None or value == "":
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class EarlyWarningScorer:
+    """Score readings against one banding model."""
+
+    def __init__(self, model: Dict[str, Any], name: str = "custom"):
+        """Initialize early warning scorer."""
+        self.name = name
+        # Channels the model scores, then any only risk_score reads (matrix columns)
+        self.scored_channels: Tuple[str, ...] = tuple(model["bands"])
+        self.channels: Tuple[str, ...] = self.scored_channels + tuple(
+            channel for channel, _, _, _ in RISK_POINTS if channel not in self.scored_channels
+        )
+        self._uppers = [np.array([upper for upper, _ in model["bands"][c]], dtype=np.float64) for c in self.scored_channels]
+        self._points = [np.array([points for _, points in model["bands"][c]], dtype=np.int8) for c in self.scored_channels]
+        self._risk_points = [
+            (self.channels.index(channel), low, high, points) for channel, low, high, points in RISK_POINTS
+        ]
+
+        levels = sorted(model["levels"], key=lambda item: item[0])
+        self._level_floors = np.array([floor for floor, _ in levels], dtype=np.int64)
+        self._level_codes = np.array([LEVEL_ORDER.index(level) for _, level in levels], dtype=np.int8)
+        single_points, single_level = model.get("single_parameter", (INF, "low"))
+        self._single_points = single_points
+        self._single_code = LEVEL_ORDER.index(single_level)
+
+        # Plain-list copies for scoring one reading without NumPy overhead
+        self._bands = [
+            (c, [upper for upper, _ in model["bands"][c]], [points for _, points in model["bands"][c]])
+            for c in self.scored_channels
+        ]
+        self._floor_list = [floor for floor, _ in levels]
+        self._code_list = [LEVEL_ORDER.index(level) for _, level in levels]
+
+    def score_matrix(self, matrix: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Score an (n, len(channels)) float matrix (NaN = not measured).
+
+        Returns:
+            Arrays: ``components`` (n, scored_channels) int8, ``total``,
+            ``risk_score`` (0-100), ``level_code`` (index into LEVEL_ORDER)
+            and ``measured`` (number of scored channels) per row
+        """
+        n = matrix.shape[0]
+        scored = len(self.scored_channels)
+        components = np.zeros((n, scored), dtype=np.int8)
+        missing = np.isnan(matrix)
+        for c in range(scored):
+            band = np.searchsorted(self._uppers[c], matrix[:, c], side="left")
+            np.minimum(band, len(self._points[c]) - 1, out=band)
+            components[:, c] = np.where(missing[:, c], 0, self._points[c][band])
+
+        total = components.sum(axis=1, dtype=np.int64)
+        level_code = self._level_codes[np.searchsorted(self._level_floors, total, side="right") - 1]
+        single = components.max(axis=1, initial=0) >= self._single_points
+        level_code = np.where(single, np.maximum(level_code, self._single_code), level_code)
+
+        risk_score = np.zeros(n, dtype=np.int64)
+        with np.errstate(invalid="ignore"):
+            for c, low, high, points in self._risk_points:
+                risk_score += np.where((matrix[:, c] < low) | (matrix[:, c] > high), points, 0)
+        return {
+            "components": components,
+            "total": total,
+            "risk_score": np.minimum(100, risk_score),
+            "level_code": level_code,
+            "measured": (~missing[:, :scored]).sum(axis=1),
+        }
+
+    def score_values(self, record: Dict[str, Any]) -> Tuple[int, int]:
+        """
+        Score one vitals dict the same way as score_matrix, in pure Python.
+
+        Returns:
+            (total, level_code, risk_score)
+        """
+        total = 0
+        worst = 0
+        for channel, uppers, band_points in self._bands:
+            value = _value(record, channel)
+            if math.isnan(value):
+                continue
+            points = band_points[min(bisect_left(uppers, value), len(band_points) - 1)]
+            total += points
+            worst = max(worst, points)
+        level_code = self._code_list[bisect_right(self._floor_list, total) - 1]
+        if worst >= self._single_points:
+            level_code = max(level_code, self._single_code)
+
+        risk_score = 0
+        for channel, low, high, points in RISK_POINTS:
+            value = _value(record, channel)
+            if value < low or value > high:
+                risk_score += points
+        return total, level_code, min(100, risk_score)
+
+    def matrix_from_records(self, records: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """(n, channels) float matrix from vitals dicts (NaN where missing/invalid)."""
+        matrix = np.full((len(records), len(self.channels)), np.nan, dtype=np.float64)
+        for i, record in enumerate(records):
+            for c, channel in enumerate(self.channels):
+                value = record.get(channel)
+                if value is None or value == "":
+                    continue
+                try:
+                    matrix[i, c] = float(value)
+                except (TypeError, ValueError):
+                    pass
+        return matrix
+
+    def select(self, matrix: np.ndarray, channels: Sequence[str]) -> np.ndarray:
+        """Reorder a matrix with columns ``channels`` to this model's channels."""
+        index = {channel: i for i, channel in enumerate(channels)}
+        out = np.full((matrix.shape[0], len(self.channels)), np.nan, dtype=np.float64)
+        for c, channel in enumerate(self.channels):
+            if channel in index:
+                out[:, c] = matrix[:, index[channel]]
+        return out
+
+    def describe(self, scored: Dict[str, np.ndarray], row: int, matrix: np.ndarray) -> Dict[str, Any]:
+        """Risk-score dict (the single-patient API shape) for one scored row."""
+        components = dict(zip(self.scored_channels, scored["components"][row].tolist()))
+        values = matrix[row].tolist()
+        return {
+            "risk_score": int(scored["risk_score"][row]),
+            "risk_level": LEVEL_ORDER[scored["level_code"][row]],
+            "early_warning_score": int(scored["total"][row]),
+            "score_model": self.name,
+            "components": components,
+            "concerns": [
+                f"{channel} {value:g} scores {components[channel]}"
+                for channel, value in zip(self.scored_channels, values)
+                if components[channel] > 0
+            ],
+        }
+
+    def score_records(self, records: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Score vitals dicts; one risk-score dict per record."""
+        matrix = self.matrix_from_records(records)
+        scored = self.score_matrix(matrix)
+        return [self.describe(scored, row, matrix) for row in range(len(records))]
+
+
+def get_scorer(name: Optional[str] = None) -> EarlyWarningScorer:
+    """Scorer for a named model (default RISK_SCORE_MODEL)."""
+    name = (name or settings.RISK_SCORE_MODEL).lower()
+    if name not in MODELS:
+        raise ValueError(f"Unknown early warning model '{name}' (available: {', '.join(MODELS)})")
+    return EarlyWarningScorer(MODELS[name], name)
+
+
+# Global scorer for the configured model
+early_warning = get_scorer()
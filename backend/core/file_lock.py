@@ -0,0 +1,45 @@
+"""Advisory file locks shared by every process writing the same data files."""
+from pathlib import Path
+import os
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows: locking is then per-process only
+    fcntl = None
+
+
+class FileLock:
+    """
+    Exclusive flock() on a lock file, re-entrant within one process.
+
+    Only keeps other processes out: callers serialize their own threads
+    (hold their threading lock while taking this one).
+    """
+
+    def __init__(self, path):
+        """Initialize file lock."""
+        self.path = Path(path)
+        self._fd = None
+        self._depth = 0
+
+    def __enter__(self):
+        if self._depth == 0:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,231 @@
+"""Content-addressed LLM response cache: in-memory LRU plus optional Redis."""
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from backend.core.config import settings
+from loguru import logger
+import threading
+import hashlib
+import asyncio
+import json
+import time
+
+
+def make_cache_key(
+    model: str,
+    prompt: str,
+    temperature: float,
+    use_grounding: bool,
+    max_tokens: Optional[int] = None
+) -> str:
+    """SHA-256 over the request; whitespace in the prompt is normalized."""
+    normalized = " ".join(prompt.split())
+    payload = json.dumps(
+        [model, normalized, round(float(temperature), 4), bool(use_grounding), max_tokens],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class InMemoryRedis:
+    """
+    Minimal stand-in for ``redis.Redis`` (get/set with expiry/delete/ping).
+
+    Used when GEMINI_CACHE_BACKEND=fake_redis so the Redis tier can be
+    exercised without a server.
+    """
+
+    def __init__(self):
+        """Initialize in-memory Redis."""
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def ping(self) -> bool:
+        return True
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(name)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name: str, value, ex: Optional[int] = None) -> bool:
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        with self._lock:
+            self._data[name] = (value, time.time() + ex if ex else None)
+        return True
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+
+class ResponseCache:
+    """
+    Two-tier response cache.
+
+    Entries live in a bounded in-memory LRU and, when a Redis client is
+    configured, in Redis so that other workers/processes share hits.
+    Each entry records how long the original call took, which is reported
+    as latency saved on every hit.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        redis_client=None,
+        namespace: str = "gemini:response:"
+    ):
+        """Initialize response cache."""
+        self.max_entries = max(1, max_entries)
+        self.redis = redis_client
+        self.namespace = namespace
+
+        self._entries: "OrderedDict[str, Tuple[float, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.redis_errors = 0
+        self.latency_saved_ms = 0.0
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+
+    def _get_local(self, key: str) -> Optional[Tuple[float, str, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _put_local(self, key: str, expires_at: float, value: str, latency_ms: float):
+        with self._lock:
+            self._entries[key] = (expires_at, value, latency_ms)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # ------------------------------------------------------------------
+    # Redis tier (blocking client calls run off the event loop)
+    # ------------------------------------------------------------------
+
+    def _redis_get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = self.redis.get(self.namespace + key)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Response cache Redis read failed: {e}")
+            return None
+
+    def _redis_set(self, key: str, payload: Dict[str, Any], ttl: int):
+        try:
+            self.redis.set(self.namespace + key, json.dumps(payload), ex=ttl)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Response cache Redis write failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[str]:
+        """Cached response for ``key``, or None on a miss."""
+        entry = self._get_local(key)
+        if entry is not None:
+            self.memory_hits += 1
+            self.latency_saved_ms += entry[2]
+            return entry[1]
+
+        if self.redis is not None:
+            payload = await asyncio.to_thread(self._redis_get, key)
+            if payload and payload.get("expires_at", 0) > time.time():
+                self.redis_hits += 1
+                self.latency_saved_ms += payload.get("latency_ms", 0.0)
+                self._put_local(key, payload["expires_at"], payload["value"], payload.get("latency_ms", 0.0))
+                return payload["value"]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str, ttl: int, latency_ms: float = 0.0):
+        """Store a response in both tiers for ``ttl`` seconds."""
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        self._put_local(key, expires_at, value, latency_ms)
+        self.stores += 1
+        if self.redis is not None:
+            payload = {"value": value, "expires_at": expires_at, "latency_ms": latency_ms}
+            await asyncio.to_thread(self._redis_set, key, payload, ttl)
+
+    def clear(self):
+        """Drop all in-memory entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss and latency-saved metrics."""
+        hits = self.memory_hits + self.redis_hits
+        lookups = hits + self.misses
+        return {
+            "backend": "memory+redis" if self.redis is not None else "memory",
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "redis_errors": self.redis_errors,
+            "latency_saved_ms": round(self.latency_saved_ms, 3),
+        }
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """Build the Gemini response cache from settings (None when disabled)."""
+    if not settings.GEMINI_CACHE_ENABLED:
+        return None
+
+    redis_client = None
+    backend = settings.GEMINI_CACHE_BACKEND.lower()
+    if backend == "redis":
+        try:
+            import redis
+            redis_client = redis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                password=settings.REDIS_PASSWORD or None,
+                socket_timeout=1.0,
+                socket_connect_timeout=1.0
+            )
+            redis_client.ping()
+        except Exception as e:
+            logger.warning(f"Redis unavailable for response cache, using memory only: {e}")
+            redis_client = None
+    elif backend == "fake_redis":
+        redis_client = InMemoryRedis()
+
+    return ResponseCache(max_entries=settings.GEMINI_CACHE_MAX_ENTRIES, redis_client=redis_client)
+
+
+# Global Gemini response cache
+response_cache = create_response_cache()
@@ -0,0 +1,206 @@
+"""Ward-wide priority index of the most at-risk patients.
+
+Every stored reading is scored (backend.core.early_warning) and its
+patient's entry re-keyed in a sorted list, ordered by risk level, then
+early warning total, then trend (how far the total sits above the
+patient's own moving average, i.e. getting worse). Re-keying is a binary
+search plus a list insert/delete; reading the top k is a slice.
+
+Callers that publish notifications pass ``notify_k``: updates report
+which patients entered or left the top ``notify_k``.
+"""
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from bisect import bisect_left, insort
+from backend.core.config import settings
+from backend.core.early_warning import early_warning, LEVEL_ORDER
+from backend.core.vitals_store import VITALS_CHANNELS, from_epoch
+from loguru import logger
+import numpy as np
+import threading
+import math
+
+
+class _Entry:
+    """Latest score for one patient."""
+
+    __slots__ = ("key", "total", "level_code", "risk_score", "trend", "average", "timestamp")
+
+    def __init__(self):
+        self.key: Optional[Tuple] = None
+        self.total = 0
+        self.level_code = 0
+        self.risk_score = 0
+        self.trend = 0.0
+        self.average = math.nan
+        self.timestamp = math.nan
+
+
+class RiskIndex:
+    """Patients ordered by early warning level, score and trend."""
+
+    def __init__(self, trend_alpha: float = 0.2, notify_k: int = 10):
+        """Initialize risk index."""
+        self.trend_alpha = trend_alpha
+        self.notify_k = max(1, notify_k)
+        self._order: List[Tuple] = []  # (-level_code, -total, -trend, patient_id)
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.updates = 0
+        self.membership_changes = 0
+
+    def _update(self, patient_id: str, total: int, level_code: int, risk_score: int, timestamp: float):
+        """Re-key one patient. Caller holds the lock."""
+        entry = self._entries.get(patient_id)
+        if entry is None:
+            entry = self._entries[patient_id] = _Entry()
+        elif not math.isnan(entry.timestamp) and timestamp < entry.timestamp:
+            return  # A late reading does not replace a newer score
+
+        if math.isnan(entry.average):
+            entry.average = float(total)
+        entry.trend = round(total - entry.average, 2)
+        entry.average += self.trend_alpha * (total - entry.average)
+        entry.total = total
+        entry.level_code = level_code
+        entry.risk_score = risk_score
+        entry.timestamp = timestamp
+
+        key = (-level_code, -total, -entry.trend, patient_id)
+        if key != entry.key:
+            if entry.key is not None:
+                del self._order[bisect_left(self._order, entry.key)]
+            insort(self._order, key)
+            entry.key = key
+        self.updates += 1
+
+    def _members(self) -> List[str]:
+        return [key[3] for key in self._order[:self.notify_k]]
+
+    def _diff(self, before: List[str]) -> Optional[Dict[str, Any]]:
+        """Top notify_k membership change since ``before``. Caller holds the lock."""
+        after = self._members()
+        if after == before:
+            return None
+        entered = [patient_id for patient_id in after if patient_id not in before]
+        left = [patient_id for patient_id in before if patient_id not in after]
+        if not entered and not left:
+            return None  # Reordered only
+        self.membership_changes += 1
+        return {"k": self.notify_k, "entered": entered, "left": left, "top": after}
+
+    def update(
+        self,
+        patient_id: str,
+        total: int,
+        level_code: int,
+        risk_score: int,
+        timestamp: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Record a patient's latest score.
+
+        Returns:
+            The top notify_k membership change, or None
+        """
+        with self._lock:
+            before = self._members()
+            self._update(str(patient_id), int(total), int(level_code), int(risk_score), float(timestamp))
+            return self._diff(before)
+
+    def update_many(
+        self,
+        patient_ids: Sequence[str],
+        totals: Sequence[int],
+        level_codes: Sequence[int],
+        risk_scores: Sequence[int],
+        timestamps: Sequence[float]
+    ) -> Optional[Dict[str, Any]]:
+        """Record a batch of scores (one membership diff for the whole batch)."""
+        with self._lock:
+            before = self._members()
+            for patient_id, total, level_code, risk_score, timestamp in zip(
+                patient_ids, totals, level_codes, risk_scores, timestamps
+            ):
+                self._update(str(patient_id), int(total), int(level_code), int(risk_score), float(timestamp))
+            return self._diff(before)
+
+    def score_reading(self, vitals_data: Dict[str, Any], timestamp: float) -> Optional[Dict[str, Any]]:
+        """Score one stored reading and record it."""
+        total, level_code, risk_score = early_warning.score_values(vitals_data)
+        return self.update(vitals_data["patient_id"], total, level_code, risk_score, timestamp)
+
+    def score_matrix(self, patient_ids: Sequence[str], timestamps: np.ndarray, values: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Score readings given as a (n, VITALS_CHANNELS) matrix and record them."""
+        if not len(patient_ids):
+            return None
+        scored = early_warning.score_matrix(early_warning.select(values, VITALS_CHANNELS))
+        return self.update_many(
+            patient_ids,
+            scored["total"].tolist(),
+            scored["level_code"].tolist(),
+            scored["risk_score"].tolist(),
+            timestamps.tolist()
+        )
+
+    def rebuild(self, buffer) -> int:
+        """
+        Replace the index with every resident patient's latest reading.
+
+        Args:
+            buffer: Warmed RecentVitalsBuffer
+
+        Returns:
+            Number of patients indexed
+        """
+        patient_ids, timestamps, values = buffer.latest_all()
+        keep = ~np.isnan(timestamps)
+        with self._lock:
+            self._order = []
+            self._entries = {}
+        self.score_matrix([pid for pid, ok in zip(patient_ids, keep) if ok], timestamps[keep], values[keep])
+        logger.info(f"Risk index built for {len(self._entries)} patients")
+        return len(self._entries)
+
+    def top(self, k: int, min_level: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The k highest-priority patients, optionally at or above a risk level."""
+        floor = LEVEL_ORDER.index(min_level) if min_level else 0
+        with self._lock:
+            results = []
+            for key in self._order:
+                if len(results) >= k or -key[0] < floor:
+                    break  # Sorted by level first: nothing further qualifies
+                entry = self._entries[key[3]]
+                results.append({
+                    "patient_id": key[3],
+                    "risk_score": entry.risk_score,
+                    "risk_level": LEVEL_ORDER[entry.level_code],
+                    "early_warning_score": entry.total,
+                    "trend": entry.trend,
+                    "timestamp": None if math.isnan(entry.timestamp) else from_epoch(entry.timestamp),
+                })
+            return results
+
+    def remove(self, patient_id: str):
+        with self._lock:
+            entry = self._entries.pop(str(patient_id), None)
+            if entry is not None and entry.key is not None:
+                del self._order[bisect_left(self._order, entry.key)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "patients": len(self._entries),
+                "notify_k": self.notify_k,
+                "updates": self.updates,
+                "membership_changes": self.membership_changes,
+                "score_model": early_warning.name,
+            }
+
+
+# Global risk index
+risk_index = RiskIndex(
+    trend_alpha=settings.RISK_INDEX_TREND_ALPHA,
+    notify_k=settings.RISK_INDEX_NOTIFY_K
+)
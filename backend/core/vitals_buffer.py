@@ -0,0 +1,317 @@
+"""Process-wide ring buffer of each patient's most recent vital signs."""
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from backend.core.config import settings
+from backend.core.vitals_store import VITALS_CHANNELS, to_epoch, from_epoch
+from loguru import logger
+import numpy as np
+import threading
+import math
+
+_UNKNOWN = object()
+
+
+class _PatientRing:
+    """Fixed-capacity circular arrays for one patient (timestamps + one row per channel)."""
+
+    __slots__ = ("timestamps", "values", "head", "count")
+
+    def __init__(self, capacity: int):
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values = np.full((len(VITALS_CHANNELS), capacity), np.nan, dtype=np.float32)
+        self.head = 0  # next write position
+        self.count = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.timestamps)
+
+    def push(self, timestamp: float, values: List[float]):
+        """Overwrite the oldest slot with a new reading."""
+        self.timestamps[self.head] = timestamp
+        self.values[:, self.head] = values
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def latest_indices(self, limit: int) -> np.ndarray:
+        """Slot indices of the newest ``limit`` readings, most recent first."""
+        n = min(limit, self.count)
+        return (self.head - 1 - np.arange(n)) % self.capacity
+
+
+def _channel_values(vitals_data: Dict[str, Any]) -> List[float]:
+    """Extract channel values from a vitals dict (NaN when missing)."""
+    values = []
+    for channel in VITALS_CHANNELS:
+        value = vitals_data.get(channel)
+        try:
+            values.append(math.nan if value is None or value == "" else float(value))
+        except (TypeError, ValueError):
+            values.append(math.nan)
+    return values
+
+
+class RecentVitalsBuffer:
+    """
+    Bounded, array-backed cache of the last N readings per patient.
+
+    Patients are kept in LRU order; once the memory budget is exhausted the
+    least recently updated patient is evicted and will be reloaded from
+    storage on next access.
+
+    Other processes (consumer workers, API workers) write the same storage.
+    Each ring remembers the store's ``version(patient_id)`` it is a faithful
+    tail of; ``get_fresh`` compares it with the current version (a stat
+    call) and reloads the patient from storage when someone else wrote.
+    """
+
+    def __init__(self, capacity: int = 256, memory_budget_mb: float = 64):
+        """Initialize recent vitals buffer."""
+        self.capacity = max(1, capacity)
+        self.bytes_per_patient = self.capacity * (8 + 4 * len(VITALS_CHANNELS))
+        self.max_patients = max(1, int(memory_budget_mb * 1024 * 1024) // self.bytes_per_patient)
+
+        self._rings: "OrderedDict[str, _PatientRing]" = OrderedDict()
+        # patient_id -> store version the ring matches (absent: unknown)
+        self._versions: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        # True while every patient in storage is resident (unknown patient => no vitals)
+        self._complete = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _ring_for(self, patient_id: str) -> _PatientRing:
+        """Get or create a patient's ring, evicting LRU patients over budget. Caller holds the lock."""
+        ring = self._rings.get(patient_id)
+        if ring is None:
+            while len(self._rings) >= self.max_patients:
+                evicted, _ = self._rings.popitem(last=False)
+                self._versions.pop(evicted, None)
+                self.evictions += 1
+                self._complete = False
+            ring = self._rings[patient_id] = _PatientRing(self.capacity)
+        else:
+            self._rings.move_to_end(patient_id)
+        return ring
+
+    def _load(self, patient_id: str, recent: List[Dict[str, Any]], version: Any = None):
+        """Replace a patient's ring with readings from storage (most recent first). Caller holds the lock."""
+        self._rings.pop(patient_id, None)
+        ring = self._ring_for(patient_id)
+        for row in reversed(recent[:self.capacity]):
+            try:
+                timestamp = to_epoch(row.get("timestamp"))
+            except (TypeError, ValueError):
+                # Unreadable time (stored before timestamps were validated)
+                continue
+            ring.push(timestamp, _channel_values(row))
+        if version is None:
+            self._versions.pop(patient_id, None)
+        else:
+            self._versions[patient_id] = version
+
+    def warm(self, store) -> int:
+        """
+        Load the most recent readings for every patient from a vitals store.
+
+        Args:
+            store: Vitals store exposing iter_recent(limit)
+
+        Returns:
+            Number of patients loaded
+        """
+        loaded = 0
+        with self._lock:
+            self._rings.clear()
+            self._versions.clear()
+            for patient_id, recent in store.iter_recent(self.capacity):
+                # Read after loading: a write racing the warm-up is picked up with the next one
+                self._load(str(patient_id), recent, store.version(str(patient_id)))
+                loaded += 1
+            self._complete = loaded <= self.max_patients
+        logger.info(f"Recent vitals buffer warmed with {loaded} patients")
+        return loaded
+
+    def record(self, vitals_data: Dict[str, Any], store=None, version_before: Any = None):
+        """
+        Add a reading that has just been written to storage.
+
+        A patient not yet resident is loaded from ``store`` (which already
+        contains this reading) so the ring stays a faithful tail of storage.
+
+        Args:
+            vitals_data: The reading
+            store: Vitals store it was written to
+            version_before: ``store.version(patient_id)`` read just before
+                the write; the ring stays marked fresh only if it matched
+                that version (nobody else wrote in between)
+        """
+        patient_id = vitals_data.get("patient_id")
+        if patient_id is not None:
+            self.record_patient(str(patient_id), [vitals_data], store, version_before)
+
+    def record_patient(
+        self,
+        patient_id: str,
+        readings: List[Dict[str, Any]],
+        store=None,
+        version_before: Any = None
+    ):
+        """Add one patient's readings that were just written together (see ``record``)."""
+        with self._lock:
+            if patient_id in self._rings or store is None or self._complete:
+                # A patient new to a complete buffer had nothing stored
+                known = self._versions.get(patient_id, _UNKNOWN) if patient_id in self._rings else None
+                ring = self._ring_for(patient_id)
+                for vitals_data in readings:
+                    ring.push(to_epoch(vitals_data.get("timestamp")), _channel_values(vitals_data))
+                if store is not None:
+                    if known is not _UNKNOWN and known == version_before:
+                        self._versions[patient_id] = store.version(patient_id)
+                    else:
+                        self._versions.pop(patient_id, None)
+                return
+        version = store.version(patient_id)
+        recent = store.get_recent(patient_id, self.capacity)
+        with self._lock:
+            self._load(patient_id, recent, version)
+
+    def get_fresh(self, patient_id: str, limit: int, store) -> List[Dict[str, Any]]:
+        """
+        A patient's most recent readings, reloading the ring from ``store``
+        first when another process wrote since it was filled.
+
+        Returns:
+            Vitals dicts, most recent first
+        """
+        patient_id = str(patient_id)
+        version = store.version(patient_id)
+        with self._lock:
+            fresh = patient_id in self._rings and self._versions.get(patient_id) == version
+        if version is None and not fresh:
+            # Nothing stored for this patient
+            return []
+        if fresh:
+            cached = self.get_recent(patient_id, limit)
+            if cached is not None:
+                return cached
+
+        recent = store.get_recent(patient_id, max(limit, self.capacity))
+        if recent:
+            with self._lock:
+                self._load(patient_id, recent, version)
+        return recent[:limit]
+
+    def in_sync(self, store) -> bool:
+        """True if no resident patient was written by another process since it was loaded."""
+        with self._lock:
+            versions = [(patient_id, self._versions.get(patient_id)) for patient_id in self._rings]
+        return all(
+            version is not None and store.version(patient_id) == version
+            for patient_id, version in versions
+        )
+
+    def get_recent(self, patient_id: str, limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get a patient's most recent readings from memory.
+
+        Returns:
+            Vitals dicts (most recent first), or None if the buffer cannot
+            answer without reading storage
+        """
+        patient_id = str(patient_id)
+        with self._lock:
+            ring = self._rings.get(patient_id)
+            if ring is None:
+                if self._complete:
+                    self.hits += 1
+                    return []
+                self.misses += 1
+                return None
+            if limit > ring.count and ring.count == ring.capacity:
+                # Older readings may exist in storage beyond the ring
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            indices = ring.latest_indices(limit)
+            # Arrival order can differ from reading time; order by timestamp
+            indices = indices[np.argsort(-ring.timestamps[indices], kind="stable")]
+            timestamps = ring.timestamps[indices]
+            values = ring.values[:, indices]
+
+        result = []
+        for i, timestamp in enumerate(timestamps):
+            row: Dict[str, Any] = {"patient_id": patient_id}
+            for c, channel in enumerate(VITALS_CHANNELS):
+                value = float(values[c, i])
+                # float32 keeps ~7 significant digits; round-trip through that precision
+                row[channel] = None if math.isnan(value) else float(f"{value:.7g}")
+            row["timestamp"] = from_epoch(timestamp)
+            result.append(row)
+        return result
+
+    @property
+    def complete(self) -> bool:
+        """True while every stored patient is resident."""
+        return self._complete
+
+    def patient_ids(self) -> List[str]:
+        """IDs of resident patients, least recently used first."""
+        with self._lock:
+            return list(self._rings)
+
+    def latest_all(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Every resident patient's most recent reading, as arrays.
+
+        Returns:
+            (patient_ids, timestamps, values) with values shaped
+            (patients, len(VITALS_CHANNELS)), NaN where not measured
+        """
+        with self._lock:
+            patient_ids = list(self._rings)
+            timestamps = np.empty(len(patient_ids), dtype=np.float64)
+            values = np.empty((len(patient_ids), len(VITALS_CHANNELS)), dtype=np.float64)
+            for i, ring in enumerate(self._rings.values()):
+                if ring.count == 0:
+                    timestamps[i] = np.nan
+                    values[i] = np.nan
+                    continue
+                # Slots 0..count-1 are filled; arrival order can differ from reading time
+                slot = int(np.argmax(ring.timestamps[:ring.count]))
+                timestamps[i] = ring.timestamps[slot]
+                values[i] = ring.values[:, slot]
+        return patient_ids, timestamps, values
+
+    def get_channel(self, patient_id: str, channel: str, limit: Optional[int] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Get (timestamps, values) arrays for one channel, oldest first, or None if not resident."""
+        with self._lock:
+            ring = self._rings.get(str(patient_id))
+            if ring is None:
+                return None
+            indices = ring.latest_indices(limit or ring.count)[::-1]
+            c = VITALS_CHANNELS.index(channel)
+            return ring.timestamps[indices].copy(), ring.values[c, indices].astype(np.float64)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Buffer occupancy and hit statistics."""
+        with self._lock:
+            patients = len(self._rings)
+            return {
+                "patients": patients,
+                "max_patients": self.max_patients,
+                "capacity_per_patient": self.capacity,
+                "memory_bytes": patients * self.bytes_per_patient,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Global recent vitals buffer
+recent_vitals = RecentVitalsBuffer(
+    capacity=settings.VITALS_BUFFER_CAPACITY,
+    memory_budget_mb=settings.VITALS_BUFFER_MEMORY_MB
+)
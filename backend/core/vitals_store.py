@@ -0,0 +1,508 @@
+"""Append-only columnar storage for patient vital signs.
+
+Layout on disk (one directory per patient):
+
+    <root>/<patient_id>/active.log                       append log (fixed-width binary records)
+    <root>/<patient_id>/<YYYYMMDD>/<first_ts_us>-<seq>/   sealed segment, one .npy file per column
+
+New readings are appended to the patient's log. Once the log reaches
+``segment_rows`` records, or a reading arrives for a new UTC day, the log is
+sealed into a columnar segment inside that day's partition (``seq`` tells
+apart segments whose first readings share a timestamp). Readings may
+arrive late, so neither the log nor the segments are in time order: the
+last N vitals come from the log plus the segments of the newest days, and
+days older than the N-th newest reading are never opened.
+
+Several consumer processes may write the same patient: appends, seals and
+reads hold ``<root>/<patient_id>/.lock`` and re-check the log under it.
+
+Only the channels in VITALS_CHANNELS are stored. Readings carrying values
+in other fields are rejected (not written, and not counted as written)
+rather than stored without them.
+"""
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote, unquote
+from backend.core.file_lock import FileLock
+from loguru import logger
+import numpy as np
+import pandas as pd
+import threading
+import shutil
+import math
+import os
+
+
+VITALS_CHANNELS = (
+    "heart_rate",
+    "bp_systolic",
+    "bp_diastolic",
+    "o2_saturation",
+    "temperature",
+    "respiratory_rate",
+)
+
+RECORD_DTYPE = np.dtype(
+    [("timestamp", "<f8")] + [(channel, "<f8") for channel in VITALS_CHANNELS]
+)
+
+LOG_FILE = "active.log"
+LOCK_FILE = ".lock"
+STORED_FIELDS = frozenset(("patient_id", "timestamp") + VITALS_CHANNELS)
+
+
+def to_epoch(timestamp: Any) -> float:
+    """Convert an ISO timestamp (naive = UTC) or datetime to epoch seconds."""
+    if timestamp is None or (isinstance(timestamp, float) and math.isnan(timestamp)):
+        return datetime.now(timezone.utc).timestamp()
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if not isinstance(timestamp, datetime):
+        timestamp = datetime.fromisoformat(str(timestamp).replace("Z", "+00:00"))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+def from_epoch(epoch: float) -> str:
+    """Convert epoch seconds to a naive UTC ISO timestamp (matches the CSV format)."""
+    return datetime.fromtimestamp(float(epoch), tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def normalize_timestamp(timestamp: Any) -> str:
+    """
+    Validate an ISO-8601 reading time and return it as stored (naive UTC).
+
+    Raises:
+        ValueError: Not an ISO-8601 date/time
+    """
+    if isinstance(timestamp, datetime):
+        return from_epoch(to_epoch(timestamp))
+    try:
+        return from_epoch(to_epoch(datetime.fromisoformat(str(timestamp).replace("Z", "+00:00"))))
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ValueError(f"Invalid timestamp {timestamp!r}: expected ISO-8601") from None
+
+
+def _day_partition(epoch: float) -> str:
+    """UTC day partition key for a timestamp."""
+    return datetime.fromtimestamp(float(epoch), tz=timezone.utc).strftime("%Y%m%d")
+
+
+def _to_float(value: Any) -> float:
+    """Coerce a vital value to float, NaN when missing."""
+    if value is None or value == "":
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _has_value(value: Any) -> bool:
+    """True unless a field is empty (None, NaN or an empty string)."""
+    if value is None or value == "":
+        return False
+    return not (isinstance(value, float) and math.isnan(value))
+
+
+def _newest(records: np.ndarray, limit: int) -> np.ndarray:
+    """The ``limit`` records with the latest timestamps (in no particular order)."""
+    if len(records) <= limit:
+        return records
+    return records[np.argpartition(records["timestamp"], len(records) - limit)[len(records) - limit:]]
+
+
+class _LogState:
+    """Cached bookkeeping for a patient's open append log."""
+
+    __slots__ = ("rows", "first_ts", "signature")
+
+    def __init__(self, rows: int = 0, first_ts: Optional[float] = None):
+        self.rows = rows
+        self.first_ts = first_ts
+        # Stat of the log when rows/first_ts were last known to match it
+        self.signature: Optional[Tuple[int, int, int]] = None
+
+
+class ColumnarVitalsStore:
+    """Per-patient, time-partitioned columnar vitals store with an append log."""
+
+    def __init__(self, root_path: str = "./data/vitals/columnar", segment_rows: int = 4096):
+        """Initialize columnar vitals store."""
+        self.root_path = Path(root_path)
+        self.root_path.mkdir(parents=True, exist_ok=True)
+        self.segment_rows = max(1, segment_rows)
+        self._log_states: Dict[str, _LogState] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._file_locks: Dict[str, FileLock] = {}
+        self._locks_guard = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Paths and locking
+    # ------------------------------------------------------------------
+
+    def _patient_dir(self, patient_id: str) -> Path:
+        """Directory holding a patient's log and segments."""
+        return self.root_path / quote(str(patient_id), safe="")
+
+    def _lock(self, patient_id: str) -> threading.Lock:
+        """Get the write lock for a patient."""
+        with self._locks_guard:
+            lock = self._locks.get(patient_id)
+            if lock is None:
+                lock = self._locks[patient_id] = threading.Lock()
+            return lock
+
+    def _file_lock(self, patient_id: str) -> FileLock:
+        """Cross-process lock for a patient; take it while holding ``_lock``."""
+        with self._locks_guard:
+            lock = self._file_locks.get(patient_id)
+            if lock is None:
+                lock = self._file_locks[patient_id] = FileLock(self._patient_dir(patient_id) / LOCK_FILE)
+            return lock
+
+    def _segment_dirs(self, patient_dir: Path) -> List[Path]:
+        """Sealed segments for a patient, oldest first."""
+        if not patient_dir.exists():
+            return []
+        segments = []
+        for day_dir in sorted(p for p in patient_dir.iterdir() if p.is_dir()):
+            segments.extend(
+                sorted(p for p in day_dir.iterdir() if p.is_dir() and not p.name.endswith(".tmp"))
+            )
+        return segments
+
+    # ------------------------------------------------------------------
+    # Append log
+    # ------------------------------------------------------------------
+
+    def _read_log(self, log_path: Path, tail: Optional[int] = None) -> np.ndarray:
+        """Read complete records from an append log, optionally only the last ``tail``."""
+        if not log_path.exists():
+            return np.empty(0, dtype=RECORD_DTYPE)
+        itemsize = RECORD_DTYPE.itemsize
+        rows = log_path.stat().st_size // itemsize
+        start = 0 if tail is None else max(0, rows - tail)
+        count = rows - start
+        if count <= 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        with open(log_path, "rb") as f:
+            f.seek(start * itemsize)
+            data = f.read(count * itemsize)
+        return np.frombuffer(data, dtype=RECORD_DTYPE, count=len(data) // itemsize)
+
+    @staticmethod
+    def _log_signature(log_path: Path) -> Optional[Tuple[int, int, int]]:
+        """Identity of the log file's current contents, None if there is no log."""
+        try:
+            st = log_path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _log_state(self, patient_id: str) -> _LogState:
+        """
+        Open log state for a patient. Caller holds both locks.
+
+        Cached while the log is unchanged; another process appending or
+        sealing changes its stat, and the state is then rebuilt from disk.
+        """
+        patient_dir = self._patient_dir(patient_id)
+        log_path = patient_dir / LOG_FILE
+        state = self._log_states.get(patient_id)
+        signature = self._log_signature(log_path)
+        if state is not None and state.signature == signature:
+            return state
+
+        state = _LogState()
+        if signature is not None:
+            itemsize = RECORD_DTYPE.itemsize
+            size = signature[1]
+            if size % itemsize:
+                # Drop a torn trailing record left by a crash mid-write (no
+                # writer is active: every writer holds the file lock)
+                with open(log_path, "r+b") as f:
+                    f.truncate(size - size % itemsize)
+            records = self._read_log(log_path, tail=None)
+            if len(records):
+                if self._is_sealed(patient_dir, records):
+                    # Log was sealed but not truncated before a crash
+                    log_path.unlink()
+                else:
+                    state.rows = len(records)
+                    state.first_ts = float(records["timestamp"][0])
+
+        state.signature = self._log_signature(log_path)
+        self._log_states[patient_id] = state
+        return state
+
+    def _segment_prefix(self, patient_dir: Path, first_ts: float) -> Tuple[Path, str]:
+        """Day directory and name prefix of segments whose first record has ``first_ts``."""
+        return patient_dir / _day_partition(first_ts), f"{int(round(first_ts * 1e6)):017d}"
+
+    def _segment_path(self, patient_dir: Path, first_ts: float) -> Path:
+        """Unused segment directory for a log whose first record has ``first_ts``."""
+        day_dir, prefix = self._segment_prefix(patient_dir, first_ts)
+        seq = 0
+        while (day_dir / f"{prefix}-{seq:04d}").exists():
+            seq += 1
+        return day_dir / f"{prefix}-{seq:04d}"
+
+    def _is_sealed(self, patient_dir: Path, records: np.ndarray) -> bool:
+        """True if a segment already holds exactly these log records."""
+        day_dir, prefix = self._segment_prefix(patient_dir, float(records["timestamp"][0]))
+        if not day_dir.exists():
+            return False
+        for segment in day_dir.iterdir():
+            # Older segments are named without the -<seq> suffix
+            if segment.name != prefix and not segment.name.startswith(prefix + "-"):
+                continue
+            if segment.name.endswith(".tmp"):
+                continue
+            timestamps = np.load(segment / "timestamp.npy", mmap_mode="r")
+            if len(timestamps) == len(records) and np.array_equal(timestamps, records["timestamp"]):
+                return True
+        return False
+
+    def _seal(self, patient_id: str, state: _LogState):
+        """Convert the open log into a columnar segment. Caller holds the lock."""
+        patient_dir = self._patient_dir(patient_id)
+        log_path = patient_dir / LOG_FILE
+        records = self._read_log(log_path)
+        if len(records) == 0:
+            state.rows, state.first_ts = 0, None
+            state.signature = self._log_signature(log_path)
+            return
+
+        segment_path = self._segment_path(patient_dir, float(records["timestamp"][0]))
+        tmp_path = segment_path.with_name(segment_path.name + ".tmp")
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tmp_path.mkdir(parents=True)
+        for column in RECORD_DTYPE.names:
+            np.save(tmp_path / f"{column}.npy", np.ascontiguousarray(records[column]))
+        os.replace(tmp_path, segment_path)
+        log_path.unlink()
+
+        state.rows, state.first_ts, state.signature = 0, None, None
+
+    def _append_records(self, patient_id: str, records: np.ndarray):
+        """Append records (ascending by time) to a patient's log, sealing as needed."""
+        patient_dir = self._patient_dir(patient_id)
+        patient_dir.mkdir(parents=True, exist_ok=True)
+        log_path = patient_dir / LOG_FILE
+
+        with self._lock(patient_id), self._file_lock(patient_id):
+            state = self._log_state(patient_id)
+            start = 0
+            while start < len(records):
+                if state.rows and (
+                    state.rows >= self.segment_rows
+                    or _day_partition(records["timestamp"][start]) != _day_partition(state.first_ts)
+                ):
+                    self._seal(patient_id, state)
+
+                # Take as many records as fit in the current log and the current day
+                room = self.segment_rows - state.rows
+                day = _day_partition(records["timestamp"][start])
+                end = start + 1
+                while end < len(records) and end - start < room and _day_partition(records["timestamp"][end]) == day:
+                    end += 1
+
+                chunk = records[start:end]
+                with open(log_path, "ab") as f:
+                    f.write(chunk.tobytes())
+                if state.first_ts is None:
+                    state.first_ts = float(chunk["timestamp"][0])
+                state.rows += len(chunk)
+                state.signature = self._log_signature(log_path)
+                start = end
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def _to_records(self, rows: Iterable[Dict[str, Any]]) -> np.ndarray:
+        """Pack vitals dicts into a record array."""
+        rows = list(rows)
+        records = np.empty(len(rows), dtype=RECORD_DTYPE)
+        for i, row in enumerate(rows):
+            records[i] = (to_epoch(row.get("timestamp")),) + tuple(
+                _to_float(row.get(channel)) for channel in VITALS_CHANNELS
+            )
+        return records
+
+    def append(self, vitals_data: Dict[str, Any]) -> bool:
+        """Append a single vitals reading."""
+        return self.append_many([vitals_data]) == 1
+
+    async def append_durable(self, vitals_data: Dict[str, Any]) -> bool:
+        """Append a single vitals reading (one small binary write; nothing is queued)."""
+        return self.append(vitals_data)
+
+    def append_many(self, vitals_list: List[Dict[str, Any]]) -> int:
+        """
+        Append a batch of vitals readings.
+
+        Args:
+            vitals_list: Vitals dicts, each with a patient_id
+
+        Returns:
+            Number of rows written; rows without a patient_id, or with values
+            in fields outside STORED_FIELDS, are rejected and not counted
+        """
+        by_patient: Dict[str, List[Dict[str, Any]]] = {}
+        for row in vitals_list:
+            patient_id = row.get("patient_id")
+            if patient_id is None:
+                continue
+            extra = sorted(field for field, value in row.items() if field not in STORED_FIELDS and _has_value(value))
+            if extra:
+                logger.error(
+                    f"Rejected vitals for patient {patient_id}: fields {extra} are not stored by the columnar vitals store"
+                )
+                continue
+            by_patient.setdefault(str(patient_id), []).append(row)
+
+        written = 0
+        for patient_id, rows in by_patient.items():
+            try:
+                records = self._to_records(rows)
+                records = records[np.argsort(records["timestamp"], kind="stable")]
+                self._append_records(patient_id, records)
+                written += len(records)
+            except Exception as e:
+                logger.error(f"Error appending vitals for patient {patient_id}: {e}")
+        return written
+
+    def _load_segment(self, segment: Path) -> np.ndarray:
+        """Read a sealed segment into a record array."""
+        columns = {column: np.load(segment / f"{column}.npy") for column in RECORD_DTYPE.names}
+        records = np.empty(len(columns["timestamp"]), dtype=RECORD_DTYPE)
+        for column, values in columns.items():
+            records[column] = values
+        return records
+
+    def _read_tail(self, patient_id: str, limit: Optional[int]) -> np.ndarray:
+        """
+        Read the newest ``limit`` records by timestamp (all if None), oldest first.
+
+        Late readings can sit in the log or in any segment of their day, so
+        every segment of a day is considered (segments whose newest reading
+        cannot make the cut are skipped after a look at their timestamps);
+        older days are skipped once ``limit`` newer readings are in hand.
+        """
+        patient_dir = self._patient_dir(patient_id)
+        if not patient_dir.exists():
+            return np.empty(0, dtype=RECORD_DTYPE)
+        with self._lock(patient_id), self._file_lock(patient_id):
+            self._log_state(patient_id)
+            newest = self._read_log(patient_dir / LOG_FILE)
+            if limit is not None:
+                newest = _newest(newest, limit)
+
+            segments = self._segment_dirs(patient_dir)
+            for day in sorted({segment.parent.name for segment in segments}, reverse=True):
+                if limit is not None and len(newest) >= limit:
+                    day_end = datetime.strptime(day, "%Y%m%d").replace(tzinfo=timezone.utc).timestamp() + 86400
+                    if newest["timestamp"].min() >= day_end:
+                        break
+                for segment in reversed(segments):
+                    if segment.parent.name != day:
+                        continue
+                    if limit is not None and len(newest) >= limit:
+                        timestamps = np.load(segment / "timestamp.npy", mmap_mode="r")
+                        if len(timestamps) == 0 or timestamps.max() < newest["timestamp"].min():
+                            continue
+                    newest = np.concatenate([newest, self._load_segment(segment)])
+                    if limit is not None:
+                        newest = _newest(newest, limit)
+
+        return newest[np.argsort(newest["timestamp"], kind="stable")]
+
+    def _records_to_dicts(self, patient_id: str, records: np.ndarray) -> List[Dict[str, Any]]:
+        """Convert records to vitals dicts (NaN -> None)."""
+        result = []
+        for record in records:
+            row: Dict[str, Any] = {"patient_id": patient_id}
+            for channel in VITALS_CHANNELS:
+                value = float(record[channel])
+                row[channel] = None if math.isnan(value) else value
+            row["timestamp"] = from_epoch(record["timestamp"])
+            result.append(row)
+        return result
+
+    def get_recent(self, patient_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Get a patient's most recent vitals.
+
+        Args:
+            patient_id: Patient ID
+            limit: Maximum number of readings
+
+        Returns:
+            Vitals dicts, most recent first
+        """
+        if limit <= 0:
+            return []
+        records = self._read_tail(str(patient_id), limit)
+        records = records[np.argsort(records["timestamp"], kind="stable")[::-1]]
+        return self._records_to_dicts(str(patient_id), records)
+
+    def iter_recent(self, limit: int) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Yield (patient_id, most recent vitals) for every stored patient."""
+        for patient_id in self.patient_ids():
+            yield patient_id, self.get_recent(patient_id, limit)
+
+    def get_history(self, patient_id: str) -> pd.DataFrame:
+        """Get a patient's full vitals history, oldest first."""
+        records = self._read_tail(str(patient_id), None)
+        records = records[np.argsort(records["timestamp"], kind="stable")]
+        return pd.DataFrame(self._records_to_dicts(str(patient_id), records))
+
+    def patient_ids(self) -> List[str]:
+        """List patients with stored vitals."""
+        return sorted(unquote(p.name) for p in self.root_path.iterdir() if p.is_dir())
+
+    def version(self, patient_id: str):
+        """
+        Token that changes whenever a patient's stored vitals change (any process).
+
+        Built from the append log's stat and the newest day partition's
+        entries, which together change on every append and every seal.
+        None when nothing is stored for the patient.
+        """
+        patient_dir = self._patient_dir(str(patient_id))
+        try:
+            days = sorted(p.name for p in os.scandir(patient_dir) if p.is_dir())
+        except FileNotFoundError:
+            return None
+        newest = None
+        if days:
+            day_dir = patient_dir / days[-1]
+            st = day_dir.stat()
+            newest = (days[-1], len(os.listdir(day_dir)), st.st_mtime_ns)
+        try:
+            st = (patient_dir / LOG_FILE).stat()
+            log = (st.st_ino, st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            log = None
+        if log is None and newest is None:
+            return None
+        return log, newest
+
+    def read_all(self) -> pd.DataFrame:
+        """Read the full vitals history for all patients."""
+        frames = [self.get_history(patient_id) for patient_id in self.patient_ids()]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def seal_all(self):
+        """Seal every open append log into a segment."""
+        for patient_id in self.patient_ids():
+            with self._lock(patient_id), self._file_lock(patient_id):
+                self._seal(patient_id, self._log_state(patient_id))
@@ -0,0 +1,484 @@
+"""Per-patient, per-channel trend statistics maintained as readings arrive.
+
+For every channel the tracker keeps, in O(1) per reading:
+
+- a time-aware EWMA (half-life in seconds, so irregular sampling is
+  weighted by elapsed time rather than by reading count);
+- Welford mean/variance over a sliding time window (add and remove);
+- the least-squares slope over the same window, from running sums of
+  t, t^2 and t*y (t relative to a per-patient origin for precision).
+
+Queries read those values directly instead of sorting the history.
+State is checkpointed to ``TREND_CHECKPOINT_DIR``; on start the tracker
+loads the checkpoints and catches up from the recent vitals buffer, so
+no full history scan is needed.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict, deque
+from pathlib import Path
+from backend.core.config import settings
+from backend.core.vitals_store import VITALS_CHANNELS, to_epoch
+from loguru import logger
+import numpy as np
+import threading
+import math
+import time
+import os
+
+NAN = math.nan
+
+# Re-base slope sums once times drift this far from the patient's origin (s)
+_REBASE_AFTER_S = 86400.0
+
+
+class _ChannelStats:
+    """Window and EWMA state for one channel of one patient."""
+
+    __slots__ = ("n", "mean", "m2", "st", "stt", "sty", "ewma", "ewma_ts", "count", "last", "last_ts")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.st = 0.0
+        self.stt = 0.0
+        self.sty = 0.0
+        self.ewma = NAN
+        self.ewma_ts = NAN
+        self.count = 0
+        self.last = NAN
+        self.last_ts = NAN
+
+    def add(self, t: float, y: float):
+        self.n += 1
+        delta = y - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (y - self.mean)
+        self.st += t
+        self.stt += t * t
+        self.sty += t * y
+
+    def remove(self, t: float, y: float):
+        self.n -= 1
+        if self.n == 0:
+            self.mean = self.m2 = self.st = self.stt = self.sty = 0.0
+            return
+        delta = y - self.mean
+        self.mean -= delta / self.n
+        self.m2 = max(0.0, self.m2 - delta * (y - self.mean))
+        self.st -= t
+        self.stt -= t * t
+        self.sty -= t * y
+
+    def observe(self, t_abs: float, y: float, halflife: float):
+        """Lifetime state: EWMA, count and latest value."""
+        if self.count == 0 or math.isnan(self.ewma):
+            self.ewma = y
+        else:
+            # Same-time or late readings still move the average a little
+            dt = max(t_abs - self.ewma_ts, 1.0)
+            alpha = 1.0 - 0.5 ** (dt / halflife)
+            self.ewma += alpha * (y - self.ewma)
+        if math.isnan(self.ewma_ts) or t_abs > self.ewma_ts:
+            self.ewma_ts = t_abs
+        if math.isnan(self.last_ts) or t_abs >= self.last_ts:
+            self.last = y
+            self.last_ts = t_abs
+        self.count += 1
+
+    def slope(self) -> float:
+        """Least-squares slope (units per second) over the window."""
+        if self.n < 2:
+            return NAN
+        denominator = self.n * self.stt - self.st * self.st
+        if denominator <= 1e-9:
+            return NAN
+        return (self.n * self.sty - self.st * self.mean * self.n) / denominator
+
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else NAN
+
+
+class _PatientTrends:
+    """Sliding window of one patient's readings plus per-channel stats."""
+
+    __slots__ = ("window", "origin", "channels", "newest")
+
+    def __init__(self):
+        self.window: deque = deque()  # (t relative to origin, values)
+        self.origin: Optional[float] = None
+        self.channels = [_ChannelStats() for _ in VITALS_CHANNELS]
+        self.newest = NAN
+
+    def rebase(self, origin: float):
+        """Move the time origin; shift the window and every channel's sums."""
+        shift = origin - self.origin
+        self.window = deque((t - shift, values) for t, values in self.window)
+        for stats in self.channels:
+            # sum((t - s)^2) = stt - 2 s st + n s^2 ; sum((t - s) y) = sty - s n mean
+            stats.stt += -2 * shift * stats.st + stats.n * shift * shift
+            stats.sty -= shift * stats.n * stats.mean
+            stats.st -= stats.n * shift
+        self.origin = origin
+
+
+def _epoch(timestamp: Any) -> float:
+    if not timestamp:
+        return NAN
+    try:
+        return to_epoch(timestamp)
+    except (TypeError, ValueError):
+        return NAN
+
+
+def _num(value: Any) -> float:
+    if value is None or value == "":
+        return NAN
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+
+class VitalsTrendTracker:
+    """
+    Incremental trend statistics for every patient.
+
+    Windows are bounded by ``window_s`` seconds (relative to the patient's
+    newest reading) and ``max_points`` readings; patients are kept in LRU
+    order up to ``max_patients``. Readings that arrive late are counted
+    and expire with the newest ones.
+    """
+
+    def __init__(
+        self,
+        window_s: float = 3600,
+        max_points: int = 240,
+        halflife_s: float = 900,
+        max_patients: int = 20000,
+        checkpoint_dir: Optional[str] = None,
+        checkpoint_interval_s: float = 300
+    ):
+        """Initialize vitals trend tracker."""
+        self.window_s = window_s
+        self.max_points = max(2, max_points)
+        self.halflife_s = halflife_s
+        self.max_patients = max(1, max_patients)
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir else None
+        self.checkpoint_interval_s = checkpoint_interval_s
+        self.checkpoint_name = f"process-{os.getpid()}"
+
+        self._patients: "OrderedDict[str, _PatientTrends]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_checkpoint = time.monotonic()
+        self._checkpointing = False
+
+        # Metrics
+        self.updates = 0
+        self.evictions = 0
+        self.checkpoints = 0
+        self.restored = 0
+
+    # ------------------------------------------------------------------ updates
+
+    def update(self, vitals_data: Dict[str, Any]):
+        """Fold one stored reading into its patient's statistics."""
+        patient_id = vitals_data.get("patient_id")
+        if patient_id is None:
+            return
+        t_abs = _epoch(vitals_data.get("timestamp"))
+        if math.isnan(t_abs):
+            return
+        values = [_num(vitals_data.get(channel)) for channel in VITALS_CHANNELS]
+        with self._lock:
+            self._update(str(patient_id), t_abs, values)
+        self.maybe_checkpoint()
+
+    def update_many(self, vitals_list: List[Dict[str, Any]]):
+        """Fold a batch of stored readings (one lock acquisition)."""
+        rows = []
+        for vitals_data in vitals_list:
+            patient_id = vitals_data.get("patient_id")
+            t_abs = _epoch(vitals_data.get("timestamp"))
+            if patient_id is None or math.isnan(t_abs):
+                continue
+            rows.append((str(patient_id), t_abs, [_num(vitals_data.get(c)) for c in VITALS_CHANNELS]))
+        with self._lock:
+            for patient_id, t_abs, values in rows:
+                self._update(patient_id, t_abs, values)
+        self.maybe_checkpoint()
+
+    def _patient(self, patient_id: str) -> _PatientTrends:
+        """Get or create a patient's state, evicting LRU patients. Caller holds the lock."""
+        state = self._patients.get(patient_id)
+        if state is None:
+            while len(self._patients) >= self.max_patients:
+                self._patients.popitem(last=False)
+                self.evictions += 1
+            state = self._patients[patient_id] = _PatientTrends()
+        else:
+            self._patients.move_to_end(patient_id)
+        return state
+
+    def _update(self, patient_id: str, t_abs: float, values: List[float]):
+        state = self._patient(patient_id)
+        if state.origin is None:
+            state.origin = t_abs
+        elif t_abs - state.origin > _REBASE_AFTER_S:
+            state.rebase(state.window[0][0] + state.origin if state.window else t_abs)
+        t = t_abs - state.origin
+
+        for stats, y in zip(state.channels, values):
+            if not math.isnan(y):
+                stats.add(t, y)
+                stats.observe(t_abs, y, self.halflife_s)
+        state.window.append((t, values))
+        if math.isnan(state.newest) or t_abs > state.newest:
+            state.newest = t_abs
+
+        # Expire by age (relative to the newest reading) and by count
+        horizon = state.newest - state.origin - self.window_s
+        window = state.window
+        while window and (window[0][0] < horizon or len(window) > self.max_points):
+            old_t, old_values = window.popleft()
+            for stats, y in zip(state.channels, old_values):
+                if not math.isnan(y):
+                    stats.remove(old_t, y)
+        self.updates += 1
+
+    # ------------------------------------------------------------------ queries
+
+    def get_trends(self, patient_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Current trend statistics for each measured channel.
+
+        ``trend`` is "stable" unless the fitted change across the window
+        exceeds one standard deviation of the window's readings.
+        """
+        with self._lock:
+            state = self._patients.get(str(patient_id))
+            if state is None:
+                return {}
+            span = (state.window[-1][0] - state.window[0][0]) if state.window else 0.0
+            trends = {}
+            for channel, stats in zip(VITALS_CHANNELS, state.channels):
+                if stats.count == 0:
+                    continue
+                slope = stats.slope()
+                std = stats.std()
+                change = slope * span if not math.isnan(slope) else NAN
+                if math.isnan(change) or abs(change) <= (std if not math.isnan(std) else 0.0):
+                    trend = "stable"
+                else:
+                    trend = "increasing" if change > 0 else "decreasing"
+                trends[channel] = {
+                    "current": stats.last,
+                    "ewma": _round(stats.ewma),
+                    "mean": _round(stats.mean) if stats.n else None,
+                    "std": _round(std),
+                    "slope_per_hour": _round(slope * 3600.0),
+                    "change_over_window": _round(change),
+                    "trend": trend,
+                    "window_points": stats.n,
+                    "count": stats.count,
+                }
+            return trends
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "patients": len(self._patients),
+                "max_patients": self.max_patients,
+                "window_s": self.window_s,
+                "updates": self.updates,
+                "evictions": self.evictions,
+                "checkpoints": self.checkpoints,
+                "restored_patients": self.restored,
+            }
+
+    # ------------------------------------------------------------------ checkpoints
+
+    def _snapshot(self) -> Dict[str, np.ndarray]:
+        """Arrays describing every patient's state. Caller holds the lock."""
+        channels = len(VITALS_CHANNELS)
+        patient_ids, offsets, rows = [], [0], []
+        lifetime = np.empty((len(self._patients), 5, channels), dtype=np.float64)
+        for i, (patient_id, state) in enumerate(self._patients.items()):
+            patient_ids.append(patient_id)
+            for t, values in state.window:
+                rows.append([t + state.origin] + list(values))
+            offsets.append(len(rows))
+            for c, stats in enumerate(state.channels):
+                lifetime[i, :, c] = (stats.ewma, stats.ewma_ts, stats.count, stats.last, stats.last_ts)
+        return {
+            "patient_ids": np.array(patient_ids, dtype=str),
+            "offsets": np.array(offsets, dtype=np.int64),
+            "rows": np.array(rows, dtype=np.float64).reshape(-1, 1 + channels),
+            "lifetime": lifetime,
+        }
+
+    def _restore_patient(self, patient_id: str, rows: np.ndarray, lifetime: np.ndarray):
+        """Rebuild one patient from checkpoint arrays. Caller holds the lock."""
+        self._patients.pop(patient_id, None)
+        state = self._patient(patient_id)
+        for row in rows:
+            t_abs = float(row[0])
+            if state.origin is None:
+                state.origin = t_abs
+            t = t_abs - state.origin
+            values = [float(v) for v in row[1:]]
+            for stats, y in zip(state.channels, values):
+                if not math.isnan(y):
+                    stats.add(t, y)
+            state.window.append((t, values))
+            state.newest = t_abs if math.isnan(state.newest) else max(state.newest, t_abs)
+        for c, stats in enumerate(state.channels):
+            stats.ewma, stats.ewma_ts, count, stats.last, stats.last_ts = (float(v) for v in lifetime[:, c])
+            stats.count = int(count)
+        if state.origin is None:
+            state.origin = float(np.nanmax(lifetime[4])) if not np.all(np.isnan(lifetime[4])) else 0.0
+        if math.isnan(state.newest) and not np.all(np.isnan(lifetime[4])):
+            state.newest = float(np.nanmax(lifetime[4]))
+
+    @staticmethod
+    def _read_checkpoint(path: Path) -> Dict[str, Tuple[np.ndarray, np.ndarray, float]]:
+        """{patient_id: (window rows, lifetime, newest timestamp)} from one file."""
+        with np.load(path) as data:
+            patient_ids, offsets = data["patient_ids"], data["offsets"]
+            rows, lifetime = data["rows"], data["lifetime"]
+        states = {}
+        for i, patient_id in enumerate(patient_ids):
+            last_ts = lifetime[i, 4]
+            newest = float(np.nanmax(last_ts)) if not np.all(np.isnan(last_ts)) else -math.inf
+            states[str(patient_id)] = (rows[offsets[i]:offsets[i + 1]], lifetime[i], newest)
+        return states
+
+    def checkpoint(self):
+        """
+        Write this process's state to ``<checkpoint_dir>/<name>.npz``.
+
+        Processes sharing a name (e.g. several API workers) merge: patients
+        another process saved with newer data are kept.
+        """
+        if self.checkpoint_dir is None:
+            return
+        with self._lock:
+            snapshot = self._snapshot()
+        try:
+            self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+            path = self.checkpoint_dir / f"{self.checkpoint_name}.npz"
+            if path.exists():
+                snapshot = self._merge(snapshot, self._read_checkpoint(path))
+            tmp_path = path.with_suffix(".tmp.npz")
+            np.savez(tmp_path, **snapshot)
+            os.replace(tmp_path, path)
+            self.checkpoints += 1
+        except Exception as e:
+            logger.error(f"Error writing vitals trend checkpoint: {e}")
+
+    def _merge(self, snapshot: Dict[str, np.ndarray], existing) -> Dict[str, np.ndarray]:
+        """Add patients from an existing checkpoint that are missing or newer there."""
+        ours = {str(pid): i for i, pid in enumerate(snapshot["patient_ids"])}
+        extra = []
+        for patient_id, (rows, lifetime, newest) in existing.items():
+            i = ours.get(patient_id)
+            if i is not None:
+                our_ts = snapshot["lifetime"][i, 4]
+                our_newest = float(np.nanmax(our_ts)) if not np.all(np.isnan(our_ts)) else -math.inf
+                if our_newest >= newest:
+                    continue
+            extra.append((patient_id, rows, lifetime))
+        if not extra:
+            return snapshot
+
+        replaced = {e[0] for e in extra}
+        keep = [i for pid, i in ours.items() if pid not in replaced]
+        patient_ids = [str(snapshot["patient_ids"][i]) for i in keep] + [e[0] for e in extra]
+        row_blocks = [snapshot["rows"][snapshot["offsets"][i]:snapshot["offsets"][i + 1]] for i in keep]
+        row_blocks += [e[1] for e in extra]
+        offsets = np.concatenate([[0], np.cumsum([len(block) for block in row_blocks])]).astype(np.int64)
+        width = 1 + len(VITALS_CHANNELS)
+        return {
+            "patient_ids": np.array(patient_ids, dtype=str),
+            "offsets": offsets,
+            "rows": np.concatenate(row_blocks) if row_blocks else np.empty((0, width)),
+            "lifetime": np.stack([snapshot["lifetime"][i] for i in keep] + [e[2] for e in extra]),
+        }
+
+    def maybe_checkpoint(self):
+        """Checkpoint in the background every checkpoint_interval_s."""
+        if self.checkpoint_dir is None or self._checkpointing:
+            return
+        if time.monotonic() - self._last_checkpoint < self.checkpoint_interval_s:
+            return
+        self._checkpointing = True
+        self._last_checkpoint = time.monotonic()
+
+        def run():
+            try:
+                self.checkpoint()
+            finally:
+                self._checkpointing = False
+
+        threading.Thread(target=run, name="vitals-trends-checkpoint", daemon=True).start()
+
+    def restore(self, buffer=None, name: Optional[str] = None) -> int:
+        """
+        Load every checkpoint in checkpoint_dir (newest state per patient
+        wins), then apply readings from ``buffer`` (a RecentVitalsBuffer)
+        that are newer than the checkpoint.
+
+        Args:
+            buffer: Warmed recent vitals buffer to catch up from
+            name: Checkpoint file name this process writes to
+
+        Returns:
+            Number of patients restored from checkpoints
+        """
+        if name:
+            self.checkpoint_name = name
+        states: Dict[str, Tuple[np.ndarray, np.ndarray, float]] = {}
+        if self.checkpoint_dir is not None and self.checkpoint_dir.exists():
+            for path in sorted(self.checkpoint_dir.glob("*.npz")):
+                if path.name.endswith(".tmp.npz"):
+                    continue
+                try:
+                    for patient_id, state in self._read_checkpoint(path).items():
+                        if patient_id not in states or state[2] > states[patient_id][2]:
+                            states[patient_id] = state
+                except Exception as e:
+                    logger.error(f"Error reading vitals trend checkpoint {path}: {e}")
+
+        with self._lock:
+            self._patients.clear()
+            for patient_id, (rows, lifetime, _) in states.items():
+                self._restore_patient(patient_id, rows, lifetime)
+            self.restored = len(states)
+
+        caught_up = 0
+        if buffer is not None:
+            for patient_id in buffer.patient_ids():
+                recent = buffer.get_recent(patient_id, buffer.capacity) or []
+                newest = states[patient_id][2] if patient_id in states else -math.inf
+                newer = [row for row in reversed(recent) if _epoch(row.get("timestamp")) > newest]
+                if newer:
+                    self.update_many(newer)
+                    caught_up += len(newer)
+        self._last_checkpoint = time.monotonic()
+        logger.info(f"Vitals trends restored for {len(states)} patients, {caught_up} readings caught up")
+        return len(states)
+
+
+def _round(value: float, digits: int = 4) -> Optional[float]:
+    return None if value is None or math.isnan(value) else round(value, digits)
+
+
+# Global vitals trend tracker
+vitals_trends = VitalsTrendTracker(
+    window_s=settings.TREND_WINDOW_S,
+    max_points=settings.TREND_MAX_POINTS,
+    halflife_s=settings.TREND_EWMA_HALFLIFE_S,
+    max_patients=settings.TREND_MAX_PATIENTS,
+    checkpoint_dir=settings.TREND_CHECKPOINT_DIR or None,
+    checkpoint_interval_s=settings.TREND_CHECKPOINT_INTERVAL_S
+)
@@ -0,0 +1,239 @@
+"""Write-behind buffer that coalesces CSV row appends per target file."""
+from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import Future
+from pathlib import Path
+from backend.core.file_lock import FileLock
+from loguru import logger
+import threading
+import atexit
+import time
+import csv
+
+
+class WriteBehindBuffer:
+    """
+    Buffer appended rows per file and flush them from a background thread.
+
+    A file is flushed when it has ``max_rows`` pending rows, when its oldest
+    pending row is ``max_age_ms`` old, when a caller asks for durability, or
+    on shutdown. Each flush opens the file once and writes all pending rows
+    with a single ``csv.writer.writerows`` call.
+
+    Several processes (supervised consumer workers, the API) may append to
+    the same files: every write holds an flock on ``<file>.lock``, and the
+    header is decided under that lock.
+    """
+
+    def __init__(self, max_rows: int = 500, max_age_ms: int = 200):
+        """Initialize write-behind buffer."""
+        self.max_rows = max(1, max_rows)
+        self.max_age = max(0, max_age_ms) / 1000.0
+
+        self._pending: Dict[Path, List[Tuple[Dict[str, Any], Future]]] = {}
+        self._first_enqueued: Dict[Path, float] = {}
+        self._urgent: set = set()
+        self._headers: Dict[Path, List[str]] = {}
+        # File size after our last write: a different size means another process wrote
+        self._sizes: Dict[Path, int] = {}
+        self._file_locks: Dict[Path, FileLock] = {}
+        self._warned_columns: set = set()
+
+        self._cond = threading.Condition()
+        # Held while writing so flushes of the same file stay ordered and
+        # full-file rewrites in CSVDatabase do not interleave with appends
+        self.io_lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._atexit_registered = False
+
+        # Metrics
+        self.queue_depth = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def _ensure_started(self):
+        """Start the flusher thread on first use. Caller holds the condition."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="csv-write-behind", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def enqueue(self, path: Path, row: Dict[str, Any], urgent: bool = False) -> Future:
+        """
+        Queue a row for appending to ``path``.
+
+        Returns:
+            Future resolved with True once the row is on disk (False on error)
+        """
+        future: Future = Future()
+        with self._cond:
+            self._ensure_started()
+            rows = self._pending.setdefault(path, [])
+            if not rows:
+                self._first_enqueued[path] = time.monotonic()
+            rows.append((dict(row), future))
+            self.queue_depth += 1
+            if urgent:
+                self._urgent.add(path)
+            if urgent or len(rows) >= self.max_rows:
+                self._cond.notify()
+        return future
+
+    def has_pending(self, path: Path) -> bool:
+        """Whether rows are waiting to be written to ``path``."""
+        with self._cond:
+            return bool(self._pending.get(path))
+
+    def flush(self, path: Optional[Path] = None):
+        """Synchronously write pending rows for one file (or all files)."""
+        with self.io_lock:
+            with self._cond:
+                paths = [path] if path is not None else list(self._pending)
+                batches = []
+                for p in paths:
+                    rows = self._pending.pop(p, None)
+                    self._first_enqueued.pop(p, None)
+                    self._urgent.discard(p)
+                    if rows:
+                        self.queue_depth -= len(rows)
+                        batches.append((p, rows))
+            for p, rows in batches:
+                self.write_rows(p, rows)
+
+    def forget_header(self, path: Path):
+        """Drop the cached header after a file has been rewritten."""
+        with self.io_lock:
+            self._headers.pop(path, None)
+            self._sizes.pop(path, None)
+
+    def file_lock(self, path: Path) -> FileLock:
+        """Cross-process lock for ``path``; take it while holding ``io_lock``."""
+        with self.io_lock:
+            lock = self._file_locks.get(path)
+            if lock is None:
+                lock = self._file_locks[path] = FileLock(path.with_name(path.name + ".lock"))
+            return lock
+
+    def _run(self):
+        """Flusher loop: write files that are full, old or urgent."""
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                due = [
+                    p for p, rows in self._pending.items()
+                    if p in self._urgent
+                    or len(rows) >= self.max_rows
+                    or now - self._first_enqueued[p] >= self.max_age
+                ]
+                if not due:
+                    if self._first_enqueued:
+                        oldest = min(self._first_enqueued.values())
+                        timeout = max(0.0, self.max_age - (now - oldest))
+                    else:
+                        timeout = None
+                    self._cond.wait(timeout)
+                    continue
+            for p in due:
+                self.flush(p)
+
+    def _header_for(self, path: Path, rows: List[Tuple[Dict[str, Any], Future]]) -> Tuple[List[str], bool]:
+        """Column order for ``path`` and whether the header still has to be written. Caller holds the file lock."""
+        size = path.stat().st_size if path.exists() else 0
+        header = self._headers.get(path)
+        if header is not None and size > 0 and self._sizes.get(path) == size:
+            return header, False
+
+        if size > 0:
+            with open(path, newline='', encoding='utf-8') as f:
+                header = next(csv.reader(f), [])
+            self._headers[path] = header
+            return header, False
+
+        header = []
+        for row, _ in rows:
+            for column in row:
+                if column not in header:
+                    header.append(column)
+        self._headers[path] = header
+        return header, True
+
+    def _append(self, path: Path, rows: List[Tuple[Dict[str, Any], Optional[Future]]]):
+        """Write rows (and the header for a new file) under the file lock. Caller holds io_lock."""
+        with self.file_lock(path):
+            header, write_header = self._header_for(path, rows)
+
+            extra = {c for row, _ in rows for c in row if c not in header} - self._warned_columns
+            if extra:
+                self._warned_columns |= extra
+                logger.warning(f"Columns {sorted(extra)} not in {path.name} header; values dropped")
+
+            with open(path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                if write_header:
+                    writer.writerow(header)
+                writer.writerows(
+                    ['' if row.get(column) is None else row.get(column) for column in header]
+                    for row, _ in rows
+                )
+            self._sizes[path] = path.stat().st_size
+
+    def write_rows(self, path: Path, rows: List[Tuple[Dict[str, Any], Optional[Future]]]) -> bool:
+        """Append rows to ``path`` with one buffered csv.writer call."""
+        started = time.perf_counter()
+        success = True
+        with self.io_lock:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._append(path, rows)
+                self.rows_written += len(rows)
+            except Exception as e:
+                success = False
+                self.flush_errors += 1
+                logger.error(f"Error writing {len(rows)} rows to {path}: {e}")
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.flushes += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+        for _, future in rows:
+            if future is not None and not future.done():
+                future.set_result(success)
+        return success
+
+    def close(self):
+        """Stop the flusher thread and write everything still pending."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and flush latency metrics."""
+        with self._cond:
+            now = time.monotonic()
+            oldest = min(self._first_enqueued.values(), default=now)
+            return {
+                "queue_depth": self.queue_depth,
+                "files_pending": len(self._pending),
+                "oldest_pending_ms": round((now - oldest) * 1000, 3),
+                "rows_written": self.rows_written,
+                "flushes": self.flushes,
+                "flush_errors": self.flush_errors,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "max_flush_ms": round(self.max_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+            }
@@ -1,7 +1,8 @@
 """Patient schemas for API."""
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, TypeAdapter, field_validator
+from typing import Optional, List, Dict
 from datetime import datetime
+from backend.core.vitals_store import normalize_timestamp
 
 
 class PatientCreate(BaseModel):
@@ -37,6 +38,36 @@ class VitalsCreate(BaseModel):
     o2_saturation: float
     temperature: float
     respiratory_rate: Optional[float] = None
+    # Reading time from the device (ISO-8601); set at write time when omitted.
+    # Readings that carry one can be de-duplicated on re-delivery.
+    timestamp: Optional[str] = None
+
+    @field_validator("timestamp")
+    @classmethod
+    def validate_timestamp(cls, value: Optional[str]) -> Optional[str]:
+        """Reject non-ISO-8601 times; store them as naive UTC like every other reading."""
+        return None if value is None else normalize_timestamp(value)
+
+
+# Built once; validating a whole batch through one adapter avoids per-row model setup
+VitalsBatchAdapter = TypeAdapter(List[VitalsCreate])
+
+
+class VitalsBatchError(BaseModel):
+    """A rejected row in a vitals batch."""
+    row: int
+    field: Optional[str] = None
+    message: str
+
+
+class VitalsBatchResponse(BaseModel):
+    """Schema for bulk vitals ingest response."""
+    status: str
+    accepted: int
+    rejected: int
+    published: int = 0
+    duplicates: int = 0
+    errors: List[VitalsBatchError] = []
 
 
 class VitalsResponse(BaseModel):
@@ -57,4 +88,85 @@ class RiskScoreResponse(BaseModel):
     risk_score: int
     risk_level: str
     concerns: List[str]
+    early_warning_score: Optional[int] = None
+    score_model: Optional[str] = None
+    components: Optional[Dict[str, int]] = None
     latest_vitals: Optional[dict] = None
+
+
+class WardRiskScore(BaseModel):
+    """One patient's early warning score in the ward view."""
+    patient_id: str
+    risk_score: int
+    risk_level: str
+    early_warning_score: int
+    components: Dict[str, int]
+    concerns: List[str]
+    timestamp: Optional[str] = None
+
+
+class WardRiskScoresResponse(BaseModel):
+    """Schema for the ward risk score response."""
+    status: str
+    score_model: str
+    count: int
+    scores: List[WardRiskScore]
+
+
+class TopRiskPatient(BaseModel):
+    """One entry of the top-risk index."""
+    patient_id: str
+    risk_score: int
+    risk_level: str
+    early_warning_score: int
+    trend: float
+    timestamp: Optional[str] = None
+
+
+class TopRiskResponse(BaseModel):
+    """Schema for the top-risk patients response."""
+    status: str
+    score_model: str
+    k: int
+    count: int
+    patients: List[TopRiskPatient]
+
+
+class ChannelTrend(BaseModel):
+    """Trend statistics for one vital sign channel."""
+    current: Optional[float] = None
+    ewma: Optional[float] = None
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    slope_per_hour: Optional[float] = None
+    change_over_window: Optional[float] = None
+    trend: str
+    window_points: int
+    count: int
+
+
+class ChannelBaseline(BaseModel):
+    """Quantiles and usual range of one vital sign channel."""
+    count: int
+    quantiles: Dict[str, Optional[float]]
+    band: Optional[List[float]] = None
+    established: bool
+
+
+class PatientBaselineResponse(BaseModel):
+    """Schema for a patient's vital sign baseline."""
+    patient_id: str
+    channels: Dict[str, ChannelBaseline]
+
+
+class CohortBaselineResponse(BaseModel):
+    """Schema for a merged baseline across patients."""
+    patients: int
+    channels: Dict[str, ChannelBaseline]
+
+
+class PatientTrendsResponse(BaseModel):
+    """Schema for a patient's vital sign trends."""
+    patient_id: str
+    window_s: float
+    trends: Dict[str, ChannelTrend]
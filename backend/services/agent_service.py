@@ -6,6 +6,7 @@ from backend.agents.utility_agent import UtilityAgent
 from backend.agents.models.agent_config import AgentHierarchyConfig, AgentConfigModel
 from backend.core.database import db
 from loguru import logger
+import asyncio
 import uuid
 import json
 
@@ -219,10 +220,20 @@ class AgentService:
                     raise ValueError("No agent configuration available")
 
             # Execute through orchestrator
-            result = await self.active_orchestrator.execute(query, context)
+            orchestrator = self.active_orchestrator
+            result = await asyncio.wait_for(
+                orchestrator.execute(query, context),
+                orchestrator.timeout_seconds
+            )
 
             return result
 
+        except asyncio.TimeoutError:
+            logger.error(f"Agent query timed out after {self.active_orchestrator.timeout_seconds}s")
+            return {
+                "status": "error",
+                "error": f"Timed out after {self.active_orchestrator.timeout_seconds}s"
+            }
         except Exception as e:
             logger.error(f"Error processing query: {e}")
             return {
@@ -1,8 +1,9 @@
 """Alert generation and notification service."""
 from typing import Dict, Any, List, Optional
-from backend.core.database import db
+from backend.core.alert_store import alert_store
 from backend.core.config import settings
 from backend.services.streaming_service import StreamingService
+from backend.streaming.live_bus import live_bus
 from loguru import logger
 import aiosmtplib
 from email.mime.text import MIMEText
@@ -16,7 +17,6 @@ class AlertService:
 
     def __init__(self):
         """Initialize alert service."""
-        self.alerts_file = "alerts/alert_history.csv"
         self.streaming_service = StreamingService()
 
     async def create_alert(
@@ -55,8 +55,8 @@ class AlertService:
                 "status": "active"
             }
 
-            # Save to CSV
-            db.append_row(self.alerts_file, {
+            # Save to CSV (indexed append, on disk before we notify anyone)
+            stored = alert_store.append({
                 "alert_id": alert_id,
                 "patient_id": patient_id,
                 "alert_type": alert_type,
@@ -65,6 +65,11 @@ class AlertService:
                 "timestamp": timestamp,
                 "status": "active"
             })
+            if not stored:
+                raise RuntimeError(f"Failed to store alert for patient {patient_id}")
+
+            # Push to connected dashboards
+            live_bus.publish("alert", alert_data)
 
             # Publish to Kafka
             if settings.ENABLE_REAL_TIME_STREAMING:
@@ -82,6 +87,28 @@ class AlertService:
             logger.error(f"Error creating alert: {e}")
             raise
 
+    async def update_incident(self, incident: Dict[str, Any], transition: str):
+        """
+        Push an incident update/clear/reopen to connected dashboards.
+
+        Updates of an open incident are not stored, sent to Kafka or
+        emailed; the incident's alert stays the record of it.
+        """
+        live_bus.publish("alert", {
+            **incident,
+            "alert_type": "vitals_anomaly",
+            "status": transition,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+
+    def supersede_alert(self, alert_id: str) -> bool:
+        """Mark an alert replaced by an escalated one for the same incident."""
+        try:
+            return alert_store.update_status(alert_id, 'escalated')
+        except Exception as e:
+            logger.error(f"Error superseding alert {alert_id}: {e}")
+            return False
+
     async def send_email_alert(self, alert_data: Dict[str, Any]):
         """Send email notification for alert."""
         try:
@@ -137,24 +164,7 @@ Monit Patient System
     def get_active_alerts(self, patient_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get active alerts, optionally filtered by patient."""
         try:
-            alerts_df = db.read_csv(self.alerts_file)
-            if alerts_df.empty:
-                return []
-
-            # Filter active alerts
-            if 'status' in alerts_df.columns:
-                alerts_df = alerts_df[alerts_df['status'] == 'active']
-
-            # Filter by patient if specified
-            if patient_id and 'patient_id' in alerts_df.columns:
-                alerts_df = alerts_df[alerts_df['patient_id'] == patient_id]
-
-            # Sort by timestamp (most recent first)
-            if 'timestamp' in alerts_df.columns:
-                alerts_df = alerts_df.sort_values('timestamp', ascending=False)
-
-            return alerts_df.to_dict('records')
-
+            return alert_store.get_active(patient_id)
         except Exception as e:
             logger.error(f"Error getting active alerts: {e}")
             return []
@@ -162,12 +172,7 @@ Monit Patient System
     def acknowledge_alert(self, alert_id: str) -> bool:
         """Mark alert as acknowledged."""
         try:
-            return db.update_row(
-                self.alerts_file,
-                alert_id,
-                'alert_id',
-                {'status': 'acknowledged'}
-            )
+            return alert_store.update_status(alert_id, 'acknowledged')
         except Exception as e:
             logger.error(f"Error acknowledging alert {alert_id}: {e}")
             return False
@@ -175,12 +180,7 @@ Monit Patient System
     def resolve_alert(self, alert_id: str) -> bool:
         """Mark alert as resolved."""
         try:
-            return db.update_row(
-                self.alerts_file,
-                alert_id,
-                'alert_id',
-                {'status': 'resolved'}
-            )
+            return alert_store.update_status(alert_id, 'resolved')
         except Exception as e:
             logger.error(f"Error resolving alert {alert_id}: {e}")
             return False
@@ -1,18 +1,146 @@
 """Gemini API service with Google grounding search."""
 import google.generativeai as genai
-from typing import Dict, Any, Optional
+from google.api_core import exceptions as google_exceptions
+from typing import Dict, Any, Optional, Callable, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from backend.core.config import settings
+from backend.core.response_cache import response_cache, make_cache_key
 from loguru import logger
+import threading
+import asyncio
+import random
+import time
+
+
+# Errors worth retrying: rate limits, overload and transient server failures
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.GatewayTimeout,
+    ConnectionError,
+)
 
 
 class GeminiService:
-    """Service for interacting with Google Gemini API."""
+    """
+    Service for interacting with Google Gemini API.
+
+    SDK calls are blocking, so they run on a process-wide bounded thread
+    pool (GEMINI_MAX_CONCURRENCY workers) and never on the event loop.
+    Model instances are cached per (model, generation config, grounding)
+    and shared by every GeminiService instance. Successful responses are
+    cached by content hash (see backend.core.response_cache).
+    """
+
+    _configured = False
+    _models: Dict[Tuple, genai.GenerativeModel] = {}
+    _executor: Optional[ThreadPoolExecutor] = None
+    _lock = threading.Lock()
+    _in_flight: Dict[Tuple[int, str], asyncio.Future] = {}
+    _stats = {"calls": 0, "retries": 0, "failures": 0, "in_flight": 0, "coalesced": 0, "total_ms": 0.0}
 
     def __init__(self):
         """Initialize Gemini service."""
-        genai.configure(api_key=settings.GEMINI_API_KEY)
+        with GeminiService._lock:
+            if not GeminiService._configured:
+                genai.configure(api_key=settings.GEMINI_API_KEY)
+                GeminiService._configured = True
         self.default_model = settings.GEMINI_MODEL_NAME
 
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        """Shared thread pool that bounds concurrent Gemini calls."""
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=max(1, settings.GEMINI_MAX_CONCURRENCY),
+                    thread_name_prefix="gemini"
+                )
+            return cls._executor
+
+    @classmethod
+    def _get_model(cls, model_name: str, temperature: float, max_tokens: int, use_grounding: bool):
+        """Cached GenerativeModel for a (model, config) combination."""
+        key = (model_name, temperature, max_tokens, use_grounding)
+        with cls._lock:
+            model_instance = cls._models.get(key)
+            if model_instance is None:
+                model_instance = genai.GenerativeModel(
+                    model_name,
+                    generation_config={
+                        "temperature": temperature,
+                        "max_output_tokens": max_tokens,
+                    },
+                    # Enable Google Search grounding
+                    tools=[{"google_search": {}}] if use_grounding else None
+                )
+                cls._models[key] = model_instance
+            return model_instance
+
+    async def _call(self, func: Callable, *args, **kwargs):
+        """
+        Run a blocking SDK call on the shared pool, retrying transient errors.
+
+        Retries up to AGENT_MAX_RETRIES times with exponential backoff and
+        jitter; the backoff sleep happens on the event loop, not in the pool.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        retries = max(0, settings.AGENT_MAX_RETRIES)
+        stats = GeminiService._stats
+
+        for attempt in range(retries + 1):
+            started = time.perf_counter()
+            stats["in_flight"] += 1
+            try:
+                result = await loop.run_in_executor(executor, lambda: func(*args, **kwargs))
+                stats["calls"] += 1
+                stats["total_ms"] += (time.perf_counter() - started) * 1000
+                return result
+            except RETRYABLE_ERRORS as e:
+                if attempt >= retries:
+                    stats["failures"] += 1
+                    raise
+                delay = min(
+                    settings.GEMINI_RETRY_MAX_DELAY_MS,
+                    settings.GEMINI_RETRY_BASE_DELAY_MS * (2 ** attempt)
+                ) / 1000.0
+                delay *= random.uniform(0.5, 1.0)
+                stats["retries"] += 1
+                logger.warning(f"Gemini call failed ({e}); retry {attempt + 1}/{retries} in {delay:.2f}s")
+            except Exception:
+                stats["failures"] += 1
+                raise
+            finally:
+                stats["in_flight"] -= 1
+            await asyncio.sleep(delay)
+
+    async def _generate(
+        self,
+        model_instance,
+        full_prompt: str,
+        cache_key: Optional[str] = None,
+        ttl: int = 0
+    ) -> str:
+        """Call Gemini and cache the text of a successful response."""
+        started = time.perf_counter()
+        response = await self._call(model_instance.generate_content, full_prompt)
+
+        # Extract text from response
+        if not response.candidates:
+            logger.warning("No candidates in Gemini response")
+            return "No response generated"
+
+        if cache_key is not None:
+            await response_cache.set(
+                cache_key, response.text, ttl,
+                latency_ms=(time.perf_counter() - started) * 1000
+            )
+        return response.text
+
     async def generate_response(
         self,
         prompt: str,
@@ -20,7 +148,8 @@ class GeminiService:
         context: Optional[Dict[str, Any]] = None,
         use_grounding: bool = False,
         temperature: Optional[float] = None,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        cache_task: Optional[str] = None
     ) -> str:
         """
         Generate response from Gemini.
@@ -32,6 +161,7 @@ class GeminiService:
             use_grounding: Enable Google Search grounding
             temperature: Temperature for generation
             max_tokens: Max tokens to generate
+            cache_task: Task name used to pick the response cache TTL
 
         Returns:
             Generated text response
@@ -41,20 +171,7 @@ class GeminiService:
             temp = temperature if temperature is not None else settings.GEMINI_TEMPERATURE
             max_tok = max_tokens or settings.GEMINI_MAX_TOKENS
 
-            # Initialize model
-            model_instance = genai.GenerativeModel(model_name)
-
-            # Build generation config
-            generation_config = {
-                "temperature": temp,
-                "max_output_tokens": max_tok,
-            }
-
-            # Add grounding if requested
-            tools = None
-            if use_grounding:
-                # Enable Google Search grounding
-                tools = [{"google_search": {}}]
+            model_instance = self._get_model(model_name, temp, max_tok, use_grounding)
 
             # Add context to prompt if provided
             full_prompt = prompt
@@ -62,25 +179,26 @@ class GeminiService:
                 context_str = f"\n\nAdditional Context:\n{context}\n\n"
                 full_prompt = context_str + prompt
 
-            # Generate response
-            if tools:
-                response = model_instance.generate_content(
-                    full_prompt,
-                    generation_config=generation_config,
-                    tools=tools
-                )
-            else:
-                response = model_instance.generate_content(
-                    full_prompt,
-                    generation_config=generation_config
-                )
+            if response_cache is None:
+                return await self._generate(model_instance, full_prompt)
 
-            # Extract text from response
-            if response.candidates:
-                return response.text
+            cache_key = make_cache_key(model_name, full_prompt, temp, use_grounding, max_tok)
+            cached = await response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            # Identical concurrent requests (e.g. sibling agents) share one call
+            flight_key = (id(asyncio.get_running_loop()), cache_key)
+            flight = GeminiService._in_flight.get(flight_key)
+            if flight is None:
+                ttl = settings.gemini_cache_task_ttls.get(cache_task, settings.GEMINI_CACHE_TTL_SECONDS)
+                flight = asyncio.ensure_future(self._generate(model_instance, full_prompt, cache_key, ttl))
+                GeminiService._in_flight[flight_key] = flight
+                flight.add_done_callback(lambda _: GeminiService._in_flight.pop(flight_key, None))
             else:
-                logger.warning("No candidates in Gemini response")
-                return "No response generated"
+                GeminiService._stats["coalesced"] += 1
+            # Shielded so one caller's timeout does not cancel the others
+            return await asyncio.shield(flight)
 
         except Exception as e:
             logger.error(f"Gemini API error: {e}")
@@ -103,16 +221,22 @@ class GeminiService:
         """
         try:
             model_name = model or self.default_model
-            model_instance = genai.GenerativeModel(model_name)
+            model_instance = self._get_model(
+                model_name, settings.GEMINI_TEMPERATURE, settings.GEMINI_MAX_TOKENS, False
+            )
+
+            def send_messages():
+                # Start chat
+                chat = model_instance.start_chat(history=[])
 
-            # Start chat
-            chat = model_instance.start_chat(history=[])
+                # Send messages
+                response = None
+                for message in messages:
+                    if message['role'] == 'user':
+                        response = chat.send_message(message['content'])
+                return response
 
-            # Send messages
-            response = None
-            for message in messages:
-                if message['role'] == 'user':
-                    response = chat.send_message(message['content'])
+            response = await self._call(send_messages)
 
             return response.text if response else "No response"
 
@@ -157,3 +281,22 @@ Provide evidence-based analysis with citations where applicable.
             "analysis": response,
             "grounding_used": True
         }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Call, retry and latency metrics for the shared client."""
+        stats = GeminiService._stats
+        return {
+            "calls": stats["calls"],
+            "retries": stats["retries"],
+            "failures": stats["failures"],
+            "in_flight": stats["in_flight"],
+            "coalesced": stats["coalesced"],
+            "max_concurrency": max(1, settings.GEMINI_MAX_CONCURRENCY),
+            "cached_models": len(GeminiService._models),
+            "avg_call_ms": round(stats["total_ms"] / stats["calls"], 3) if stats["calls"] else 0.0,
+            "cache": response_cache.get_stats() if response_cache is not None else {"enabled": False},
+        }
+
+
+# Global Gemini service
+gemini_service = GeminiService()
@@ -1,18 +1,37 @@
 """Patient data service."""
 from typing import List, Dict, Any, Optional
-from backend.core.database import db
+from backend.core.database import db, vitals_store
+from backend.core.vitals_buffer import recent_vitals
+from backend.core.vitals_trends import vitals_trends
+from backend.core.baselines import vitals_baselines
+from backend.core.vitals_store import VITALS_CHANNELS, to_epoch, from_epoch
+from backend.core.early_warning import early_warning
+from backend.core.risk_index import risk_index
+from backend.streaming.batch import VitalsBatch
+from backend.streaming.live_bus import live_bus
+from backend.streaming.live import live_hub
 from loguru import logger
 import pandas as pd
+import numpy as np
 from datetime import datetime
 
 
+def _epoch(timestamp: Any) -> float:
+    """Epoch seconds of a stored reading time; NaN if missing or unreadable."""
+    if not timestamp:
+        return np.nan
+    try:
+        return to_epoch(timestamp)
+    except (TypeError, ValueError):
+        return np.nan
+
+
 class PatientService:
     """Service for patient data operations."""
 
     def __init__(self):
         """Initialize patient service."""
         self.patients_file = "patients/patient_records.csv"
-        self.vitals_file = "vitals/vitals_history.csv"
 
     def get_all_patients(self) -> List[Dict[str, Any]]:
         """Get all patients."""
@@ -48,20 +67,8 @@ class PatientService:
     ) -> List[Dict[str, Any]]:
         """Get patient vital signs history."""
         try:
-            vitals_df = db.read_csv(self.vitals_file)
-            if vitals_df.empty or 'patient_id' not in vitals_df.columns:
-                return []
-
-            patient_vitals = vitals_df[vitals_df['patient_id'] == patient_id]
-
-            # Sort by timestamp if available
-            if 'timestamp' in patient_vitals.columns:
-                patient_vitals = patient_vitals.sort_values('timestamp', ascending=False)
-
-            # Limit results
-            patient_vitals = patient_vitals.head(limit)
-
-            return patient_vitals.to_dict('records')
+            # Serve from the in-memory ring buffer unless another process wrote since
+            return recent_vitals.get_fresh(patient_id, limit, vitals_store)
         except Exception as e:
             logger.error(f"Error getting vitals for patient {patient_id}: {e}")
             return []
@@ -91,76 +98,187 @@ class PatientService:
             logger.error(f"Error updating patient {patient_id}: {e}")
             return False
 
-    def add_vital_signs(self, vitals_data: Dict[str, Any]) -> bool:
-        """Add vital signs record."""
+    async def add_vital_signs(self, vitals_data: Dict[str, Any]) -> bool:
+        """Add vital signs record; resolves once it is on disk."""
         try:
             # Add timestamp if not present
-            if 'timestamp' not in vitals_data:
+            if not vitals_data.get('timestamp'):
                 vitals_data['timestamp'] = datetime.utcnow().isoformat()
 
-            return db.append_row(self.vitals_file, vitals_data)
+            version_before = vitals_store.version(str(vitals_data.get('patient_id')))
+            success = await vitals_store.append_durable(vitals_data)
         except Exception as e:
             logger.error(f"Error adding vital signs: {e}")
             return False
 
-    def calculate_risk_score(self, patient_id: str) -> Dict[str, Any]:
+        if success:
+            self._track_vitals([vitals_data], {str(vitals_data.get('patient_id')): version_before})
+        return success
+
+    def add_vital_signs_batch(self, vitals_list: List[Dict[str, Any]]) -> int:
+        """Add many vital signs records with a single storage write."""
+        try:
+            now = datetime.utcnow().isoformat()
+            for vitals_data in vitals_list:
+                if not vitals_data.get('timestamp'):
+                    vitals_data['timestamp'] = now
+
+            versions_before = {
+                patient_id: vitals_store.version(patient_id)
+                for patient_id in {str(vitals_data.get('patient_id')) for vitals_data in vitals_list}
+            }
+            written = vitals_store.append_many(vitals_list)
+        except Exception as e:
+            logger.error(f"Error adding vital signs batch: {e}")
+            return 0
+
+        if written == len(vitals_list):
+            self._track_vitals(vitals_list, versions_before)
+        return written
+
+    def _track_vitals(self, vitals_list: List[Dict[str, Any]], versions_before: Dict[str, Any]):
+        """
+        Feed stored readings to the in-memory buffer, trends, baselines and
+        risk index. The readings are already durable, so a failure here is
+        logged rather than reported as a failed write (which would get them
+        stored again on retry).
+        """
+        try:
+            by_patient: Dict[str, List[Dict[str, Any]]] = {}
+            for vitals_data in vitals_list:
+                if vitals_data.get('patient_id') is not None:
+                    by_patient.setdefault(str(vitals_data['patient_id']), []).append(vitals_data)
+            for patient_id, readings in by_patient.items():
+                recent_vitals.record_patient(patient_id, readings, vitals_store, versions_before.get(patient_id))
+        except Exception as e:
+            logger.error(f"Error updating recent vitals buffer: {e}")
+        self.update_derived(vitals_list)
+
+    def update_derived(self, vitals_list: List[Dict[str, Any]]):
+        """
+        Feed stored readings to the trends, baselines and risk index.
+
+        Also called with readings other processes stored, as they arrive
+        over the live bus, so every process ranks and trends every patient.
+        """
+        try:
+            if len(vitals_list) == 1:
+                vitals_trends.update(vitals_list[0])
+                vitals_baselines.update(vitals_list[0])
+                self._notify_top_risk(
+                    risk_index.score_reading(vitals_list[0], to_epoch(vitals_list[0]['timestamp']))
+                )
+                return
+            vitals_trends.update_many(vitals_list)
+            vitals_baselines.update_many(vitals_list)
+            self._notify_top_risk(risk_index.score_matrix(
+                [str(vitals_data['patient_id']) for vitals_data in vitals_list],
+                np.array([to_epoch(vitals_data['timestamp']) for vitals_data in vitals_list], dtype=np.float64),
+                VitalsBatch(vitals_list).matrix(VITALS_CHANNELS)
+            ))
+        except Exception as e:
+            logger.error(f"Error updating in-memory vitals state: {e}")
+
+    def _notify_top_risk(self, change: Optional[Dict[str, Any]]):
+        """
+        Tell this process's live stream clients that the top-risk membership
+        changed. Not sent over the bus: every process keeps its own index
+        fed with all readings and notifies its own clients.
+        """
+        if change:
+            live_hub.publish("system", {"event": "top_risk", **change})
+
+    def get_top_risk(self, k: int, min_level: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Highest-priority patients from the risk index (see backend.core.risk_index)."""
+        return risk_index.top(k, min_level)
+
+    def calculate_risk_score(self, patient_id: str, vitals_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Calculate patient risk score based on latest vitals.
 
-        Returns risk score 0-100 and risk level.
+        Args:
+            patient_id: Patient ID
+            vitals_data: Score this reading instead of the latest stored one
+
+        Returns risk score 0-100, risk level and the early warning score it
+        comes from (see backend.core.early_warning).
         """
         try:
-            vitals = self.get_patient_vitals(patient_id, limit=1)
+            vitals = [vitals_data] if vitals_data else self.get_patient_vitals(patient_id, limit=1)
             if not vitals:
                 return {"risk_score": 0, "risk_level": "unknown", "reason": "No vitals data"}
 
             latest = vitals[0]
-            risk_score = 0
-            concerns = []
-
-            # Simple risk scoring (you can make this more sophisticated)
-            # Heart rate
-            hr = latest.get('heart_rate', 0)
-            if hr > 120 or hr < 50:
-                risk_score += 30
-                concerns.append(f"Abnormal heart rate: {hr}")
-
-            # Blood pressure
-            bp_sys = latest.get('bp_systolic', 0)
-            if bp_sys > 180 or bp_sys < 90:
-                risk_score += 25
-                concerns.append(f"Abnormal blood pressure: {bp_sys}")
-
-            # Oxygen saturation
-            o2 = latest.get('o2_saturation', 100)
-            if o2 < 92:
-                risk_score += 35
-                concerns.append(f"Low oxygen saturation: {o2}%")
-
-            # Temperature
-            temp = latest.get('temperature', 37.0)
-            if temp > 38.5 or temp < 36.0:
-                risk_score += 10
-                concerns.append(f"Abnormal temperature: {temp}°C")
-
-            # Determine risk level
-            if risk_score >= 70:
-                risk_level = "critical"
-            elif risk_score >= 50:
-                risk_level = "high"
-            elif risk_score >= 30:
-                risk_level = "medium"
-            else:
-                risk_level = "low"
-
             return {
                 "patient_id": patient_id,
-                "risk_score": min(risk_score, 100),
-                "risk_level": risk_level,
-                "concerns": concerns,
+                **early_warning.score_records([latest])[0],
                 "latest_vitals": latest
             }
 
         except Exception as e:
             logger.error(f"Error calculating risk score: {e}")
             return {"risk_score": 0, "risk_level": "error", "reason": str(e)}
+
+    def get_vitals_trends(self, patient_id: str) -> Dict[str, Any]:
+        """Online trend statistics per channel (see backend.core.vitals_trends)."""
+        return {
+            "patient_id": patient_id,
+            "window_s": vitals_trends.window_s,
+            "trends": vitals_trends.get_trends(patient_id)
+        }
+
+    def get_baseline(self, patient_id: str) -> Dict[str, Any]:
+        """Usual range per channel from streaming sketches (see backend.core.baselines)."""
+        return {"patient_id": patient_id, "channels": vitals_baselines.get_baseline(patient_id)}
+
+    def get_cohort_baseline(self, patient_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Merged baseline of several patients (all resident patients by default)."""
+        return vitals_baselines.cohort_baseline(patient_ids)
+
+    def calculate_ward_risk_scores(self) -> List[Dict[str, Any]]:
+        """
+        Score every patient's latest reading in one vectorized pass.
+
+        Served from the recent vitals buffer; falls back to one storage
+        scan when the buffer does not hold every patient or another process
+        wrote since it was loaded.
+
+        Returns:
+            Risk-score dicts, highest early warning score first
+        """
+        if recent_vitals.complete and recent_vitals.in_sync(vitals_store):
+            patient_ids, timestamps, values = recent_vitals.latest_all()
+        else:
+            patient_ids, rows = [], []
+            for patient_id, recent in vitals_store.iter_recent(1):
+                if recent:
+                    patient_ids.append(str(patient_id))
+                    rows.append(recent[0])
+            timestamps = np.array([_epoch(row.get('timestamp')) for row in rows], dtype=np.float64)
+            values = VitalsBatch(rows).matrix(VITALS_CHANNELS)
+        if not patient_ids:
+            return []
+
+        matrix = early_warning.select(values, VITALS_CHANNELS)
+        scored = early_warning.score_matrix(matrix)
+        results = []
+        # Highest risk level first, then highest total
+        for row in np.lexsort((-scored["total"], -scored["level_code"])):
+            result = early_warning.describe(scored, row, matrix)
+            result["patient_id"] = patient_ids[row]
+            result["timestamp"] = None if np.isnan(timestamps[row]) else from_epoch(timestamps[row])
+            results.append(result)
+        return results
+
+
+def _on_remote_vitals(vitals_list: List[Dict[str, Any]]):
+    """Live bus listener: readings stored by other processes."""
+    readings = [
+        vitals_data for vitals_data in vitals_list
+        if vitals_data.get('patient_id') is not None and vitals_data.get('timestamp')
+    ]
+    if readings:
+        PatientService().update_derived(readings)
+
+
+live_bus.add_listener("vitals", _on_remote_vitals)
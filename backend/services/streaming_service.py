@@ -1,16 +1,22 @@
 """Confluent Kafka streaming service."""
 from confluent_kafka import Producer, Consumer, KafkaError, KafkaException
-from typing import Dict, Any, Callable, Optional
+from typing import Dict, Any, Callable, Optional, List, Union, Tuple
 from backend.core.config import settings
+from backend.streaming.async_producer import AsyncKafkaProducer
+from backend.streaming.transport import get_transport
+from backend.streaming.codecs import encode_vitals, decode_vitals
 from loguru import logger
+import asyncio
 import json
 
 
 class StreamingService:
     """Service for Confluent Cloud Kafka streaming."""
 
-    def __init__(self):
+    def __init__(self, transport=None):
         """Initialize Kafka producer and consumer configs."""
+        self.transport = transport or get_transport()
+
         self.producer_config = {
             'bootstrap.servers': settings.CONFLUENT_BOOTSTRAP_SERVERS,
             'sasl.mechanisms': 'PLAIN',
@@ -26,25 +32,59 @@ class StreamingService:
             'enable.auto.commit': True
         }
 
+        # Producer-only throughput settings (kept out of consumer_config)
+        self.producer_tuning = {
+            'linger.ms': settings.KAFKA_PRODUCER_LINGER_MS,
+            'batch.size': settings.KAFKA_PRODUCER_BATCH_SIZE,
+            'compression.type': settings.KAFKA_PRODUCER_COMPRESSION,
+            'queue.buffering.max.messages': settings.KAFKA_PRODUCER_QUEUE_MAX_MESSAGES,
+        }
+
         self.producer = None
+        self.async_producer = None
         self.consumer = None
 
     def get_producer(self) -> Producer:
         """Get or create Kafka producer."""
         if not self.producer:
             try:
-                self.producer = Producer(self.producer_config)
-                logger.info("Kafka producer initialized")
+                self.producer = self.transport.create_producer({**self.producer_config, **self.producer_tuning})
+                logger.info(f"Kafka producer initialized ({self.transport.name} transport)")
             except Exception as e:
                 logger.error(f"Failed to initialize Kafka producer: {e}")
                 raise
         return self.producer
 
-    def get_consumer(self, topics: list) -> Consumer:
+    def get_async_producer(self) -> AsyncKafkaProducer:
+        """Get or create the async producer (background poll thread, delivery futures)."""
+        if not self.async_producer:
+            self.async_producer = AsyncKafkaProducer(self.get_producer())
+        return self.async_producer
+
+    def get_consumer(
+        self,
+        topics: list,
+        auto_commit: bool = True,
+        on_assign: Optional[Callable] = None,
+        on_revoke: Optional[Callable] = None,
+        config_overrides: Optional[Dict[str, Any]] = None
+    ) -> Consumer:
         """Get or create Kafka consumer."""
         try:
-            consumer = Consumer(self.consumer_config)
-            consumer.subscribe(topics)
+            config = self.consumer_config
+            if not auto_commit:
+                config = {**config, 'enable.auto.commit': False}
+            if config_overrides:
+                config = {**config, **config_overrides}
+            consumer = self.transport.create_consumer(config)
+
+            # Rebalance callbacks are only passed when given
+            callbacks = {}
+            if on_assign:
+                callbacks['on_assign'] = on_assign
+            if on_revoke:
+                callbacks['on_revoke'] = on_revoke
+            consumer.subscribe(topics, **callbacks)
             logger.info(f"Kafka consumer subscribed to topics: {topics}")
             return consumer
         except Exception as e:
@@ -58,6 +98,25 @@ class StreamingService:
         else:
             logger.debug(f'Message delivered to {msg.topic()} [{msg.partition()}]')
 
+    def _report_delivery(self, future: asyncio.Future):
+        """Log the outcome of an async delivery future."""
+        if future.cancelled():
+            return
+        err = future.exception()
+        self.delivery_report(err, None if err else future.result())
+
+    async def _produce(
+        self,
+        topic: str,
+        value: Union[str, bytes],
+        key: Optional[Union[str, bytes]] = None,
+        headers: Optional[List[Tuple[str, bytes]]] = None
+    ) -> asyncio.Future:
+        """Queue a message on the async producer and log its delivery."""
+        future = await self.get_async_producer().produce(topic, value=value, key=key, headers=headers)
+        future.add_done_callback(self._report_delivery)
+        return future
+
     async def produce_vitals(
         self,
         patient_id: str,
@@ -65,46 +124,61 @@ class StreamingService:
     ):
         """Produce patient vitals to Kafka topic."""
         try:
-            producer = self.get_producer()
-
             message = {
                 "patient_id": patient_id,
                 **vitals_data
             }
 
-            producer.produce(
+            await self._produce(
                 topic=settings.KAFKA_TOPIC_PATIENT_VITALS,
                 key=patient_id,
-                value=json.dumps(message),
-                callback=self.delivery_report
+                value=encode_vitals(message)
             )
 
-            producer.poll(0)  # Trigger delivery callbacks
-
-            logger.info(f"Produced vitals for patient {patient_id}")
+            logger.debug(f"Produced vitals for patient {patient_id}")
 
         except Exception as e:
             logger.error(f"Error producing vitals: {e}")
             raise
 
+    async def produce_vitals_batch(
+        self,
+        vitals_list: List[Dict[str, Any]]
+    ) -> int:
+        """
+        Produce many vitals messages as one producer batch.
+
+        Messages are queued back to back on the async producer; librdkafka
+        packs them into few requests (linger.ms/batch.size).
+
+        Returns:
+            Number of messages queued
+        """
+        queued = 0
+        for vitals_data in vitals_list:
+            await self._produce(
+                topic=settings.KAFKA_TOPIC_PATIENT_VITALS,
+                key=str(vitals_data.get("patient_id")),
+                value=encode_vitals(vitals_data)
+            )
+            queued += 1
+
+        logger.debug(f"Produced {queued} vitals messages")
+        return queued
+
     async def produce_alert(
         self,
         alert_data: Dict[str, Any]
     ):
         """Produce alert to Kafka topic."""
         try:
-            producer = self.get_producer()
-
-            producer.produce(
+            await self._produce(
                 topic=settings.KAFKA_TOPIC_ALERTS,
                 key=alert_data.get('patient_id', 'unknown'),
-                value=json.dumps(alert_data),
-                callback=self.delivery_report
+                value=json.dumps(alert_data)
             )
 
-            producer.poll(0)
-
-            logger.info(f"Produced alert for patient {alert_data.get('patient_id')}")
+            logger.debug(f"Produced alert for patient {alert_data.get('patient_id')}")
 
         except Exception as e:
             logger.error(f"Error producing alert: {e}")
@@ -116,16 +190,11 @@ class StreamingService:
     ):
         """Produce agent activity log to Kafka topic."""
         try:
-            producer = self.get_producer()
-
-            producer.produce(
+            await self._produce(
                 topic=settings.KAFKA_TOPIC_AGENT_LOGS,
-                value=json.dumps(log_data),
-                callback=self.delivery_report
+                value=json.dumps(log_data)
             )
 
-            producer.poll(0)
-
         except Exception as e:
             logger.error(f"Error producing agent log: {e}")
 
@@ -162,7 +231,10 @@ class StreamingService:
 
                 # Parse message
                 try:
-                    message_data = json.loads(msg.value().decode('utf-8'))
+                    if msg.topic() == settings.KAFKA_TOPIC_PATIENT_VITALS:
+                        message_data = decode_vitals(msg.value())
+                    else:
+                        message_data = json.loads(msg.value().decode('utf-8'))
                     callback(message_data)
                     count += 1
                 except Exception as e:
@@ -177,3 +249,7 @@ class StreamingService:
         """Flush pending producer messages."""
         if self.producer:
             self.producer.flush()
+
+    def get_producer_stats(self) -> Dict[str, Any]:
+        """Async producer delivery metrics (empty until first use)."""
+        return self.async_producer.get_stats() if self.async_producer else {}
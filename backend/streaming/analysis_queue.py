@@ -0,0 +1,221 @@
+"""Bounded priority queue between anomaly detection and agent analysis."""
+from typing import Dict, Any, Callable, Awaitable, Optional, List
+from collections import deque
+from loguru import logger
+import itertools
+import asyncio
+import heapq
+import time
+
+
+# Lower value = served first
+SEVERITY_PRIORITY = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+
+class AnalysisJob:
+    """Pending agent analysis for one patient."""
+
+    __slots__ = ("patient_id", "severity", "vitals", "anomalies", "enqueued_at", "merged")
+
+    def __init__(self, patient_id: str, severity: str, vitals: Dict[str, Any], anomalies: List[str]):
+        self.patient_id = patient_id
+        self.severity = severity
+        self.vitals = vitals
+        self.anomalies = list(anomalies)
+        self.enqueued_at = time.monotonic()
+        self.merged = 0
+
+    @property
+    def priority(self) -> int:
+        return SEVERITY_PRIORITY.get(self.severity, len(SEVERITY_PRIORITY))
+
+
+class AnalysisQueue:
+    """
+    Priority work queue with a pool of async workers.
+
+    ``submit()`` never blocks the caller, so vitals ingest is not slowed
+    by LLM latency. Admission control:
+
+    - at most one queued job per patient: a new reading for a queued
+      patient is merged into it (latest vitals, union of anomalies,
+      highest severity);
+    - when the queue is full, a job only gets in by evicting a queued job
+      of strictly lower severity (the oldest of the lowest), otherwise it
+      is shed.
+
+    Critical jobs are therefore only ever shed when the queue is full of
+    critical jobs.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[AnalysisJob], Awaitable[Any]],
+        max_size: int = 100,
+        workers: int = 4,
+        wait_window: int = 1000
+    ):
+        """Initialize analysis queue."""
+        self.handler = handler
+        self.max_size = max(1, max_size)
+        self.num_workers = max(1, workers)
+
+        self._heap: list = []
+        self._by_patient: Dict[str, AnalysisJob] = {}
+        self._counter = itertools.count()
+        self._ready: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._busy = 0
+
+        # Metrics
+        self.enqueued = 0
+        self.merged = 0
+        self.processed = 0
+        self.failed = 0
+        self.shed: Dict[str, int] = {}
+        self._waits_ms: deque = deque(maxlen=wait_window)
+        self._total_run_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self._by_patient)
+
+    def _start(self):
+        """Start the worker pool on the running loop (first submit)."""
+        if self._workers:
+            return
+        self._ready = asyncio.Event()
+        self._workers = [
+            asyncio.ensure_future(self._worker()) for _ in range(self.num_workers)
+        ]
+
+    def _push(self, job: AnalysisJob):
+        heapq.heappush(self._heap, (job.priority, next(self._counter), job))
+
+    def _record_shed(self, job: AnalysisJob):
+        self.shed[job.severity] = self.shed.get(job.severity, 0) + 1
+
+    def submit(
+        self,
+        patient_id: str,
+        severity: str,
+        vitals: Dict[str, Any],
+        anomalies: List[str]
+    ) -> str:
+        """
+        Offer an analysis job.
+
+        Returns:
+            "queued", "merged" or "shed"
+        """
+        self._start()
+
+        queued = self._by_patient.get(patient_id)
+        if queued is not None:
+            queued.vitals = vitals
+            queued.anomalies = list(dict.fromkeys(queued.anomalies + list(anomalies)))
+            queued.merged += 1
+            self.merged += 1
+            if SEVERITY_PRIORITY.get(severity, len(SEVERITY_PRIORITY)) < queued.priority:
+                # Escalate: re-push; the stale heap entry is skipped on pop
+                queued.severity = severity
+                self._push(queued)
+            return "merged"
+
+        job = AnalysisJob(patient_id, severity, vitals, anomalies)
+        if len(self._by_patient) >= self.max_size:
+            victim = self._lowest_priority()
+            if victim is None or victim.priority <= job.priority:
+                self._record_shed(job)
+                return "shed"
+            del self._by_patient[victim.patient_id]
+            self._record_shed(victim)
+
+        self._by_patient[patient_id] = job
+        self._push(job)
+        self.enqueued += 1
+        self._ready.set()
+        return "queued"
+
+    def _lowest_priority(self) -> Optional[AnalysisJob]:
+        """Oldest queued job of the lowest severity."""
+        victim = None
+        for job in self._by_patient.values():
+            if victim is None or job.priority > victim.priority:
+                victim = job
+        return victim
+
+    def _pop(self) -> Optional[AnalysisJob]:
+        """Highest-priority live job, skipping evicted and re-prioritised entries."""
+        while self._heap:
+            priority, _, job = heapq.heappop(self._heap)
+            if self._by_patient.get(job.patient_id) is job and priority == job.priority:
+                del self._by_patient[job.patient_id]
+                return job
+        return None
+
+    async def _worker(self):
+        """Serve jobs until cancelled."""
+        while True:
+            job = self._pop()
+            if job is None:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            started = time.monotonic()
+            self._waits_ms.append((started - job.enqueued_at) * 1000)
+            self._busy += 1
+            try:
+                await self.handler(job)
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Agent analysis failed for patient {job.patient_id}: {e}")
+            finally:
+                self._busy -= 1
+                self._total_run_ms += (time.monotonic() - started) * 1000
+
+    async def close(self, drain_timeout: float = 0.0):
+        """Optionally wait for queued jobs, then stop the workers."""
+        deadline = time.monotonic() + drain_timeout
+        while (len(self) or self._busy) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if len(self):
+            logger.warning(f"Analysis queue closed with {len(self)} jobs pending")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, wait times and shed counts."""
+        waits = sorted(self._waits_ms)
+        depth_by_severity: Dict[str, int] = {}
+        for job in self._by_patient.values():
+            depth_by_severity[job.severity] = depth_by_severity.get(job.severity, 0) + 1
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3)
+
+        finished = self.processed + self.failed
+        return {
+            "depth": len(self),
+            "depth_by_severity": depth_by_severity,
+            "max_size": self.max_size,
+            "workers": self.num_workers,
+            "busy_workers": self._busy,
+            "enqueued": self.enqueued,
+            "merged": self.merged,
+            "shed": dict(self.shed),
+            "shed_total": sum(self.shed.values()),
+            "processed": self.processed,
+            "failed": self.failed,
+            "p50_wait_ms": percentile(0.50),
+            "p99_wait_ms": percentile(0.99),
+            "max_wait_ms": round(waits[-1], 3) if waits else 0.0,
+            "avg_run_ms": round(self._total_run_ms / finished, 3) if finished else 0.0,
+        }
@@ -0,0 +1,135 @@
+"""Asyncio wrapper around a Kafka producer with delivery futures."""
+from typing import Dict, Any, Optional, Union, List, Tuple
+from collections import deque
+from loguru import logger
+import threading
+import asyncio
+import time
+
+
+class DeliveryError(Exception):
+    """A message could not be delivered to Kafka."""
+
+
+class AsyncKafkaProducer:
+    """
+    Produce without blocking the event loop and await acknowledgements.
+
+    A background thread polls the producer so delivery callbacks fire as
+    soon as the broker acknowledges a batch; each callback resolves the
+    asyncio future returned by ``produce()``. When librdkafka's local queue
+    is full, ``produce()`` waits for it to drain instead of failing.
+    """
+
+    def __init__(
+        self,
+        producer,
+        poll_interval: float = 0.05,
+        queue_full_backoff: float = 0.005,
+        latency_window: int = 10000
+    ):
+        """Initialize async producer."""
+        self.producer = producer
+        self.poll_interval = poll_interval
+        self.queue_full_backoff = queue_full_backoff
+
+        self._running = True
+        self._thread = threading.Thread(target=self._poll_loop, name="kafka-producer-poll", daemon=True)
+        self._thread.start()
+
+        # Metrics
+        self.produced = 0
+        self.delivered = 0
+        self.failed = 0
+        self.queue_full_waits = 0
+        self._latencies_ms: deque = deque(maxlen=latency_window)
+
+    def _poll_loop(self):
+        """Serve delivery callbacks until closed."""
+        while self._running:
+            try:
+                self.producer.poll(self.poll_interval)
+            except Exception as e:
+                logger.error(f"Producer poll error: {e}")
+
+    async def produce(
+        self,
+        topic: str,
+        value: Union[str, bytes],
+        key: Optional[Union[str, bytes]] = None,
+        headers: Optional[List[Tuple[str, bytes]]] = None
+    ) -> asyncio.Future:
+        """
+        Queue a message and return a future resolved on delivery.
+
+        Awaiting this coroutine only waits for room in the local queue
+        (backpressure); await the returned future for the broker ack.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        started = time.perf_counter()
+
+        def on_delivery(err, msg):
+            # Runs on the poll thread; the loop may be gone by now
+            latency_ms = (time.perf_counter() - started) * 1000
+            try:
+                loop.call_soon_threadsafe(self._resolve, future, err, msg, latency_ms)
+            except RuntimeError:
+                pass
+
+        while True:
+            try:
+                if headers:
+                    self.producer.produce(topic, value=value, key=key, headers=headers, on_delivery=on_delivery)
+                else:
+                    self.producer.produce(topic, value=value, key=key, on_delivery=on_delivery)
+                break
+            except BufferError:
+                self.queue_full_waits += 1
+                await asyncio.sleep(self.queue_full_backoff)
+
+        self.produced += 1
+        return future
+
+    def _resolve(self, future: asyncio.Future, err, msg, latency_ms: float):
+        """Complete a delivery future on the event loop."""
+        self._latencies_ms.append(latency_ms)
+        if err is not None:
+            self.failed += 1
+            if not future.done():
+                future.set_exception(DeliveryError(str(err)))
+        else:
+            self.delivered += 1
+            if not future.done():
+                future.set_result(msg)
+
+    async def flush(self, timeout: float = 30.0) -> int:
+        """Wait (off the loop) for queued messages; returns the number still queued."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.producer.flush, timeout)
+
+    def close(self, timeout: float = 30.0):
+        """Flush outstanding messages and stop the poll thread."""
+        try:
+            self.producer.flush(timeout)
+        finally:
+            self._running = False
+            self._thread.join(timeout=5)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Throughput, queue and delivery latency metrics."""
+        latencies = sorted(self._latencies_ms)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+        return {
+            "produced": self.produced,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "in_flight": self.produced - self.delivered - self.failed,
+            "queue_full_waits": self.queue_full_waits,
+            "p50_delivery_ms": percentile(0.50),
+            "p99_delivery_ms": percentile(0.99),
+        }
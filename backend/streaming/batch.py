@@ -0,0 +1,51 @@
+"""Column-oriented batches of vitals readings."""
+from typing import List, Dict, Any, Sequence
+import numpy as np
+import math
+
+
+def _coerce(value: Any) -> float:
+    """Coerce a vital value to float, NaN when missing or invalid."""
+    if value is None or value == "":
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class VitalsBatch:
+    """
+    A batch of decoded vitals messages with one NumPy column per channel.
+
+    ``records`` keeps the original dicts (for storage and the slow alert
+    path); ``matrix()`` exposes the numeric channels for vectorized checks.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        """Initialize vitals batch."""
+        self.records = records
+        self.patient_ids = [str(record.get("patient_id")) for record in records]
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def column(self, channel: str) -> np.ndarray:
+        """Float64 array for one channel (NaN where missing)."""
+        column = self._columns.get(channel)
+        if column is None:
+            raw = [record.get(channel) for record in self.records]
+            try:
+                # None becomes NaN under dtype=float
+                column = np.array(raw, dtype=np.float64)
+            except (TypeError, ValueError):
+                column = np.array([_coerce(value) for value in raw], dtype=np.float64)
+            self._columns[channel] = column
+        return column
+
+    def matrix(self, channels: Sequence[str]) -> np.ndarray:
+        """(rows, channels) float64 matrix for the given channels."""
+        if not self.records:
+            return np.empty((0, len(channels)), dtype=np.float64)
+        return np.column_stack([self.column(channel) for channel in channels])
@@ -0,0 +1,209 @@
+"""Wire codecs for vitals messages with a schema-version header byte.
+
+Binary messages start with a header byte naming the codec and schema
+version; legacy JSON messages start with ``{`` and are decoded as before,
+so producers can switch encodings without draining the topic first.
+"""
+from typing import Dict, Any, Optional, Tuple
+from backend.core.config import settings
+from backend.core.vitals_store import VITALS_CHANNELS, to_epoch, from_epoch
+import struct
+import json
+import math
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+
+JSON_HEADER = ord("{")
+
+# Bit for the timestamp in the presence mask (channels use bits 0..5)
+TIMESTAMP_BIT = 1 << len(VITALS_CHANNELS)
+
+
+class VitalsCodec:
+    """Base codec: ``encode`` returns None when a message does not fit the layout."""
+
+    name = ""
+    header = 0
+
+    def encode(self, message: Dict[str, Any]) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def decode(self, value: bytes) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class JsonCodec(VitalsCodec):
+    """Plain JSON, no header byte (the original wire format)."""
+
+    name = "json"
+    header = JSON_HEADER
+
+    def encode(self, message: Dict[str, Any]) -> Optional[bytes]:
+        return json.dumps(message).encode('utf-8')
+
+    def decode(self, value: bytes) -> Dict[str, Any]:
+        return json.loads(value.decode('utf-8') if isinstance(value, bytes) else value)
+
+
+class StructCodecV1(VitalsCodec):
+    """
+    Fixed-layout record, schema version 1.
+
+    Layout (little endian): header byte, presence mask, integer mask,
+    patient_id length, patient_id (UTF-8), float64 epoch timestamp if
+    present, then one float32 per present channel in VITALS_CHANNELS order.
+    Messages with fields outside this layout are not encodable.
+    """
+
+    name = "struct"
+    header = 0x01
+
+    _prefix = struct.Struct("<BBBB")
+    _known_fields = frozenset(("patient_id", "timestamp") + VITALS_CHANNELS)
+
+    def __init__(self):
+        """Initialize struct codec."""
+        self._bodies: Dict[int, struct.Struct] = {}
+
+    def _body(self, present: int) -> struct.Struct:
+        """Compiled struct for the fields flagged in ``present``."""
+        body = self._bodies.get(present)
+        if body is None:
+            fmt = "<" + ("d" if present & TIMESTAMP_BIT else "")
+            fmt += "f" * bin(present & (TIMESTAMP_BIT - 1)).count("1")
+            body = self._bodies[present] = struct.Struct(fmt)
+        return body
+
+    def encode(self, message: Dict[str, Any]) -> Optional[bytes]:
+        if not self._known_fields.issuperset(message):
+            return None
+        patient_id = str(message.get("patient_id", "")).encode('utf-8')
+        if len(patient_id) > 255:
+            return None
+
+        present = 0
+        integers = 0
+        values = []
+        timestamp = message.get("timestamp")
+        if timestamp is not None:
+            present |= TIMESTAMP_BIT
+            values.append(to_epoch(timestamp))
+        for bit, channel in enumerate(VITALS_CHANNELS):
+            value = message.get(channel)
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return None
+            present |= 1 << bit
+            if isinstance(value, int):
+                integers |= 1 << bit
+            values.append(value)
+
+        return (
+            self._prefix.pack(self.header, present, integers, len(patient_id))
+            + patient_id
+            + self._body(present).pack(*values)
+        )
+
+    def decode(self, value: bytes) -> Dict[str, Any]:
+        _, present, integers, id_length = self._prefix.unpack_from(value)
+        offset = self._prefix.size
+        message: Dict[str, Any] = {
+            "patient_id": value[offset:offset + id_length].decode('utf-8')
+        }
+        values = iter(self._body(present).unpack_from(value, offset + id_length))
+
+        if present & TIMESTAMP_BIT:
+            message["timestamp"] = from_epoch(next(values))
+        for bit, channel in enumerate(VITALS_CHANNELS):
+            if not present & (1 << bit):
+                continue
+            number = next(values)
+            if integers & (1 << bit):
+                message[channel] = int(round(number))
+            elif math.isfinite(number):
+                # Undo float32 noise (37.2 -> 37.200000762939)
+                message[channel] = float(f"{number:.7g}")
+            else:
+                message[channel] = number
+        return message
+
+
+class MsgpackCodecV1(VitalsCodec):
+    """Header byte followed by a msgpack map; carries arbitrary fields."""
+
+    name = "msgpack"
+    header = 0x02
+
+    def encode(self, message: Dict[str, Any]) -> Optional[bytes]:
+        return bytes((self.header,)) + msgpack.packb(message, use_bin_type=True)
+
+    def decode(self, value: bytes) -> Dict[str, Any]:
+        return msgpack.unpackb(value[1:], raw=False)
+
+
+_codecs_by_name: Dict[str, VitalsCodec] = {}
+_codecs_by_header: Dict[int, VitalsCodec] = {}
+
+
+def register_codec(codec: VitalsCodec):
+    """
+    Register a codec for encoding (by name) and decoding (by header byte).
+
+    A new schema version registers under the same name with a new header
+    byte: producers pick it up by name while consumers keep decoding the
+    older version's header.
+    """
+    existing = _codecs_by_header.get(codec.header)
+    if existing is not None and existing is not codec:
+        raise ValueError(f"Header byte {codec.header:#04x} already used by codec '{existing.name}'")
+    _codecs_by_name[codec.name] = codec
+    _codecs_by_header[codec.header] = codec
+
+
+def get_codec(name: str) -> VitalsCodec:
+    """Registered codec by name."""
+    try:
+        return _codecs_by_name[name.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Unknown vitals codec '{name}' (available: {', '.join(sorted(_codecs_by_name))})"
+        ) from None
+
+
+def available_codecs() -> Tuple[str, ...]:
+    """Names of registered codecs."""
+    return tuple(sorted(_codecs_by_name))
+
+
+def encode_vitals(message: Dict[str, Any], codec: Optional[str] = None) -> bytes:
+    """
+    Encode a vitals message with ``codec`` (default KAFKA_VITALS_CODEC).
+
+    Falls back to JSON for messages the codec cannot represent.
+    """
+    encoded = get_codec(codec or settings.KAFKA_VITALS_CODEC).encode(message)
+    if encoded is None:
+        encoded = _codecs_by_name["json"].encode(message)
+    return encoded
+
+
+def decode_vitals(value: bytes) -> Dict[str, Any]:
+    """Decode a vitals message in any registered format, including legacy JSON."""
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    codec = _codecs_by_header.get(value[0]) if value else None
+    if codec is None:
+        # Legacy JSON may carry leading whitespace or a BOM
+        return _codecs_by_name["json"].decode(value)
+    return codec.decode(value)
+
+
+register_codec(JsonCodec())
+register_codec(StructCodecV1())
+if msgpack is not None:
+    register_codec(MsgpackCodecV1())
@@ -1,9 +1,20 @@
 """Kafka consumer for processing patient vitals."""
 from backend.services.streaming_service import StreamingService
 from backend.streaming.processor import VitalsProcessor
+from backend.streaming.pipeline import ConsumerPipeline, BatchConsumerPipeline
+from backend.streaming.codecs import decode_vitals
+from backend.streaming.dead_letter import DeadLetterRouter, RetryWorker
+from backend.streaming.topics import TopicManager
 from backend.core.config import settings
+from backend.core.database import vitals_store
+from backend.core.vitals_buffer import recent_vitals
+from backend.core.vitals_trends import vitals_trends
+from backend.core.baselines import vitals_baselines
+from backend.core.risk_index import risk_index
 from loguru import logger
-from typing import Callable, Optional
+from typing import Callable, Optional, Dict, Any, List
+import asyncio
+import json
 
 
 class VitalsConsumer:
@@ -13,6 +24,12 @@ class VitalsConsumer:
         """Initialize vitals consumer."""
         self.streaming_service = StreamingService()
         self.processor = VitalsProcessor()
+        self.pipeline = None
+        self.dead_letter = None
+        self.retry_workers: List[RetryWorker] = []
+        self.assignment: List[str] = []
+        self.lag: Dict[str, int] = {}
+        self.rebalances = 0
 
     def start_consuming(
         self,
@@ -28,25 +45,161 @@ class VitalsConsumer:
         """
         topics = [settings.KAFKA_TOPIC_PATIENT_VITALS]
 
-        def handle_message(message_data: dict):
+        # Risk scoring reads recent vitals from memory; load them once up front
+        recent_vitals.warm(vitals_store)
+        vitals_trends.restore(recent_vitals, name="consumer")
+        vitals_baselines.restore(recent_vitals, name="consumer")
+        risk_index.rebuild(recent_vitals)
+
+        logger.info(f"Starting vitals consumer for topics: {topics}")
+        try:
+            asyncio.run(self.run(topics, callback, max_messages))
+        except KeyboardInterrupt:
+            logger.info("Consumer interrupted")
+
+    async def run(
+        self,
+        topics: list,
+        callback: Optional[Callable] = None,
+        max_messages: Optional[int] = None
+    ):
+        """Run the consumer pipeline on the current event loop."""
+        consumer = self.streaming_service.get_consumer(
+            topics,
+            auto_commit=False,
+            on_assign=self._on_assign,
+            on_revoke=self._on_revoke,
+            config_overrides={
+                'statistics.interval.ms': settings.CONSUMER_STATS_INTERVAL_MS,
+                'stats_cb': self._on_stats
+            }
+        )
+
+        async def handle_message(message_data: dict):
             """Handle incoming vitals message."""
-            try:
-                # Process through processor
-                asyncio.run(self.processor.process_vitals(message_data))
+            await self.processor.process_vitals(message_data)
 
-                # Call custom callback if provided
-                if callback:
+            # Call custom callback if provided
+            if callback:
+                callback(message_data)
+
+        async def handle_retry(message_data: dict):
+            """Handle a message from a retry tier (it was seen before: no dedup)."""
+            await self.processor.process_vitals(message_data, dedup=False)
+
+            if callback:
+                callback(message_data)
+
+        async def handle_batch(records: list):
+            """Handle a decoded micro-batch of vitals messages."""
+            timings = await self.processor.process_batch(records)
+
+            if callback:
+                for message_data in records:
                     callback(message_data)
+            return timings
 
-            except Exception as e:
-                logger.error(f"Error handling message: {e}")
+        if settings.CONSUMER_DEAD_LETTER_ENABLED:
+            self.dead_letter = DeadLetterRouter(self.streaming_service)
+        retry_consumers = []
+        self.retry_workers = []
+        if self.dead_letter is not None:
+            for _, retry_topic in TopicManager.retry_tiers():
+                retry_consumer = self.streaming_service.get_consumer(
+                    [retry_topic],
+                    auto_commit=False,
+                    config_overrides={'group.id': f"{settings.KAFKA_CONSUMER_GROUP}-retry"}
+                )
+                retry_consumers.append(retry_consumer)
+                self.retry_workers.append(RetryWorker(retry_consumer, handle_retry, self.dead_letter))
 
-        logger.info(f"Starting vitals consumer for topics: {topics}")
-        self.streaming_service.consume_messages(
-            topics=topics,
-            callback=handle_message,
-            max_messages=max_messages
-        )
+        if settings.CONSUMER_BATCH_MODE:
+            self.pipeline = BatchConsumerPipeline(
+                consumer,
+                handle_batch,
+                decoder=decode_vitals,
+                dead_letter=self.dead_letter,
+                batch_size=settings.CONSUMER_BATCH_SIZE,
+                batch_timeout_ms=settings.CONSUMER_BATCH_TIMEOUT_MS
+            )
+        else:
+            self.pipeline = ConsumerPipeline(
+                consumer,
+                handle_message,
+                decoder=decode_vitals,
+                dead_letter=self.dead_letter,
+                max_in_flight=settings.CONSUMER_MAX_IN_FLIGHT,
+                commit_interval_ms=settings.CONSUMER_COMMIT_INTERVAL_MS
+            )
+        retry_tasks = [asyncio.ensure_future(worker.run()) for worker in self.retry_workers]
+        await self.processor.live_bus.start()
+        try:
+            await self.pipeline.run(max_messages)
+        finally:
+            for worker in self.retry_workers:
+                worker.stop()
+            await asyncio.gather(*retry_tasks, return_exceptions=True)
+            for retry_consumer in retry_consumers:
+                retry_consumer.close()
+            consumer.close()
+            await self.processor.analysis_queue.close(drain_timeout=settings.AGENT_TIMEOUT_SECONDS)
+            await self.processor.live_bus.stop()
+            vitals_trends.checkpoint()
+            vitals_baselines.checkpoint()
+            logger.info(f"Vitals consumer stopped: {self.get_stats()}")
+
+    def stop(self):
+        """Stop polling and drain in-flight messages."""
+        if self.pipeline:
+            self.pipeline.stop()
+        for worker in self.retry_workers:
+            worker.stop()
+
+    def _on_assign(self, consumer, partitions):
+        """Rebalance callback: record newly assigned partitions."""
+        self.rebalances += 1
+        self.assignment = [f"{p.topic}[{p.partition}]" for p in partitions]
+        logger.info(f"Assigned partitions: {self.assignment}")
+
+    def _on_revoke(self, consumer, partitions):
+        """Rebalance callback: finish and commit work before partitions move."""
+        revoked = [f"{p.topic}[{p.partition}]" for p in partitions]
+        logger.info(f"Revoking partitions: {revoked}")
+        if self.pipeline:
+            self.pipeline.on_revoke(partitions)
+        self.assignment = [tp for tp in self.assignment if tp not in revoked]
+        for tp in revoked:
+            self.lag.pop(tp, None)
 
+    def _on_stats(self, stats_json: str):
+        """librdkafka statistics callback: keep per-partition consumer lag."""
+        try:
+            stats = json.loads(stats_json)
+            lag = {}
+            for topic, topic_stats in stats.get("topics", {}).items():
+                for partition, partition_stats in topic_stats.get("partitions", {}).items():
+                    if partition == "-1" or f"{topic}[{partition}]" not in self.assignment:
+                        continue
+                    lag[f"{topic}[{partition}]"] = partition_stats.get("consumer_lag", -1)
+            self.lag = lag
+        except Exception as e:
+            logger.error(f"Error parsing consumer statistics: {e}")
 
-import asyncio  # Import at top level for asyncio.run
+    def get_stats(self) -> Dict[str, Any]:
+        """Pipeline throughput plus partition assignment and lag."""
+        stats = self.pipeline.get_stats() if self.pipeline else {}
+        known_lag = [value for value in self.lag.values() if value is not None and value >= 0]
+        return {
+            **stats,
+            "partitions": list(self.assignment),
+            "lag": dict(self.lag),
+            "total_lag": sum(known_lag),
+            "rebalances": self.rebalances,
+            "analysis_queue": self.processor.analysis_queue.get_stats(),
+            "dedup": self.processor.dedup.get_stats() if self.processor.dedup else {},
+            "alert_state": self.processor.alert_state.get_stats() if self.processor.alert_state else {},
+            "dead_letter": {
+                **(self.dead_letter.get_stats() if self.dead_letter else {}),
+                "recovered_on_retry": sum(worker.recovered for worker in self.retry_workers),
+            },
+        }
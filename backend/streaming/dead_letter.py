@@ -0,0 +1,361 @@
+"""Retry tiers and dead-letter queue for vitals that fail to decode or process.
+
+A failed message is re-produced unchanged (same key and value) to the next
+retry topic, with its error and routing metadata in headers, and its
+offset on the source partition is committed as done. Retry topics are
+consumed separately and each message waits out its tier's delay, so a
+poison message never holds up the main partition. Once the retry tiers
+are used up, or when the error cannot be fixed by retrying (bad payload),
+the message goes to the dead-letter topic, where it can be inspected and
+replayed in bulk.
+"""
+from typing import Dict, Any, Callable, Awaitable, Optional, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from confluent_kafka import KafkaError, TopicPartition
+from backend.core.config import settings
+from backend.streaming.topics import TopicManager
+from backend.streaming.codecs import decode_vitals
+from loguru import logger
+import asyncio
+import base64
+import struct
+import time
+import uuid
+
+
+# Header names
+ERROR = "x-error"
+ERROR_TYPE = "x-error-type"
+ATTEMPT = "x-retry-attempt"
+RETRY_AT = "x-retry-at"
+FAILED_AT = "x-failed-at"
+ORIGINAL_TOPIC = "x-original-topic"
+ORIGINAL_PARTITION = "x-original-partition"
+ORIGINAL_OFFSET = "x-original-offset"
+
+# Bad payloads fail the same way on every attempt: dead-letter them directly.
+# Decode and validation errors only (JSON, UTF-8, msgpack and pydantic errors
+# are all ValueErrors); anything else may be a bug or an outage, so retry it.
+NON_RETRYABLE_ERRORS = (ValueError, struct.error)
+
+
+def read_headers(msg) -> Dict[str, str]:
+    """Message headers as a str -> str dict."""
+    headers = {}
+    for name, value in msg.headers() or []:
+        if isinstance(value, bytes):
+            value = value.decode('utf-8', errors='replace')
+        headers[name] = value
+    return headers
+
+
+class DeadLetterRouter:
+    """
+    Send failed messages to the next retry tier or the dead-letter topic.
+
+    Failures are counted rather than logged one by one; a summary is
+    logged at most every ``log_interval`` seconds so an error storm does
+    not turn into a logging storm.
+    """
+
+    def __init__(
+        self,
+        streaming_service,
+        retry_tiers: Optional[List[Tuple[int, str]]] = None,
+        dlq_topic: Optional[str] = None,
+        log_interval: float = 10.0,
+        route_retry_s: float = 1.0
+    ):
+        """Initialize dead-letter router."""
+        self.streaming_service = streaming_service
+        self.retry_tiers = retry_tiers if retry_tiers is not None else TopicManager.retry_tiers()
+        self.dlq_topic = dlq_topic or TopicManager.get_topic('vitals_dlq')
+        self.log_interval = log_interval
+        # Callers wait this long before routing a message again after a failed route
+        self.route_retry_s = route_retry_s
+
+        # Metrics
+        self.retried = 0
+        self.dead_lettered = 0
+        self.route_failures = 0
+        self._unlogged: Dict[str, int] = {}
+        self._last_log = 0.0
+
+    async def route(self, msg, error: Exception) -> bool:
+        """
+        Re-produce ``msg`` to its next destination and wait for the ack.
+
+        Returns:
+            False if it could not be produced: the caller must not commit
+            the message's offset, so it is redelivered or routed again
+        """
+        headers = read_headers(msg)
+        attempt = int(headers.get(ATTEMPT, 0))
+        now = time.time()
+
+        retryable = not isinstance(error, NON_RETRYABLE_ERRORS)
+        if retryable and attempt < len(self.retry_tiers):
+            delay, topic = self.retry_tiers[attempt]
+            attempt += 1
+            retry_at = now + delay
+        else:
+            topic = self.dlq_topic
+            retry_at = None
+
+        out_headers = {
+            ERROR: str(error)[:1000],
+            ERROR_TYPE: type(error).__name__,
+            ATTEMPT: str(attempt),
+            FAILED_AT: datetime.now(timezone.utc).isoformat(),
+            # Keep where the message originally came from across tiers
+            ORIGINAL_TOPIC: headers.get(ORIGINAL_TOPIC, msg.topic()),
+            ORIGINAL_PARTITION: headers.get(ORIGINAL_PARTITION, str(msg.partition())),
+            ORIGINAL_OFFSET: headers.get(ORIGINAL_OFFSET, str(msg.offset())),
+        }
+        if retry_at is not None:
+            out_headers[RETRY_AT] = f"{retry_at:.3f}"
+
+        try:
+            delivery = await self.streaming_service._produce(
+                topic, value=msg.value(), key=msg.key(),
+                headers=[(name, value.encode('utf-8')) for name, value in out_headers.items()]
+            )
+            await delivery
+        except Exception as e:
+            self.route_failures += 1
+            logger.error(f"Could not route failed message to {topic}: {e}")
+            return False
+
+        if topic == self.dlq_topic:
+            self.dead_lettered += 1
+        else:
+            self.retried += 1
+        self._record(topic, error)
+        return True
+
+    def _record(self, topic: str, error: Exception):
+        """Count a routed failure; log a summary at most every log_interval."""
+        self._unlogged[topic] = self._unlogged.get(topic, 0) + 1
+        now = time.monotonic()
+        if now - self._last_log < self.log_interval:
+            return
+        self._last_log = now
+        summary = ", ".join(f"{count} to {name}" for name, count in self._unlogged.items())
+        logger.warning(f"Routed failed vitals messages: {summary} (last error: {type(error).__name__}: {error})")
+        self._unlogged = {}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "route_failures": self.route_failures,
+        }
+
+
+class RetryWorker:
+    """
+    Consume one retry tier: hold each message until its retry time, then
+    process it again and route any new failure onwards.
+
+    Messages in a tier were all delayed by the same amount, so they become
+    due in log order and waiting on the head of the partition is enough.
+    While the head is not due its partition is paused and the consumer
+    keeps polling, so waiting out a long tier never exceeds
+    ``max.poll.interval.ms`` and other partitions keep flowing. A message
+    that fails again and cannot be routed onwards is held the same way
+    (uncommitted) and retried after the router's ``route_retry_s``.
+    """
+
+    def __init__(
+        self,
+        consumer,
+        handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+        router: DeadLetterRouter,
+        decoder: Callable[[bytes], Dict[str, Any]] = decode_vitals,
+        poll_timeout: float = 1.0
+    ):
+        """Initialize retry worker."""
+        self.consumer = consumer
+        self.handler = handler
+        self.router = router
+        self.decoder = decoder
+        self.poll_timeout = poll_timeout
+        self._stopping = False
+        # (topic, partition) -> (retry_at, message) for paused partitions
+        self._held: Dict[Tuple[str, int], Tuple[float, Any]] = {}
+
+        # Metrics
+        self.recovered = 0
+        self.failed = 0
+
+    def stop(self):
+        self._stopping = True
+
+    async def run(self):
+        """Poll, hold, reprocess and commit until stopped."""
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kafka-retry")
+        try:
+            while not self._stopping:
+                await self._release_due(loop, executor)
+
+                timeout = self.poll_timeout
+                if self._held:
+                    next_due = min(retry_at for retry_at, _ in self._held.values())
+                    timeout = max(0.0, min(timeout, next_due - time.time()))
+                msg = await loop.run_in_executor(executor, self.consumer.poll, timeout)
+                if msg is None:
+                    continue
+                if msg.error():
+                    if msg.error().code() != KafkaError._PARTITION_EOF:
+                        logger.error(f"Retry consumer error: {msg.error()}")
+                    continue
+
+                tp = (msg.topic(), msg.partition())
+                if tp in self._held:
+                    # Fetched before the pause took effect: rewind so it is
+                    # delivered again after the held message
+                    await loop.run_in_executor(
+                        executor, self.consumer.seek, TopicPartition(msg.topic(), msg.partition(), msg.offset())
+                    )
+                    continue
+
+                retry_at = float(read_headers(msg).get(RETRY_AT, 0))
+                if time.time() >= retry_at:
+                    if await self._reprocess(msg):
+                        continue
+                    retry_at = time.time() + self.router.route_retry_s
+                self._held[tp] = (retry_at, msg)
+                await loop.run_in_executor(
+                    executor, self.consumer.pause, [TopicPartition(msg.topic(), msg.partition())]
+                )
+            # Held messages stay uncommitted: redelivered on the next start
+        finally:
+            executor.shutdown(wait=False)
+
+    async def _release_due(self, loop, executor):
+        """Reprocess held messages whose retry time has come and resume their partitions."""
+        now = time.time()
+        for tp, (retry_at, msg) in list(self._held.items()):
+            if retry_at > now or self._stopping:
+                continue
+            if await self._reprocess(msg):
+                del self._held[tp]
+                await loop.run_in_executor(executor, self.consumer.resume, [TopicPartition(*tp)])
+            else:
+                self._held[tp] = (time.time() + self.router.route_retry_s, msg)
+
+    async def _reprocess(self, msg) -> bool:
+        """
+        Run the handler on one message, route a new failure onwards and commit.
+
+        Returns:
+            False if it failed and could not be routed (left uncommitted)
+        """
+        try:
+            await self.handler(self.decoder(msg.value()))
+            self.recovered += 1
+        except Exception as e:
+            self.failed += 1
+            if not await self.router.route(msg, e):
+                return False
+
+        try:
+            self.consumer.commit(message=msg, asynchronous=True)
+        except Exception as e:
+            logger.error(f"Error committing retry offset: {e}")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"recovered": self.recovered, "failed": self.failed, "held": len(self._held)}
+
+
+class DeadLetterQueue:
+    """Inspect and replay the vitals dead-letter topic."""
+
+    def __init__(self, streaming_service, topic: Optional[str] = None):
+        """Initialize dead-letter queue."""
+        self.streaming_service = streaming_service
+        self.topic = topic or TopicManager.get_topic('vitals_dlq')
+        self.replay_group = f"{settings.KAFKA_CONSUMER_GROUP}-dlq-replay"
+
+    def _read(self, consumer, limit: int, timeout: float) -> list:
+        """Up to ``limit`` messages; stops once the assigned partitions run dry."""
+        messages = []
+        deadline = time.monotonic() + timeout
+        while len(messages) < limit and time.monotonic() < deadline:
+            batch = consumer.consume(num_messages=min(500, limit - len(messages)), timeout=0.5)
+            batch = [msg for msg in batch if not msg.error()]
+            if not batch and consumer.assignment():
+                break
+            messages.extend(batch)
+        return messages
+
+    @staticmethod
+    def describe(msg) -> Dict[str, Any]:
+        """JSON-friendly view of a dead-lettered message."""
+        entry = {
+            "partition": msg.partition(),
+            "offset": msg.offset(),
+            "key": msg.key().decode('utf-8', errors='replace') if msg.key() else None,
+            "headers": read_headers(msg),
+        }
+        try:
+            entry["value"] = decode_vitals(msg.value())
+        except Exception:
+            entry["value_base64"] = base64.b64encode(msg.value() or b"").decode('ascii')
+        return entry
+
+    def peek(self, limit: int = 100, timeout: float = 5.0) -> List[Dict[str, Any]]:
+        """
+        Read dead-lettered messages without consuming them.
+
+        Uses a throwaway consumer group that never commits.
+        """
+        consumer = self.streaming_service.get_consumer(
+            [self.topic],
+            auto_commit=False,
+            config_overrides={
+                'group.id': f"{settings.KAFKA_CONSUMER_GROUP}-dlq-peek-{uuid.uuid4().hex[:8]}",
+                'auto.offset.reset': 'earliest',
+            }
+        )
+        try:
+            return [self.describe(msg) for msg in self._read(consumer, limit, timeout)]
+        finally:
+            consumer.close()
+
+    async def replay(self, limit: int = 1000, timeout: float = 5.0) -> Dict[str, int]:
+        """
+        Re-produce up to ``limit`` dead-lettered messages to their original topic.
+
+        Replayed messages start over with a fresh retry budget. Progress is
+        committed under a dedicated group, so each message is replayed once.
+        """
+        consumer = await asyncio.to_thread(lambda: self.streaming_service.get_consumer(
+            [self.topic],
+            auto_commit=False,
+            config_overrides={'group.id': self.replay_group, 'auto.offset.reset': 'earliest'}
+        ))
+        replayed = failed = 0
+        try:
+            messages = await asyncio.to_thread(self._read, consumer, limit, timeout)
+            deliveries = []
+            for msg in messages:
+                topic = read_headers(msg).get(ORIGINAL_TOPIC, settings.KAFKA_TOPIC_PATIENT_VITALS)
+                deliveries.append(await self.streaming_service._produce(topic, value=msg.value(), key=msg.key()))
+            for result in await asyncio.gather(*deliveries, return_exceptions=True):
+                if isinstance(result, Exception):
+                    failed += 1
+                else:
+                    replayed += 1
+
+            # Only move the replay position when everything was re-delivered
+            if messages and not failed:
+                await asyncio.to_thread(lambda: consumer.commit(asynchronous=False))
+        finally:
+            await asyncio.to_thread(consumer.close)
+
+        logger.info(f"Replayed {replayed} dead-lettered vitals messages ({failed} failed)")
+        return {"replayed": replayed, "failed": failed}
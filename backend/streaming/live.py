@@ -0,0 +1,252 @@
+"""In-process fan-out of live vitals and alerts to dashboard WebSocket clients.
+
+Producers (the vitals processor, the ingest API, AlertService) publish
+through ``backend.streaming.live_bus``, which hands events from this and
+other processes to ``live_hub.publish()``. That only drops the event into
+each subscribed client's outbox and never waits on a socket. Every client has its own
+sender task that flushes its outbox at most ``fps`` times a second:
+
+- vitals are coalesced per patient (the latest reading wins), so a
+  client sees at most one vitals update per patient per frame however
+  fast readings arrive;
+- alerts and other events are queued in order, up to ``max_pending``;
+  beyond that the oldest are dropped and counted. Each carries a
+  per-client ``seq`` (1, 2, 3, ...), so a client can tell when it
+  missed some.
+
+A client whose frame takes longer than ``send_timeout`` to write is
+disconnected, so one slow consumer cannot hold up the others.
+"""
+from typing import Dict, Any, Optional, Set, Iterable
+from collections import OrderedDict, deque
+from datetime import datetime
+from backend.core.config import settings
+from loguru import logger
+import asyncio
+import threading
+import json
+
+
+# StreamMessage types understood by the dashboard (frontend/src/types/streaming.types.ts)
+MESSAGE_TYPES = ("vitals", "alert", "agent_log", "system")
+
+
+def stream_message(message_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Wrap an event in the dashboard's StreamMessage envelope."""
+    return {"type": message_type, "data": data, "timestamp": datetime.utcnow().isoformat()}
+
+
+def _parse_list(value: Optional[Iterable[str]]) -> Optional[Set[str]]:
+    """Comma-separated string or list -> set (None/empty means everything)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    items = {str(item).strip() for item in value if str(item).strip()}
+    return items or None
+
+
+class LiveClient:
+    """One connected dashboard: its subscription, outbox and sender loop."""
+
+    def __init__(
+        self,
+        websocket,
+        types: Optional[Set[str]] = None,
+        patients: Optional[Set[str]] = None,
+        fps: float = 4.0,
+        max_pending: int = 500,
+        send_timeout: float = 2.0
+    ):
+        """Initialize live client."""
+        self.websocket = websocket
+        self.types = types
+        self.patients = patients
+        self.frame_interval = 1.0 / fps if fps > 0 else 0.0
+        self.send_timeout = send_timeout
+
+        self._vitals: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._events: deque = deque(maxlen=max(1, max_pending))
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.event_seq = 0
+
+        # Metrics
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def wants(self, message_type: str, patient_id: Optional[str]) -> bool:
+        if self.types is not None and message_type not in self.types:
+            return False
+        if self.patients is not None and patient_id is not None and patient_id not in self.patients:
+            return False
+        return True
+
+    def offer(self, message: Dict[str, Any], patient_id: Optional[str]):
+        """Queue a message for the next frame (never blocks)."""
+        if message["type"] == "vitals" and patient_id is not None:
+            if patient_id in self._vitals:
+                self.coalesced += 1
+                del self._vitals[patient_id]
+            self._vitals[patient_id] = message
+        else:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self.event_seq += 1
+            self._events.append({**message, "seq": self.event_seq})
+        self._ready.set()
+
+    def subscribe(self, types=None, patients=None):
+        """Replace the subscription; unspecified parts are left unchanged."""
+        if types is not None:
+            self.types = _parse_list(types)
+        if patients is not None:
+            self.patients = _parse_list(patients)
+        # Drop queued vitals the client no longer wants
+        for patient_id in [p for p in self._vitals if not self.wants("vitals", p)]:
+            del self._vitals[patient_id]
+
+    def subscription(self) -> Dict[str, Any]:
+        return {
+            "types": sorted(self.types) if self.types is not None else list(MESSAGE_TYPES),
+            "patients": sorted(self.patients) if self.patients is not None else "*",
+        }
+
+    def _take_frame(self) -> list:
+        """Everything queued, events first (alerts must not wait behind vitals)."""
+        frame = list(self._events) + list(self._vitals.values())
+        self._events.clear()
+        self._vitals.clear()
+        self._ready.clear()
+        return frame
+
+    async def send(self, message: Dict[str, Any]):
+        await asyncio.wait_for(self.websocket.send_text(json.dumps(message, default=str)), self.send_timeout)
+
+    async def run(self):
+        """Flush the outbox at most once per frame until closed or too slow."""
+        loop = asyncio.get_running_loop()
+        try:
+            while not self.closed:
+                await self._ready.wait()
+                started = loop.time()
+                frame = self._take_frame()
+
+                async def write():
+                    for message in frame:
+                        await self.websocket.send_text(json.dumps(message, default=str))
+
+                await asyncio.wait_for(write(), self.send_timeout)
+                self.sent += len(frame)
+
+                remaining = self.frame_interval - (loop.time() - started)
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+        except asyncio.TimeoutError:
+            logger.warning(f"Live stream client too slow (frame took > {self.send_timeout}s), disconnecting")
+            raise
+
+
+class LiveStreamHub:
+    """Registry of live clients and the publish entry point."""
+
+    def __init__(
+        self,
+        fps: float = 4.0,
+        max_pending: int = 500,
+        send_timeout: float = 2.0,
+        max_clients: int = 200
+    ):
+        """Initialize live stream hub."""
+        self.fps = fps
+        self.max_pending = max_pending
+        self.send_timeout = send_timeout
+        self.max_clients = max_clients
+        self._clients: Set[LiveClient] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+
+        # Metrics (counters of disconnected clients are folded in here)
+        self.published = 0
+        self.slow_disconnects = 0
+        self.rejected = 0
+        self._closed_totals = {"sent": 0, "coalesced": 0, "dropped": 0}
+
+    def connect(self, websocket, types=None, patients=None) -> Optional[LiveClient]:
+        """Register a client (None when at max_clients)."""
+        if len(self._clients) >= self.max_clients:
+            self.rejected += 1
+            return None
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        client = LiveClient(
+            websocket,
+            types=_parse_list(types),
+            patients=_parse_list(patients),
+            fps=self.fps,
+            max_pending=self.max_pending,
+            send_timeout=self.send_timeout
+        )
+        self._clients.add(client)
+        return client
+
+    def disconnect(self, client: LiveClient, slow: bool = False):
+        client.closed = True
+        if client in self._clients:
+            self._clients.remove(client)
+            for name in self._closed_totals:
+                self._closed_totals[name] += getattr(client, name)
+        if slow:
+            self.slow_disconnects += 1
+
+    def publish(self, message_type: str, data: Dict[str, Any]):
+        """
+        Offer an event to every subscribed client.
+
+        Cheap when nobody is connected; safe to call from worker threads
+        (the fan-out is handed to the clients' event loop).
+        """
+        if not self._clients:
+            return
+        if threading.get_ident() != self._loop_thread:
+            try:
+                self._loop.call_soon_threadsafe(self._fan_out, message_type, data)
+            except RuntimeError:
+                pass  # Loop already closed (shutdown)
+            return
+        self._fan_out(message_type, data)
+
+    def _fan_out(self, message_type: str, data: Dict[str, Any]):
+        self.published += 1
+        patient_id = data.get("patient_id")
+        patient_id = str(patient_id) if patient_id is not None else None
+        message = None
+        for client in self._clients:
+            if client.wants(message_type, patient_id):
+                if message is None:
+                    message = stream_message(message_type, data)
+                client.offer(message, patient_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        clients = list(self._clients)
+        return {
+            "clients": len(clients),
+            "fps": self.fps,
+            "published": self.published,
+            **{
+                name: total + sum(getattr(client, name) for client in clients)
+                for name, total in self._closed_totals.items()
+            },
+            "slow_disconnects": self.slow_disconnects,
+            "rejected": self.rejected,
+        }
+
+
+# Global live stream hub
+live_hub = LiveStreamHub(
+    fps=settings.LIVE_STREAM_FPS,
+    max_pending=settings.LIVE_STREAM_MAX_PENDING,
+    send_timeout=settings.LIVE_STREAM_SEND_TIMEOUT_S,
+    max_clients=settings.LIVE_STREAM_MAX_CLIENTS
+)
@@ -0,0 +1,265 @@
+"""Pub/sub bridge that carries live events between API workers and consumers.
+
+Every process that produces live events (uvicorn workers, vitals
+consumers) publishes through ``live_bus``. Events are always fanned out
+to the process's own WebSocket clients straight away; with the Redis
+backend they are also published, in batches, on one channel that every
+process subscribes to, so a client attached to any worker sees events
+from all of them.
+
+Redis pub/sub is at-most-once. Each batch carries its origin (one per
+process) and a per-origin sequence number; a receiver that notices a
+skipped number tells its clients with a ``system`` message
+(``{"event": "gap", ...}``) so they can resync over the REST API.
+
+In-process state built from events (trends, baselines, the risk index)
+registers with ``add_listener`` to also see what other processes published.
+"""
+from typing import Dict, Any, Callable, List, Optional
+from backend.core.config import settings
+from backend.streaming.live import LiveStreamHub, live_hub
+from loguru import logger
+import threading
+import asyncio
+import json
+import uuid
+
+
+class LiveBus:
+    """In-process bus: events only reach this process's clients."""
+
+    backend = "memory"
+
+    def __init__(self, hub: LiveStreamHub):
+        """Initialize live bus."""
+        self.hub = hub
+        self.published = 0
+        self._listeners: Dict[str, List[Callable[[List[Dict[str, Any]]], Any]]] = {}
+
+    def publish(self, message_type: str, data: Dict[str, Any]):
+        """Publish a live event (never blocks; safe from worker threads)."""
+        self.published += 1
+        self.hub.publish(message_type, data)
+
+    def add_listener(self, message_type: str, callback: Callable[[List[Dict[str, Any]]], Any]):
+        """
+        Call ``callback(events)`` with each batch of ``message_type`` event
+        data published by other processes (never with this process's own).
+        """
+        self._listeners.setdefault(message_type, []).append(callback)
+
+    def _notify_listeners(self, events: Dict[str, List[Dict[str, Any]]]):
+        for message_type, data in events.items():
+            for callback in self._listeners.get(message_type, []):
+                try:
+                    callback(data)
+                except Exception as e:
+                    logger.error(f"Live bus listener for {message_type} failed: {e}")
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "published": self.published}
+
+
+class RedisLiveBus(LiveBus):
+    """
+    Bus over Redis pub/sub.
+
+    Events are buffered and sent every ``flush_ms`` as Redis messages of
+    up to ``max_batch`` events, so a burst of readings costs a handful of
+    PUBLISH calls instead of one each.
+    Falls back to in-process delivery when Redis cannot be reached.
+    """
+
+    backend = "redis"
+
+    def __init__(
+        self,
+        hub: LiveStreamHub,
+        redis_client=None,
+        channel: str = "monit:live",
+        flush_ms: int = 50,
+        max_batch: int = 500
+    ):
+        """Initialize Redis live bus."""
+        super().__init__(hub)
+        self.redis = redis_client
+        self.channel = channel
+        self.flush_interval = flush_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.origin = uuid.uuid4().hex[:12]
+
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._last_seen: Dict[str, int] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+
+        # Metrics
+        self.batches_sent = 0
+        self.batches_received = 0
+        self.events_received = 0
+        self.gaps = 0
+        self.missed_batches = 0
+        self.errors = 0
+
+    def publish(self, message_type: str, data: Dict[str, Any]):
+        super().publish(message_type, data)
+        if not self._running:
+            return
+        with self._lock:
+            self._pending.append({"type": message_type, "data": data})
+
+    async def start(self):
+        """Connect, then run the flusher and the listener on this loop."""
+        if self._running:
+            return
+        try:
+            await self.redis.ping()
+        except Exception as e:
+            logger.warning(f"Redis unavailable for live bus, events stay in this process: {e}")
+            return
+        self._running = True
+        self._tasks = [
+            asyncio.ensure_future(self._flush_loop()),
+            asyncio.ensure_future(self._listen_loop()),
+        ]
+        logger.info(f"Live bus connected to Redis channel {self.channel} (origin {self.origin})")
+
+    async def stop(self):
+        """Send what is buffered and stop."""
+        if not self._running:
+            return
+        self._running = False
+        await self.flush()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def flush(self):
+        """Publish buffered events in batches of at most max_batch."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for start in range(0, len(pending), self.max_batch):
+            self._seq += 1
+            payload = json.dumps({
+                "origin": self.origin,
+                "seq": self._seq,
+                "events": pending[start:start + self.max_batch],
+            }, default=str)
+            try:
+                await self.redis.publish(self.channel, payload)
+                self.batches_sent += 1
+            except Exception as e:
+                # The sequence number is spent: receivers will report the gap
+                self.errors += 1
+                logger.error(f"Error publishing live events to Redis: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _listen_loop(self):
+        """Fan out batches from other processes; reconnect on errors."""
+        backoff = 0.5
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                backoff = 0.5
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._receive(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Live bus subscription lost, reconnecting in {backoff}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 10.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def _receive(self, raw):
+        try:
+            batch = json.loads(raw)
+        except ValueError:
+            self.errors += 1
+            return
+        origin = batch.get("origin")
+        if origin == self.origin:
+            return  # Already delivered locally
+        seq = int(batch.get("seq", 0))
+        last = self._last_seen.get(origin)
+        if last is not None and seq > last + 1:
+            missed = seq - last - 1
+            self.gaps += 1
+            self.missed_batches += missed
+            self.hub.publish("system", {"event": "gap", "origin": origin, "missed_batches": missed})
+        self._last_seen[origin] = max(seq, last or 0)
+
+        self.batches_received += 1
+        remote: Dict[str, List[Dict[str, Any]]] = {}
+        for event in batch.get("events", []):
+            self.events_received += 1
+            self.hub.publish(event["type"], event["data"])
+            if event["type"] in self._listeners:
+                remote.setdefault(event["type"], []).append(event["data"])
+        self._notify_listeners(remote)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            **super().get_stats(),
+            "connected": self._running,
+            "origin": self.origin,
+            "pending": pending,
+            "batches_sent": self.batches_sent,
+            "batches_received": self.batches_received,
+            "events_received": self.events_received,
+            "gaps": self.gaps,
+            "missed_batches": self.missed_batches,
+            "errors": self.errors,
+            "peers": len(self._last_seen),
+        }
+
+
+def create_live_bus(hub: Optional[LiveStreamHub] = None) -> LiveBus:
+    """Build the live event bus from settings."""
+    hub = hub or live_hub
+    if settings.LIVE_BUS_BACKEND.lower() == "redis":
+        try:
+            import redis.asyncio as aioredis
+            redis_client = aioredis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                password=settings.REDIS_PASSWORD or None,
+                socket_connect_timeout=1.0
+            )
+            return RedisLiveBus(
+                hub,
+                redis_client,
+                channel=settings.LIVE_BUS_CHANNEL,
+                flush_ms=settings.LIVE_BUS_FLUSH_MS,
+                max_batch=settings.LIVE_BUS_MAX_BATCH
+            )
+        except ImportError as e:
+            logger.warning(f"redis package unavailable for live bus, using in-process delivery: {e}")
+    return LiveBus(hub)
+
+
+# Global live event bus
+live_bus = create_live_bus()
@@ -0,0 +1,523 @@
+"""In-process partitioned log that stands in for a Kafka cluster.
+
+Models what the streaming code relies on: keyed partitioning, per-partition
+offsets, consumer groups with partition assignment and rebalance callbacks,
+committed offsets and auto.offset.reset, plus a bounded producer queue whose
+delivery callbacks are served from ``poll()``. Producers and consumers
+mirror the parts of the confluent_kafka API used in this repo, so they can
+be swapped in through the streaming transport (KAFKA_TRANSPORT=memory).
+
+State lives in this process only; it is for local runs, benchmarks and tests.
+"""
+from typing import Dict, Any, Callable, Optional, List, Tuple
+from collections import deque
+from confluent_kafka import TopicPartition, OFFSET_INVALID, TIMESTAMP_CREATE_TIME
+from backend.core.config import settings
+from loguru import logger
+import itertools
+import threading
+import zlib
+import json
+import time
+
+
+class MemoryMessage:
+    """Stored record with the confluent_kafka.Message accessors."""
+
+    __slots__ = ("_topic", "_partition", "_offset", "_key", "_value", "_timestamp", "_headers")
+
+    def __init__(self, topic: str, partition: int, offset: int, key, value, timestamp: int, headers=None):
+        self._topic = topic
+        self._partition = partition
+        self._offset = offset
+        self._key = key
+        self._value = value
+        self._timestamp = timestamp
+        self._headers = headers
+
+    def topic(self) -> str:
+        return self._topic
+
+    def partition(self) -> int:
+        return self._partition
+
+    def offset(self) -> int:
+        return self._offset
+
+    def key(self) -> Optional[bytes]:
+        return self._key
+
+    def value(self) -> Optional[bytes]:
+        return self._value
+
+    def timestamp(self) -> Tuple[int, int]:
+        return TIMESTAMP_CREATE_TIME, self._timestamp
+
+    def headers(self) -> Optional[List[Tuple[str, bytes]]]:
+        return self._headers
+
+    def error(self):
+        return None
+
+
+def _to_bytes(data) -> Optional[bytes]:
+    """Keys and values are stored as bytes, like librdkafka returns them."""
+    if data is None or isinstance(data, bytes):
+        return data
+    return str(data).encode('utf-8')
+
+
+class MemoryBroker:
+    """
+    Topics, partition logs and consumer group state.
+
+    Topics are created on first use with ``num_partitions`` partitions.
+    Keyed messages go to ``crc32(key) % partitions`` so one key always
+    lands on the same partition; unkeyed messages are spread round robin.
+    Group membership changes reassign partitions round robin across the
+    members subscribed to each topic.
+    """
+
+    def __init__(self, num_partitions: int = 6):
+        """Initialize in-memory broker."""
+        self.num_partitions = max(1, num_partitions)
+        self._logs: Dict[str, List[List[MemoryMessage]]] = {}
+        self._committed: Dict[str, Dict[Tuple[str, int], int]] = {}
+        self._members: Dict[str, List["MemoryConsumer"]] = {}
+        self._generations: Dict[str, int] = {}
+        self._round_robin = itertools.count()
+        self._cond = threading.Condition()
+
+    # ------------------------------------------------------------------
+    # Topics and logs
+    # ------------------------------------------------------------------
+
+    def create_topic(self, topic: str, num_partitions: Optional[int] = None):
+        """Create a topic (no-op when it exists)."""
+        with self._cond:
+            self._ensure_topic(topic, num_partitions)
+
+    def _ensure_topic(self, topic: str, num_partitions: Optional[int] = None) -> List[List[MemoryMessage]]:
+        log = self._logs.get(topic)
+        if log is None:
+            log = self._logs[topic] = [[] for _ in range(max(1, num_partitions or self.num_partitions))]
+        return log
+
+    def partitions_for(self, topic: str) -> int:
+        """Partition count of a topic (created on demand)."""
+        with self._cond:
+            return len(self._ensure_topic(topic))
+
+    def partition_for(self, topic: str, key: Optional[bytes]) -> int:
+        """Partition a message with ``key`` is written to."""
+        partitions = self.partitions_for(topic)
+        if key is None:
+            return next(self._round_robin) % partitions
+        return zlib.crc32(key) % partitions
+
+    def append(
+        self,
+        topic: str,
+        value,
+        key=None,
+        partition: int = -1,
+        timestamp: Optional[int] = None,
+        headers=None
+    ) -> MemoryMessage:
+        """Write one record and wake waiting consumers."""
+        key, value = _to_bytes(key), _to_bytes(value)
+        if headers:
+            items = headers.items() if isinstance(headers, dict) else headers
+            headers = [(name, _to_bytes(data)) for name, data in items]
+        if partition is None or partition < 0:
+            partition = self.partition_for(topic, key)
+        with self._cond:
+            log = self._ensure_topic(topic)[partition]
+            msg = MemoryMessage(
+                topic, partition, len(log), key, value,
+                timestamp if timestamp is not None else int(time.time() * 1000),
+                headers or None
+            )
+            log.append(msg)
+            self._cond.notify_all()
+        return msg
+
+    def end_offsets(self, topic: str) -> List[int]:
+        """High watermark of every partition."""
+        with self._cond:
+            return [len(log) for log in self._ensure_topic(topic)]
+
+    def read(self, topic: str, partition: int, offset: int, max_count: int) -> List[MemoryMessage]:
+        """Up to ``max_count`` records starting at ``offset``."""
+        with self._cond:
+            return self._logs[topic][partition][offset:offset + max_count]
+
+    def wait(self, timeout: float):
+        """Block until something is written or ``timeout`` elapses."""
+        with self._cond:
+            self._cond.wait(timeout)
+
+    # ------------------------------------------------------------------
+    # Consumer groups
+    # ------------------------------------------------------------------
+
+    def commit(self, group: str, offsets: Dict[Tuple[str, int], int]):
+        """Store committed offsets (next offset to read) for a group."""
+        with self._cond:
+            self._committed.setdefault(group, {}).update(offsets)
+
+    def committed(self, group: str, tp: Tuple[str, int]) -> Optional[int]:
+        """Committed offset for a partition, None when the group has none."""
+        with self._cond:
+            return self._committed.get(group, {}).get(tp)
+
+    def join(self, member: "MemoryConsumer"):
+        """Add a member to its group and rebalance."""
+        with self._cond:
+            members = self._members.setdefault(member.group, [])
+            if member not in members:
+                members.append(member)
+            self._rebalance(member.group)
+
+    def leave(self, member: "MemoryConsumer"):
+        """Remove a member from its group and rebalance the rest."""
+        with self._cond:
+            members = self._members.get(member.group, [])
+            if member in members:
+                members.remove(member)
+                self._rebalance(member.group)
+
+    def _rebalance(self, group: str):
+        """Reassign partitions; members apply it on their next poll."""
+        self._generations[group] = self._generations.get(group, 0) + 1
+        members = self._members.get(group, [])
+        assignments: Dict[int, List[Tuple[str, int]]] = {id(m): [] for m in members}
+
+        for topic in sorted({t for m in members for t in m.subscription}):
+            subscribed = [m for m in members if topic in m.subscription]
+            for partition in range(len(self._ensure_topic(topic))):
+                owner = subscribed[partition % len(subscribed)]
+                assignments[id(owner)].append((topic, partition))
+
+        for member in members:
+            member._pending_assignment = assignments[id(member)]
+        self._cond.notify_all()
+
+    def take_assignment(self, member: "MemoryConsumer") -> Optional[List[Tuple[str, int]]]:
+        """Pop a member's pending assignment (None when nothing changed)."""
+        with self._cond:
+            assignment, member._pending_assignment = member._pending_assignment, None
+            return assignment
+
+    def reset(self):
+        """Drop all topics, offsets and groups."""
+        with self._cond:
+            self._logs.clear()
+            self._committed.clear()
+            self._members.clear()
+            self._generations.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-topic sizes and per-group lag."""
+        with self._cond:
+            groups = {}
+            for group, members in self._members.items():
+                committed = self._committed.get(group, {})
+                lag = sum(
+                    len(log) - committed.get((topic, partition), 0)
+                    for topic in {t for m in members for t in m.subscription}
+                    for partition, log in enumerate(self._logs.get(topic, []))
+                )
+                groups[group] = {
+                    "members": len(members),
+                    "generation": self._generations.get(group, 0),
+                    "lag": lag,
+                }
+            return {
+                "topics": {
+                    topic: {"partitions": len(logs), "messages": sum(len(log) for log in logs)}
+                    for topic, logs in self._logs.items()
+                },
+                "groups": groups,
+            }
+
+
+class MemoryProducer:
+    """
+    Producer with librdkafka's queueing behaviour.
+
+    ``produce()`` enqueues locally and raises BufferError when the queue
+    holds ``queue_size`` messages. Records are written to the broker and
+    delivery callbacks fire from ``poll()``/``flush()`` once they are
+    ``ack_ms`` old, simulating the broker round trip.
+    """
+
+    def __init__(self, broker: MemoryBroker, queue_size: int = 100000, ack_ms: float = 0.0):
+        """Initialize in-memory producer."""
+        self.broker = broker
+        self.queue_size = max(1, queue_size)
+        self.ack = ack_ms / 1000.0
+        self._pending: deque = deque()
+        self._cond = threading.Condition()
+
+    def produce(
+        self,
+        topic: str,
+        value=None,
+        key=None,
+        partition: int = -1,
+        on_delivery: Optional[Callable] = None,
+        callback: Optional[Callable] = None,
+        timestamp: int = 0,
+        headers=None
+    ):
+        """Queue a message for delivery."""
+        with self._cond:
+            if len(self._pending) >= self.queue_size:
+                raise BufferError("Local: Queue full")
+            self._pending.append((
+                time.perf_counter(), topic, value, key, partition,
+                timestamp or None, headers, on_delivery or callback
+            ))
+            self._cond.notify_all()
+
+    def poll(self, timeout: Optional[float] = None) -> int:
+        """Deliver acknowledged messages and serve their callbacks."""
+        deadline = time.perf_counter() + (timeout or 0)
+        while True:
+            now = time.perf_counter()
+            with self._cond:
+                ready = []
+                while self._pending and now - self._pending[0][0] >= self.ack:
+                    ready.append(self._pending.popleft())
+                if not ready:
+                    if now >= deadline:
+                        return 0
+                    # Wait for the oldest message to age, or for new ones
+                    wait = deadline - now
+                    if self._pending:
+                        wait = min(wait, self.ack - (now - self._pending[0][0]))
+                    self._cond.wait(max(0.0, wait))
+                    continue
+
+            for _, topic, value, key, partition, timestamp, headers, on_delivery in ready:
+                msg = self.broker.append(
+                    topic, value, key=key, partition=partition, timestamp=timestamp, headers=headers
+                )
+                if on_delivery:
+                    try:
+                        on_delivery(None, msg)
+                    except Exception as e:
+                        logger.error(f"Delivery callback error: {e}")
+            return len(ready)
+
+    def flush(self, timeout: Optional[float] = None) -> int:
+        """Deliver everything queued; returns the number still queued."""
+        deadline = None if timeout is None or timeout < 0 else time.perf_counter() + timeout
+        while len(self):
+            remaining = 0.1 if deadline is None else deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            self.poll(min(remaining, max(self.ack, 0.001)))
+        return len(self)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+class MemoryConsumer:
+    """
+    Consumer group member over a MemoryBroker.
+
+    Rebalance callbacks (``on_revoke`` then ``on_assign``) and the
+    statistics callback are served from ``poll()``/``consume()`` on the
+    polling thread, as librdkafka does. Newly assigned partitions resume
+    from the group's committed offset, else from ``auto.offset.reset``.
+    """
+
+    def __init__(self, broker: MemoryBroker, config: Dict[str, Any]):
+        """Initialize in-memory consumer."""
+        self.broker = broker
+        self.group = config.get('group.id', 'default')
+        self.offset_reset = config.get('auto.offset.reset', 'latest')
+        self.auto_commit = config.get('enable.auto.commit', True)
+        self.auto_commit_interval = config.get('auto.commit.interval.ms', 5000) / 1000.0
+        self.stats_cb = config.get('stats_cb')
+        self.stats_interval = config.get('statistics.interval.ms', 0) / 1000.0
+
+        self.subscription: List[str] = []
+        self._assignment: List[Tuple[str, int]] = []
+        self._pending_assignment: Optional[List[Tuple[str, int]]] = None
+        self._positions: Dict[Tuple[str, int], int] = {}
+        self._paused: set = set()
+        self._on_assign: Optional[Callable] = None
+        self._on_revoke: Optional[Callable] = None
+        self._next_partition = 0
+        self._last_auto_commit = time.monotonic()
+        self._last_stats = time.monotonic()
+        self._closed = False
+
+    def subscribe(
+        self,
+        topics: List[str],
+        on_assign: Optional[Callable] = None,
+        on_revoke: Optional[Callable] = None
+    ):
+        """Join the group for ``topics``."""
+        self.subscription = list(topics)
+        self._on_assign = on_assign
+        self._on_revoke = on_revoke
+        self.broker.join(self)
+
+    def assignment(self) -> List[TopicPartition]:
+        return [TopicPartition(topic, partition) for topic, partition in self._assignment]
+
+    def _apply_rebalance(self):
+        """Swap in a pending assignment, running the rebalance callbacks."""
+        assignment = self.broker.take_assignment(self)
+        if assignment is None:
+            return
+
+        if self._assignment:
+            if self._on_revoke:
+                self._on_revoke(self, self.assignment())
+            if self.auto_commit:
+                self.commit(asynchronous=False)
+
+        self._assignment = assignment
+        self._positions = {}
+        self._paused = set()
+        for topic, partition in assignment:
+            committed = self.broker.committed(self.group, (topic, partition))
+            if committed is None:
+                committed = 0 if self.offset_reset in ('earliest', 'smallest', 'beginning') \
+                    else self.broker.end_offsets(topic)[partition]
+            self._positions[(topic, partition)] = committed
+
+        if self._on_assign:
+            self._on_assign(self, self.assignment())
+
+    def _maintenance(self):
+        """Rebalance, auto-commit and statistics duties run on every poll."""
+        self._apply_rebalance()
+        now = time.monotonic()
+        if self.auto_commit and now - self._last_auto_commit >= self.auto_commit_interval:
+            self._last_auto_commit = now
+            self.commit(asynchronous=False)
+        if self.stats_cb and self.stats_interval > 0 and now - self._last_stats >= self.stats_interval:
+            self._last_stats = now
+            self.stats_cb(self._stats_json())
+
+    def _fetch(self, max_count: int) -> List[MemoryMessage]:
+        """Read from assigned partitions, rotating the start for fairness."""
+        records: List[MemoryMessage] = []
+        count = len(self._assignment)
+        for i in range(count):
+            tp = self._assignment[(self._next_partition + i) % count]
+            if tp in self._paused:
+                continue
+            batch = self.broker.read(tp[0], tp[1], self._positions[tp], max_count - len(records))
+            if batch:
+                self._positions[tp] += len(batch)
+                records.extend(batch)
+            if len(records) >= max_count:
+                break
+        if count:
+            self._next_partition = (self._next_partition + 1) % count
+        return records
+
+    def consume(self, num_messages: int = 1, timeout: Optional[float] = -1) -> List[MemoryMessage]:
+        """Up to ``num_messages`` records, waiting at most ``timeout`` seconds for the first."""
+        if self._closed:
+            raise RuntimeError("Consumer closed")
+        deadline = None if timeout is None or timeout < 0 else time.monotonic() + timeout
+        while True:
+            self._maintenance()
+            records = self._fetch(max(1, num_messages))
+            if records:
+                return records
+            remaining = 0.1 if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            self.broker.wait(min(remaining, 0.1))
+
+    def poll(self, timeout: Optional[float] = None) -> Optional[MemoryMessage]:
+        """Next record, or None after ``timeout`` seconds."""
+        records = self.consume(1, -1 if timeout is None else timeout)
+        return records[0] if records else None
+
+    def pause(self, partitions: List[TopicPartition]):
+        """Stop fetching from ``partitions`` (positions are kept)."""
+        self._paused.update((tp.topic, tp.partition) for tp in partitions)
+
+    def resume(self, partitions: List[TopicPartition]):
+        """Fetch from paused ``partitions`` again."""
+        self._paused.difference_update((tp.topic, tp.partition) for tp in partitions)
+
+    def seek(self, partition: TopicPartition):
+        """Move the fetch position of an assigned partition."""
+        tp = (partition.topic, partition.partition)
+        if tp not in self._positions:
+            raise RuntimeError(f"Partition {partition.topic}[{partition.partition}] not assigned")
+        self._positions[tp] = partition.offset
+
+    def commit(self, message=None, offsets: Optional[List[TopicPartition]] = None, asynchronous: bool = True):
+        """Commit a message, explicit offsets, or the current positions."""
+        if message is not None:
+            committed = {(message.topic(), message.partition()): message.offset() + 1}
+        elif offsets is not None:
+            committed = {(tp.topic, tp.partition): tp.offset for tp in offsets}
+        else:
+            committed = {tp: position for tp, position in self._positions.items()}
+        if committed:
+            self.broker.commit(self.group, committed)
+        if not asynchronous:
+            return [TopicPartition(topic, partition, offset) for (topic, partition), offset in committed.items()]
+        return None
+
+    def committed(self, partitions: List[TopicPartition], timeout: Optional[float] = None) -> List[TopicPartition]:
+        result = []
+        for tp in partitions:
+            offset = self.broker.committed(self.group, (tp.topic, tp.partition))
+            result.append(TopicPartition(tp.topic, tp.partition, OFFSET_INVALID if offset is None else offset))
+        return result
+
+    def position(self, partitions: List[TopicPartition]) -> List[TopicPartition]:
+        return [
+            TopicPartition(tp.topic, tp.partition, self._positions.get((tp.topic, tp.partition), OFFSET_INVALID))
+            for tp in partitions
+        ]
+
+    def get_watermark_offsets(self, partition: TopicPartition, timeout: Optional[float] = None,
+                              cached: bool = False) -> Tuple[int, int]:
+        return 0, self.broker.end_offsets(partition.topic)[partition.partition]
+
+    def _stats_json(self) -> str:
+        """librdkafka-shaped statistics with per-partition consumer_lag."""
+        topics: Dict[str, Any] = {}
+        for (topic, partition), position in self._positions.items():
+            end = self.broker.end_offsets(topic)[partition]
+            topics.setdefault(topic, {"partitions": {}})["partitions"][str(partition)] = {
+                "consumer_lag": end - position,
+                "committed_offset": self.broker.committed(self.group, (topic, partition)),
+                "hi_offset": end,
+            }
+        return json.dumps({"type": "consumer", "topics": topics})
+
+    def close(self):
+        """Revoke partitions, commit (when auto-committing) and leave the group."""
+        if self._closed:
+            return
+        self._apply_rebalance()
+        if self._assignment:
+            if self._on_revoke:
+                self._on_revoke(self, self.assignment())
+            if self.auto_commit:
+                self.commit(asynchronous=False)
+        self._assignment = []
+        self._closed = True
+        self.broker.leave(self)
+
+
+# Process-wide broker used by KAFKA_TRANSPORT=memory
+memory_broker = MemoryBroker(num_partitions=settings.KAFKA_MEMORY_PARTITIONS)
@@ -0,0 +1,450 @@
+"""Consumer pipelines (key-ordered concurrent and micro-batch) running on one event loop."""
+from typing import Dict, Any, Callable, Awaitable, Optional, Tuple, List
+from concurrent.futures import ThreadPoolExecutor
+from confluent_kafka import KafkaError, TopicPartition
+from loguru import logger
+import threading
+import asyncio
+import json
+import time
+
+
+def decode_json(value: bytes) -> Dict[str, Any]:
+    """Default message decoder."""
+    return json.loads(value.decode('utf-8'))
+
+
+class OffsetTracker:
+    """Track in-flight offsets per partition and compute safe commit points."""
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple[str, int], set] = {}
+        self._highest: Dict[Tuple[str, int], int] = {}
+        self._committed: Dict[Tuple[str, int], int] = {}
+
+    def track(self, tp: Tuple[str, int], offset: int):
+        """Record that an offset has been dispatched."""
+        self._in_flight.setdefault(tp, set()).add(offset)
+        if offset > self._highest.get(tp, -1):
+            self._highest[tp] = offset
+
+    def complete(self, tp: Tuple[str, int], offset: int):
+        """Record that an offset has finished processing."""
+        self._in_flight.get(tp, set()).discard(offset)
+
+    def committable(self) -> List[Tuple[Tuple[str, int], int]]:
+        """Partitions whose commit point advanced: every offset below it is done."""
+        result = []
+        for tp, highest in self._highest.items():
+            in_flight = self._in_flight.get(tp)
+            commit_at = min(in_flight) if in_flight else highest + 1
+            if commit_at > self._committed.get(tp, -1):
+                result.append((tp, commit_at))
+        return result
+
+    def tracks(self, tp: Tuple[str, int]) -> bool:
+        """True while offsets of a partition are tracked (assigned and dispatched)."""
+        return tp in self._highest
+
+    def mark_committed(self, tp: Tuple[str, int], offset: int):
+        """Remember the last committed offset for a partition."""
+        self._committed[tp] = offset
+
+    def forget(self, tp: Tuple[str, int]):
+        """Drop state for a partition that is no longer assigned."""
+        self._in_flight.pop(tp, None)
+        self._highest.pop(tp, None)
+        self._committed.pop(tp, None)
+
+    @property
+    def committed(self) -> Dict[Tuple[str, int], int]:
+        return dict(self._committed)
+
+
+class ConsumerPipeline:
+    """
+    Long-lived asyncio pipeline over a Kafka consumer.
+
+    - At most ``max_in_flight`` messages are processed concurrently.
+    - Messages with the same key run strictly in order; different keys
+      (patients) run in parallel.
+    - Offsets are committed only once every earlier offset in the partition
+      has finished processing (at-least-once delivery).
+    """
+
+    def __init__(
+        self,
+        consumer,
+        handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+        max_in_flight: int = 256,
+        commit_interval_ms: int = 1000,
+        poll_timeout: float = 1.0,
+        decoder: Callable[[bytes], Dict[str, Any]] = decode_json,
+        dead_letter=None
+    ):
+        """Initialize consumer pipeline."""
+        self.consumer = consumer
+        self.handler = handler
+        self.max_in_flight = max(1, max_in_flight)
+        self.commit_interval = commit_interval_ms / 1000.0
+        self.poll_timeout = poll_timeout
+        self.decoder = decoder
+        self.dead_letter = dead_letter
+
+        self.offsets = OffsetTracker()
+        self._tails: Dict[Any, asyncio.Task] = {}
+        self._tasks: set = set()
+        self._window: Optional[asyncio.Semaphore] = None
+        self._stopping = False
+        self._last_commit = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+
+        # Metrics
+        self.dispatched = 0
+        self.processed = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+
+    def stop(self):
+        """Ask the pipeline to stop polling and drain."""
+        self._stopping = True
+
+    async def run(self, max_messages: Optional[int] = None):
+        """
+        Poll, dispatch and commit until stopped or ``max_messages`` are dispatched.
+
+        Polling runs on a dedicated thread so the event loop keeps serving
+        in-flight handlers while the consumer waits for data.
+        """
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._window = asyncio.Semaphore(self.max_in_flight)
+        self._last_commit = time.monotonic()
+        self.started_at = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kafka-poll")
+
+        try:
+            while not self._stopping and (max_messages is None or self.dispatched < max_messages):
+                await self._window.acquire()
+                msg = await loop.run_in_executor(executor, self.consumer.poll, self.poll_timeout)
+
+                if msg is None:
+                    self._window.release()
+                    self._commit()
+                    continue
+
+                if msg.error():
+                    self._window.release()
+                    if msg.error().code() == KafkaError._PARTITION_EOF:
+                        continue
+                    logger.error(f"Consumer error: {msg.error()}")
+                    break
+
+                self._dispatch(msg)
+                self._commit()
+
+            await self.drain()
+        finally:
+            executor.shutdown(wait=False)
+
+    def _dispatch(self, msg):
+        """Start processing a message behind any earlier message with the same key."""
+        tp = (msg.topic(), msg.partition())
+        offset = msg.offset()
+        self.offsets.track(tp, offset)
+
+        key = msg.key() or tp
+        previous = self._tails.get(key)
+        task = asyncio.ensure_future(self._process(msg, key, tp, offset, previous))
+        self._tails[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self.dispatched += 1
+
+    async def _process(self, msg, key, tp, offset, previous: Optional[asyncio.Task]):
+        """
+        Process one message once its key predecessor has finished.
+
+        A failed message that cannot be routed to the retry/dead-letter
+        topics is routed again every ``route_retry_s`` (holding back its
+        key and the partition's commit point); if the pipeline stops or the
+        partition is revoked first, its offset is never completed, so it
+        is not committed and gets redelivered.
+        """
+        done = True
+        try:
+            if previous is not None and not previous.done():
+                await asyncio.wait([previous])
+            await self.handler(self.decoder(msg.value()))
+            self.processed += 1
+        except Exception as e:
+            self.failed += 1
+            if self.dead_letter is not None:
+                done = await self._route(msg, e, tp)
+            else:
+                logger.error(f"Error processing message {tp[0]}[{tp[1]}]@{offset}: {e}")
+        finally:
+            if done:
+                self.offsets.complete(tp, offset)
+            if self._tails.get(key) is asyncio.current_task():
+                del self._tails[key]
+            self._window.release()
+
+    async def _route(self, msg, error: Exception, tp: Tuple[str, int]) -> bool:
+        """Route a failed message until it is produced; False if given up (stopping or revoked)."""
+        while not await self.dead_letter.route(msg, error):
+            if self._stopping or not self.offsets.tracks(tp):
+                return False
+            await asyncio.sleep(self.dead_letter.route_retry_s)
+        return True
+
+    def _commit(self, force: bool = False):
+        """Commit completed offsets (periodically, or immediately when forced)."""
+        now = time.monotonic()
+        if not force and now - self._last_commit < self.commit_interval:
+            return
+        self._last_commit = now
+
+        committable = self.offsets.committable()
+        if not committable:
+            return
+        try:
+            self.consumer.commit(
+                offsets=[TopicPartition(topic, partition, offset) for (topic, partition), offset in committable],
+                asynchronous=not force
+            )
+            for tp, offset in committable:
+                self.offsets.mark_committed(tp, offset)
+        except Exception as e:
+            logger.error(f"Error committing offsets: {e}")
+
+    async def drain(self):
+        """Wait for in-flight messages and commit their offsets."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        self._commit(force=True)
+
+    def on_revoke(self, partitions: List[TopicPartition], timeout: float = 30.0):
+        """
+        Finish in-flight work and commit before partitions are handed away.
+
+        Called by the consumer during a rebalance, normally from the polling
+        thread while the event loop is free to run the outstanding handlers.
+        """
+        if self._loop is not None and self._loop.is_running() and threading.get_ident() != self._loop_thread:
+            future = asyncio.run_coroutine_threadsafe(self.drain(), self._loop)
+            try:
+                future.result(timeout)
+            except Exception as e:
+                logger.error(f"Error draining before partition revoke: {e}")
+        else:
+            # Already on the loop thread (e.g. consumer.close() after drain)
+            self._commit(force=True)
+
+        for p in partitions:
+            self.offsets.forget((p.topic, p.partition))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Throughput and in-flight metrics."""
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "dispatched": self.dispatched,
+            "processed": self.processed,
+            "failed": self.failed,
+            "in_flight": len(self._tasks),
+            "active_keys": len(self._tails),
+            "messages_per_sec": round(self.processed / elapsed, 1) if elapsed else 0.0,
+            "committed": {f"{t}[{p}]": o for (t, p), o in self.offsets.committed.items()},
+        }
+
+
+class BatchConsumerPipeline:
+    """
+    Micro-batch pipeline: ``consumer.consume()`` up to ``batch_size`` messages,
+    decode them once, hand the whole batch to ``batch_handler`` and commit
+    the batch's offsets after it has been processed.
+
+    Failed messages are routed to the retry/dead-letter topics before the
+    commit. If one cannot be routed, its partition is committed only up to
+    it and rewound there, so it (and what followed it) is read again.
+    """
+
+    def __init__(
+        self,
+        consumer,
+        batch_handler: Callable[[List[Dict[str, Any]]], Awaitable[Optional[Dict[str, Any]]]],
+        batch_size: int = 500,
+        batch_timeout_ms: int = 100,
+        decoder: Callable[[bytes], Dict[str, Any]] = decode_json,
+        dead_letter=None
+    ):
+        """Initialize batch consumer pipeline."""
+        self.consumer = consumer
+        self.batch_handler = batch_handler
+        self.batch_size = max(1, batch_size)
+        self.batch_timeout = batch_timeout_ms / 1000.0
+        self.decoder = decoder
+        self.dead_letter = dead_letter
+        self._stopping = False
+        self._committed: Dict[Tuple[str, int], int] = {}
+
+        # Metrics
+        self.batches = 0
+        self.processed = 0
+        self.failed = 0
+        self.decode_errors = 0
+        self.started_at: Optional[float] = None
+        self.last_batch: Dict[str, Any] = {}
+        self._totals = {"decode_ms": 0.0, "handler_ms": 0.0}
+
+    def stop(self):
+        """Ask the pipeline to stop after the current batch."""
+        self._stopping = True
+
+    async def run(self, max_messages: Optional[int] = None):
+        """Consume, process and commit batches until stopped or ``max_messages`` are processed."""
+        loop = asyncio.get_running_loop()
+        self.started_at = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kafka-consume")
+
+        try:
+            while not self._stopping and (max_messages is None or self.processed < max_messages):
+                limit = self.batch_size
+                if max_messages is not None:
+                    limit = min(limit, max_messages - self.processed)
+                messages = await loop.run_in_executor(
+                    executor, lambda: self.consumer.consume(num_messages=limit, timeout=self.batch_timeout)
+                )
+                if not messages:
+                    continue
+                if not await self._process_batch(messages):
+                    break
+        finally:
+            executor.shutdown(wait=False)
+
+    async def _process_batch(self, messages) -> bool:
+        """Decode, handle and commit one batch. Returns False on a fatal consumer error."""
+        started = time.perf_counter()
+        records = []
+        sources = []
+        failures = []
+        next_offsets: Dict[Tuple[str, int], int] = {}
+        fatal = False
+
+        for msg in messages:
+            if msg.error():
+                if msg.error().code() != KafkaError._PARTITION_EOF:
+                    logger.error(f"Consumer error: {msg.error()}")
+                    fatal = True
+                continue
+            tp = (msg.topic(), msg.partition())
+            next_offsets[tp] = max(next_offsets.get(tp, 0), msg.offset() + 1)
+            try:
+                records.append(self.decoder(msg.value()))
+                sources.append(msg)
+            except Exception as e:
+                self.decode_errors += 1
+                if self.dead_letter is not None:
+                    failures.append((msg, e))
+                else:
+                    logger.error(f"Error decoding message {tp[0]}[{tp[1]}]@{msg.offset()}: {e}")
+        decoded = time.perf_counter()
+
+        handler_timings = None
+        batch_failed = 0
+        if records:
+            try:
+                handler_timings = await self.batch_handler(records)
+            except Exception as e:
+                batch_failed = len(records)
+                if self.dead_letter is not None:
+                    failures.extend((msg, e) for msg in sources)
+                else:
+                    logger.error(f"Error processing batch of {len(records)} messages: {e}")
+        # Handlers may report individual rows that failed ({row: error})
+        failed_rows = (handler_timings or {}).pop("failed_rows", None) or {}
+        if failed_rows:
+            batch_failed += len(failed_rows)
+            if self.dead_letter is not None:
+                failures.extend((sources[row], error) for row, error in failed_rows.items())
+            else:
+                logger.error(f"{len(failed_rows)} of {len(records)} messages failed processing")
+        if failures:
+            # Route before committing so no failed message is lost
+            routed = await asyncio.gather(*(self.dead_letter.route(msg, error) for msg, error in failures))
+            rewind: Dict[Tuple[str, int], int] = {}
+            for (msg, _), ok in zip(failures, routed):
+                tp = (msg.topic(), msg.partition())
+                if not ok and msg.offset() < rewind.get(tp, next_offsets[tp]):
+                    rewind[tp] = msg.offset()
+            if rewind:
+                # Not routed: commit only up to it and read the partition again from there
+                next_offsets.update(rewind)
+                await asyncio.sleep(self.dead_letter.route_retry_s)
+                for (t, p), o in rewind.items():
+                    try:
+                        self.consumer.seek(TopicPartition(t, p, o))
+                    except Exception as e:
+                        logger.error(f"Error rewinding {t}[{p}] to unrouted offset {o}: {e}")
+        handled = time.perf_counter()
+
+        if next_offsets:
+            try:
+                self.consumer.commit(
+                    offsets=[TopicPartition(t, p, o) for (t, p), o in next_offsets.items()],
+                    asynchronous=True
+                )
+                self._committed.update(next_offsets)
+            except Exception as e:
+                logger.error(f"Error committing offsets: {e}")
+
+        self.batches += 1
+        self.processed += len(records)
+        self.failed += batch_failed
+        decode_ms = (decoded - started) * 1000
+        handler_ms = (handled - decoded) * 1000
+        self._totals["decode_ms"] += decode_ms
+        self._totals["handler_ms"] += handler_ms
+        self.last_batch = {
+            "messages": len(messages),
+            "decode_ms": round(decode_ms, 3),
+            "handler_ms": round(handler_ms, 3),
+            **(handler_timings or {})
+        }
+        logger.debug(f"Processed vitals batch: {self.last_batch}")
+        return not fatal
+
+    def on_revoke(self, partitions: List[TopicPartition]):
+        """
+        Commit revoked partitions synchronously during a rebalance.
+
+        Batches are processed between consume() calls, so nothing is in
+        flight here; this only makes sure the last async commit has landed.
+        """
+        offsets = [
+            TopicPartition(p.topic, p.partition, self._committed[(p.topic, p.partition)])
+            for p in partitions if (p.topic, p.partition) in self._committed
+        ]
+        if offsets:
+            try:
+                self.consumer.commit(offsets=offsets, asynchronous=False)
+            except Exception as e:
+                logger.error(f"Error committing offsets before revoke: {e}")
+        for p in partitions:
+            self._committed.pop((p.topic, p.partition), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Throughput and per-batch timing metrics."""
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "batches": self.batches,
+            "processed": self.processed,
+            "failed": self.failed,
+            "decode_errors": self.decode_errors,
+            "messages_per_sec": round(self.processed / elapsed, 1) if elapsed else 0.0,
+            "avg_decode_ms": round(self._totals["decode_ms"] / self.batches, 3) if self.batches else 0.0,
+            "avg_handler_ms": round(self._totals["handler_ms"] / self.batches, 3) if self.batches else 0.0,
+            "last_batch": self.last_batch,
+        }
@@ -1,10 +1,22 @@
 """Stream processing logic for patient vitals."""
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from backend.services.patient_service import PatientService
 from backend.services.alert_service import AlertService
 from backend.services.agent_service import AgentService
 from backend.core.database import db
+from backend.streaming.batch import VitalsBatch
+from backend.streaming.analysis_queue import AnalysisQueue, AnalysisJob
+from backend.core.config import settings
+from backend.core.dedup import create_vitals_dedup, dedup_key
+from backend.core.alert_state import create_alert_state
+from backend.core.baselines import vitals_baselines
+from backend.core.vitals_store import to_epoch, normalize_timestamp
+from backend.core.early_warning import early_warning
+from backend.streaming.live_bus import live_bus
 from loguru import logger
+import numpy as np
+import asyncio
+import time
 
 
 class VitalsProcessor:
@@ -16,6 +28,19 @@ class VitalsProcessor:
         self.alert_service = AlertService()
         self.agent_service = AgentService()
 
+        # Re-delivered readings are dropped before any I/O (None when disabled)
+        self.dedup = create_vitals_dedup()
+
+        # Stored readings are pushed to connected dashboards
+        self.live_bus = live_bus
+
+        # Agent analysis runs off the ingest path on a bounded priority queue
+        self.analysis_queue = AnalysisQueue(
+            self._run_analysis_job,
+            max_size=settings.AGENT_QUEUE_MAX_SIZE,
+            workers=settings.AGENT_QUEUE_WORKERS
+        )
+
         # Thresholds for alerts
         self.thresholds = {
             'heart_rate': {'min': 50, 'max': 120},
@@ -25,70 +50,364 @@ class VitalsProcessor:
             'temperature': {'min': 36.0, 'max': 38.5}
         }
 
-    async def process_vitals(self, vitals_data: Dict[str, Any]):
+        # Per-patient usual ranges can replace or tighten the fixed thresholds
+        self.anomaly_mode = settings.ANOMALY_DETECTION_MODE.lower()
+        self.baselines = vitals_baselines
+        self._absolute_limits = {vital: (t['min'], t['max']) for vital, t in self.thresholds.items()}
+
+        # Repeated anomalies update one incident instead of raising new alerts (None when disabled)
+        self.alert_state = create_alert_state(self.thresholds)
+
+    async def process_vitals(self, vitals_data: Dict[str, Any], dedup: bool = True):
         """
         Process incoming vital signs.
 
         Steps:
+        0. Drop readings already processed within the dedup window
         1. Store vitals in database
         2. Check for anomalies
         3. Trigger alerts if needed
         4. Invoke agent system for critical cases
+
+        Errors propagate so the consumer can route the message to the
+        retry/dead-letter topics. The reading is only recorded as processed
+        (for dedup) once every step succeeded; retries pass ``dedup=False``.
         """
-        try:
-            patient_id = vitals_data.get('patient_id')
-            if not patient_id:
-                logger.warning("Vitals data missing patient_id")
-                return
-
-            # 1. Store vitals
-            self.patient_service.add_vital_signs(vitals_data)
-
-            # 2. Check for anomalies
-            anomalies = self._detect_anomalies(vitals_data)
-
-            if anomalies:
-                logger.warning(f"Anomalies detected for patient {patient_id}: {anomalies}")
-
-                # 3. Calculate risk score
-                risk_data = self.patient_service.calculate_risk_score(patient_id)
-                risk_level = risk_data.get('risk_level', 'unknown')
-
-                # 4. Create alert if risk is medium or higher
-                if risk_level in ['medium', 'high', 'critical']:
-                    await self.alert_service.create_alert(
-                        patient_id=patient_id,
-                        alert_type="vitals_anomaly",
-                        severity=risk_level,
-                        message=f"Vital signs anomalies detected: {', '.join(anomalies)}",
-                        details={
-                            "anomalies": anomalies,
-                            "risk_score": risk_data.get('risk_score', 0),
-                            "vitals": vitals_data
-                        }
-                    )
-
-                    # 5. Invoke agent system for critical cases
-                    if risk_level in ['high', 'critical']:
-                        await self._invoke_agent_analysis(patient_id, vitals_data, anomalies)
+        patient_id = vitals_data.get('patient_id')
+        if not patient_id:
+            raise ValueError("Vitals data missing patient_id")
+        if vitals_data.get('timestamp'):
+            vitals_data['timestamp'] = normalize_timestamp(vitals_data['timestamp'])
 
-        except Exception as e:
-            logger.error(f"Error processing vitals: {e}")
+        dedup = dedup and self.dedup is not None
+        if dedup and self.dedup.is_duplicate(vitals_data):
+            return
+
+        # 1. Store vitals
+        if not await self.patient_service.add_vital_signs(vitals_data):
+            raise RuntimeError(f"Failed to store vitals for patient {patient_id}")
+        self.live_bus.publish("vitals", vitals_data)
+
+        # 2. Check for anomalies
+        anomalies = self._detect_anomalies(vitals_data)
+
+        if anomalies:
+            await self._handle_anomalies(patient_id, vitals_data, anomalies)
+        elif self.alert_state is not None and self.alert_state.tracks(patient_id):
+            # A normal reading may clear an open incident
+            await self._apply_alert_state(patient_id, vitals_data, [], None)
+
+        if dedup:
+            self.dedup.remember(vitals_data)
+
+    async def process_batch(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Process a micro-batch of vital signs.
+
+        All readings are stored with one write and checked against every
+        threshold with NumPy comparisons; only anomalous rows go on to the
+        slower risk/alert/agent path.
+
+        A storage failure (nothing or only part of the batch written)
+        raises, failing the whole batch: the consumer routes every message
+        of it to the retry/dead-letter topics before committing (or rewinds
+        to any it could not route). Rows that fail on their own (no
+        patient_id, a timestamp that is not ISO-8601, or an error on the
+        anomaly path) are reported as
+        ``failed_rows`` ({index in records: error}) for the consumer to
+        route the same way. Duplicate readings are
+        dropped before the write and counted in ``duplicates``; rows are
+        recorded for dedup only once they have been fully processed.
+
+        Returns:
+            Per-batch timings (ms) and counts
+        """
+        timings: Dict[str, Any] = {"rows": 0, "anomalous": 0, "duplicates": 0}
+        failed_rows: Dict[int, Exception] = {}
+        started = time.perf_counter()
+
+        valid_rows = []
+        batch_keys = set()
+        for index, record in enumerate(records):
+            if not record.get('patient_id'):
+                failed_rows[index] = ValueError("Vitals data missing patient_id")
+                continue
+            if record.get('timestamp'):
+                try:
+                    record['timestamp'] = normalize_timestamp(record['timestamp'])
+                except ValueError as e:
+                    failed_rows[index] = e
+                    continue
+            if self.dedup is not None:
+                key = dedup_key(record)
+                if (key is not None and key in batch_keys) or self.dedup.is_duplicate(record):
+                    timings["duplicates"] += 1
+                    continue
+                batch_keys.add(key)
+            valid_rows.append(index)
+        batch = VitalsBatch([records[index] for index in valid_rows])
+        timings["rows"] = len(batch)
+
+        # 1. Store vitals
+        written = self.patient_service.add_vital_signs_batch(batch.records) if batch.records else 0
+        if written < len(batch):
+            raise RuntimeError(f"Stored {written} of {len(batch)} vitals in batch")
+        for record in batch.records:
+            self.live_bus.publish("vitals", record)
+        stored = time.perf_counter()
+
+        # 2. Vectorized anomaly detection
+        anomalies_by_row = self.detect_anomalies_batch(batch)
+
+        # Early warning scores for the anomalous rows, in one pass
+        risk_by_row: Dict[int, Dict[str, Any]] = {}
+        if anomalies_by_row:
+            rows = sorted(anomalies_by_row)
+            matrix = batch.matrix(early_warning.channels)[rows]
+            scored = early_warning.score_matrix(matrix)
+            risk_by_row = {row: early_warning.describe(scored, i, matrix) for i, row in enumerate(rows)}
+        evaluated = time.perf_counter()
+
+        timings["store_ms"] = round((stored - started) * 1000, 3)
+        timings["evaluate_ms"] = round((evaluated - stored) * 1000, 3)
+        timings["anomalous"] = len(anomalies_by_row)
+
+        # 3. Slow path for anomalous rows: ordered per patient, parallel across patients
+        by_patient: Dict[str, List[int]] = {}
+        if self.alert_state is None:
+            for row in anomalies_by_row:
+                by_patient.setdefault(batch.patient_ids[row], []).append(row)
+        else:
+            # Normal readings also go through for patients whose incidents they may clear
+            anomalous_patients = {batch.patient_ids[row] for row in anomalies_by_row}
+            for row, patient_id in enumerate(batch.patient_ids):
+                if patient_id in anomalous_patients or self.alert_state.tracks(patient_id):
+                    by_patient.setdefault(patient_id, []).append(row)
+
+        async def handle_patient(patient_id: str, rows: List[int]):
+            for position, row in enumerate(rows):
+                try:
+                    if row in anomalies_by_row:
+                        await self._handle_anomalies(
+                            patient_id, batch.records[row], anomalies_by_row[row], risk_by_row[row]
+                        )
+                    else:
+                        await self._apply_alert_state(patient_id, batch.records[row], [], None)
+                except Exception as e:
+                    # Later readings for this patient must not overtake the failed one
+                    for pending in rows[position:]:
+                        failed_rows[valid_rows[pending]] = e
+                    return
+
+        await asyncio.gather(*(handle_patient(pid, rows) for pid, rows in by_patient.items()))
+        timings["anomaly_path_ms"] = round((time.perf_counter() - evaluated) * 1000, 3)
+
+        if self.dedup is not None:
+            self.dedup.remember_many([records[index] for index in valid_rows if index not in failed_rows])
+
+        if failed_rows:
+            timings["failed_rows"] = failed_rows
+        return timings
+
+    async def _handle_anomalies(
+        self,
+        patient_id: str,
+        vitals_data: Dict[str, Any],
+        anomalies: list,
+        risk_data: Optional[Dict[str, Any]] = None
+    ):
+        """Score risk, raise an alert and escalate to the agents for an anomalous reading."""
+        logger.warning(f"Anomalies detected for patient {patient_id}: {anomalies}")
+
+        # 3. Calculate risk score
+        # Score the anomalous reading itself: in a micro-batch the latest
+        # stored reading may be a later one for the same patient
+        if risk_data is None:
+            risk_data = self.patient_service.calculate_risk_score(patient_id, vitals_data)
+        risk_level = risk_data.get('risk_level', 'unknown')
+
+        if self.alert_state is not None:
+            await self._apply_alert_state(patient_id, vitals_data, anomalies, risk_data)
+            return
+
+        # 4. Create alert if risk is medium or higher
+        if risk_level in ['medium', 'high', 'critical']:
+            await self.alert_service.create_alert(
+                patient_id=patient_id,
+                alert_type="vitals_anomaly",
+                severity=risk_level,
+                message=f"Vital signs anomalies detected: {', '.join(anomalies)}",
+                details={
+                    "anomalies": anomalies,
+                    "risk_score": risk_data.get('risk_score', 0),
+                    "vitals": vitals_data
+                }
+            )
+
+            # 5. Queue agent analysis for critical cases (does not wait for it)
+            if risk_level in ['high', 'critical']:
+                self.analysis_queue.submit(patient_id, risk_level, vitals_data, anomalies)
+
+    async def _apply_alert_state(
+        self,
+        patient_id: str,
+        vitals_data: Dict[str, Any],
+        anomalies: list,
+        risk_data: Optional[Dict[str, Any]]
+    ):
+        """
+        Advance the patient's alert incidents with one reading.
+
+        Opening or escalating an incident raises an alert (stored, Kafka,
+        email) and, at high/critical, queues one agent analysis per
+        reading; updates, reopens and clears only reach the dashboards.
+        """
+        severity = risk_data.get('risk_level') if risk_data else None
+        transitions = self.alert_state.evaluate(
+            patient_id, vitals_data, severity, to_epoch(vitals_data.get('timestamp')),
+            limits=self.limits_for(patient_id)
+        )
+        analyse = False
+        for transition, incident in transitions:
+            if transition not in ("open", "escalate"):
+                await self.alert_service.update_incident(incident.to_dict(), transition)
+                continue
+
+            previous_alert = incident.alert_id
+            try:
+                alert = await self.alert_service.create_alert(
+                    patient_id=patient_id,
+                    alert_type="vitals_anomaly",
+                    severity=incident.severity,
+                    message=(
+                        f"Vital signs anomaly escalated to {incident.severity}: {incident.message}"
+                        if transition == "escalate" else
+                        f"Vital signs anomaly detected: {incident.message}"
+                    ),
+                    details={
+                        "incident_id": incident.incident_id,
+                        "anomaly_type": incident.anomaly_type,
+                        "escalated_from": previous_alert,
+                        "anomalies": anomalies,
+                        "risk_score": risk_data.get('risk_score', 0) if risk_data else 0,
+                        "vitals": vitals_data
+                    }
+                )
+            except Exception:
+                # Not raised: undo the transition so the retried reading takes it again
+                self.alert_state.revert(incident)
+                raise
+            incident.alert_id = alert.get("alert_id")
+            if previous_alert:
+                self.alert_service.supersede_alert(previous_alert)
+            analyse = analyse or incident.severity in ['high', 'critical']
+
+        if analyse:
+            self.analysis_queue.submit(patient_id, severity, vitals_data, anomalies)
+
+    def limits_for(self, patient_id: str) -> Dict[str, Tuple[float, float]]:
+        """
+        (min, max) per thresholded vital for one patient.
+
+        ``absolute``: the fixed thresholds. ``baseline``: the patient's usual
+        range where established (backend.core.baselines). ``either``: the
+        overlap of both, so breaching either one counts.
+        """
+        if self.anomaly_mode == "absolute":
+            return self._absolute_limits
+        bands = self.baselines.bands(patient_id)
+        if not bands:
+            return self._absolute_limits
+        limits = dict(self._absolute_limits)
+        for vital, (low, high) in self._absolute_limits.items():
+            band = bands.get(vital)
+            if band is None:
+                continue
+            if self.anomaly_mode == "baseline":
+                limits[vital] = band
+            else:
+                limits[vital] = (max(low, band[0]), min(high, band[1]))
+        return limits
+
+    def _anomaly_message(self, vital: str, direction: str, value: Any, limits: Tuple[float, float]) -> str:
+        message = f"{vital} too {direction} ({value}"
+        if limits != self._absolute_limits[vital]:
+            message += f", patient limits {limits[0]:.1f}-{limits[1]:.1f}"
+        return message + ")"
 
     def _detect_anomalies(self, vitals_data: Dict[str, Any]) -> list:
         """Detect anomalies in vital signs."""
         anomalies = []
 
-        for vital, thresholds in self.thresholds.items():
+        limits = self.limits_for(vitals_data.get('patient_id'))
+        for vital, (low, high) in limits.items():
             value = vitals_data.get(vital)
             if value is not None:
-                if value < thresholds['min']:
-                    anomalies.append(f"{vital} too low ({value})")
-                elif value > thresholds['max']:
-                    anomalies.append(f"{vital} too high ({value})")
+                if value < low:
+                    anomalies.append(self._anomaly_message(vital, "low", value, (low, high)))
+                elif value > high:
+                    anomalies.append(self._anomaly_message(vital, "high", value, (low, high)))
 
         return anomalies
 
+    def detect_anomalies_batch(self, batch: VitalsBatch) -> Dict[int, list]:
+        """
+        Evaluate all threshold rules for a whole batch at once.
+
+        Returns:
+            Mapping of row index -> anomaly messages, for anomalous rows only
+        """
+        if len(batch) == 0:
+            return {}
+
+        channels = list(self.thresholds)
+        values = batch.matrix(channels)
+        mins = np.array([self.thresholds[c]['min'] for c in channels], dtype=np.float64)
+        maxs = np.array([self.thresholds[c]['max'] for c in channels], dtype=np.float64)
+
+        if self.anomaly_mode != "absolute":
+            # Per-row limits for patients with an established baseline
+            rows_by_patient: Dict[str, List[int]] = {}
+            for row, patient_id in enumerate(batch.patient_ids):
+                rows_by_patient.setdefault(patient_id, []).append(row)
+            row_mins = row_maxs = None
+            for patient_id, rows in rows_by_patient.items():
+                limits = self.limits_for(patient_id)
+                if limits is self._absolute_limits:
+                    continue
+                if row_mins is None:
+                    row_mins = np.tile(mins, (len(batch), 1))
+                    row_maxs = np.tile(maxs, (len(batch), 1))
+                row_mins[rows] = [limits[c][0] for c in channels]
+                row_maxs[rows] = [limits[c][1] for c in channels]
+            if row_mins is not None:
+                mins, maxs = row_mins, row_maxs
+
+        # NaN compares False on both sides, so missing values never fire
+        low = values < mins
+        high = values > maxs
+
+        anomalies: Dict[int, list] = {}
+        for row in np.flatnonzero((low | high).any(axis=1)):
+            record = batch.records[row]
+            row_limits = (mins[row], maxs[row]) if mins.ndim == 2 else (mins, maxs)
+            messages = []
+            for c, vital in enumerate(channels):
+                limits = (float(row_limits[0][c]), float(row_limits[1][c]))
+                if low[row, c]:
+                    messages.append(self._anomaly_message(vital, "low", record.get(vital), limits))
+                elif high[row, c]:
+                    messages.append(self._anomaly_message(vital, "high", record.get(vital), limits))
+            anomalies[int(row)] = messages
+        return anomalies
+
+    async def _run_analysis_job(self, job: AnalysisJob):
+        """Analysis queue worker entry point."""
+        progress = {"patient_id": job.patient_id, "severity": job.severity, "anomalies": job.anomalies}
+        self.live_bus.publish("agent_log", {**progress, "event": "analysis_started"})
+        await self._invoke_agent_analysis(job.patient_id, job.vitals, job.anomalies)
+        self.live_bus.publish("agent_log", {**progress, "event": "analysis_finished"})
+
     async def _invoke_agent_analysis(
         self,
         patient_id: str,
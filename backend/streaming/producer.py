@@ -1,6 +1,7 @@
 """Kafka producer for streaming patient vitals."""
 from backend.services.streaming_service import StreamingService
 from backend.core.config import settings
+from backend.streaming.codecs import encode_vitals
 from loguru import logger
 import asyncio
 
@@ -23,11 +24,40 @@ class VitalsProducer:
         except Exception as e:
             logger.error(f"Error sending vitals: {e}")
 
-    async def send_batch_vitals(self, vitals_list: list):
-        """Send batch of vital signs."""
+    async def send_batch_vitals(self, vitals_list: list, wait_for_delivery: bool = True) -> int:
+        """
+        Send batch of vital signs.
+
+        Messages are queued back to back (waiting only when the local
+        producer queue is full) and acknowledged together.
+
+        Args:
+            vitals_list: Vitals dicts, each with a patient_id
+            wait_for_delivery: Await broker acknowledgements before returning
+
+        Returns:
+            Number of messages delivered (or queued, without waiting)
+        """
+        producer = self.streaming_service.get_async_producer()
+        deliveries = []
         for vitals in vitals_list:
             patient_id = vitals.get('patient_id')
             if patient_id:
-                await self.send_vitals(patient_id, vitals)
-                # Small delay to avoid overwhelming the system
-                await asyncio.sleep(0.1)
+                deliveries.append(await producer.produce(
+                    settings.KAFKA_TOPIC_PATIENT_VITALS,
+                    value=encode_vitals(vitals),
+                    key=str(patient_id)
+                ))
+
+        if not wait_for_delivery:
+            return len(deliveries)
+
+        results = await asyncio.gather(*deliveries, return_exceptions=True)
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            logger.error(f"{len(failed)} of {len(results)} vitals messages failed delivery: {failed[0]}")
+        return len(results) - len(failed)
+
+    def get_stats(self) -> dict:
+        """Producer throughput and delivery latency metrics."""
+        return self.streaming_service.get_producer_stats()
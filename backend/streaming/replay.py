@@ -0,0 +1,287 @@
+"""Time-warp replay of stored vitals history through VitalsProcessor.
+
+Readings are streamed in timestamp order at a chosen speed (real time,
+N times faster, or as fast as possible) through the same processing code
+the consumer runs. Side effects are recorded instead of performed: alerts
+are not stored, published or emailed, and agent analyses are not run.
+Storage writes go to a private in-memory buffer unless ``store=True``.
+"""
+from typing import Dict, Any, Iterator, List, Optional
+from datetime import datetime, timezone
+from backend.core.config import settings
+from backend.core.database import vitals_store
+from backend.core.vitals_buffer import RecentVitalsBuffer
+from backend.core.vitals_store import VITALS_CHANNELS, to_epoch
+from backend.services.patient_service import PatientService
+from backend.streaming.processor import VitalsProcessor
+from backend.streaming.live import LiveStreamHub
+from backend.streaming.live_bus import LiveBus
+from loguru import logger
+import pandas as pd
+import asyncio
+import math
+import time
+import uuid
+
+
+def load_history(
+    source: Optional[str] = None,
+    patient_ids: Optional[List[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Load vitals history sorted by timestamp.
+
+    Args:
+        source: Path to a vitals CSV, or None for the configured vitals store
+        patient_ids: Only replay these patients
+        start: Inclusive ISO lower bound on timestamp
+        end: Exclusive ISO upper bound on timestamp
+
+    Returns:
+        DataFrame with an ``_epoch`` column, oldest reading first
+    """
+    if source:
+        history = pd.read_csv(source)
+    elif patient_ids:
+        frames = [vitals_store.get_history(patient_id) for patient_id in patient_ids]
+        frames = [frame for frame in frames if not frame.empty]
+        history = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    else:
+        history = vitals_store.read_all()
+
+    if history.empty or 'timestamp' not in history.columns:
+        return pd.DataFrame(columns=['patient_id', 'timestamp', '_epoch'])
+
+    history['patient_id'] = history['patient_id'].astype(str)
+    if patient_ids:
+        history = history[history['patient_id'].isin([str(p) for p in patient_ids])]
+    history = history.assign(_epoch=history['timestamp'].map(to_epoch))
+    if start:
+        history = history[history['_epoch'] >= to_epoch(start)]
+    if end:
+        history = history[history['_epoch'] < to_epoch(end)]
+    return history.sort_values('_epoch', kind='stable').reset_index(drop=True)
+
+
+def _records(history: pd.DataFrame) -> Iterator[Dict[str, Any]]:
+    """Rows as message-shaped dicts (missing channels left out)."""
+    columns = ['patient_id', 'timestamp', '_epoch'] + [c for c in VITALS_CHANNELS if c in history.columns]
+    for row in history[columns].itertuples(index=False, name=None):
+        record = {}
+        for column, value in zip(columns, row):
+            if isinstance(value, float) and math.isnan(value):
+                continue
+            record[column] = value
+        yield record
+
+
+class RecordingAlertService:
+    """AlertService stand-in that records alerts instead of sending them."""
+
+    def __init__(self):
+        """Initialize recording alert service."""
+        self.alerts: List[Dict[str, Any]] = []
+        self.incident_updates: Dict[str, int] = {}
+
+    async def create_alert(
+        self,
+        patient_id: str,
+        alert_type: str,
+        severity: str,
+        message: str,
+        details: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        vitals = (details or {}).get("vitals", {})
+        alert_data = {
+            "alert_id": str(uuid.uuid4()),
+            "patient_id": patient_id,
+            "alert_type": alert_type,
+            "severity": severity,
+            "message": message,
+            "details": details or {},
+            # When it would have fired: the reading's time, not now
+            "timestamp": vitals.get("timestamp"),
+            "status": "active"
+        }
+        self.alerts.append(alert_data)
+        return alert_data
+
+    async def update_incident(self, incident: Dict[str, Any], transition: str):
+        self.incident_updates[transition] = self.incident_updates.get(transition, 0) + 1
+
+    def supersede_alert(self, alert_id: str) -> bool:
+        return True
+
+
+class RecordingAnalysisQueue:
+    """AnalysisQueue stand-in that records which agent analyses would run."""
+
+    def __init__(self):
+        """Initialize recording analysis queue."""
+        self.jobs: List[Dict[str, Any]] = []
+
+    def submit(self, patient_id: str, severity: str, vitals: Dict[str, Any], anomalies: List[str]) -> str:
+        self.jobs.append({
+            "patient_id": patient_id,
+            "severity": severity,
+            "timestamp": vitals.get("timestamp"),
+            "anomalies": list(anomalies),
+        })
+        return "recorded"
+
+    async def close(self, drain_timeout: float = 0.0):
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"recorded": len(self.jobs)}
+
+
+class ReplayPatientService(PatientService):
+    """PatientService whose vitals writes and reads stay in a private buffer."""
+
+    def __init__(self):
+        """Initialize replay patient service."""
+        super().__init__()
+        self.buffer = RecentVitalsBuffer(
+            capacity=settings.VITALS_BUFFER_CAPACITY,
+            memory_budget_mb=settings.VITALS_BUFFER_MEMORY_MB
+        )
+        # Starts empty and sees every replayed reading: unknown patient => no vitals
+        self.buffer._complete = True
+
+    def get_patient_vitals(self, patient_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        return self.buffer.get_recent(patient_id, limit) or []
+
+    async def add_vital_signs(self, vitals_data: Dict[str, Any]) -> bool:
+        self.buffer.record(vitals_data)
+        return True
+
+    def add_vital_signs_batch(self, vitals_list: List[Dict[str, Any]]) -> int:
+        for vitals_data in vitals_list:
+            self.buffer.record(vitals_data)
+        return len(vitals_list)
+
+
+class ReplayEngine:
+    """
+    Replay vitals history through VitalsProcessor.
+
+    ``speed`` is the time-warp factor: 1.0 replays in real time, 60.0
+    replays an hour per minute, 0 replays as fast as possible. With
+    ``batch_size`` > 1 readings go through ``process_batch`` (the
+    micro-batch consumer path) instead of ``process_vitals``.
+    """
+
+    def __init__(
+        self,
+        processor: Optional[VitalsProcessor] = None,
+        speed: float = 0.0,
+        batch_size: int = 1,
+        store: bool = False
+    ):
+        """Initialize replay engine."""
+        self.processor = processor or VitalsProcessor()
+        self.speed = max(0.0, speed)
+        self.batch_size = max(1, batch_size)
+
+        # Side effects are recorded, never performed
+        self.alerts = RecordingAlertService()
+        self.analyses = RecordingAnalysisQueue()
+        self.processor.alert_service = self.alerts
+        self.processor.analysis_queue = self.analyses
+        # Historical readings must not reach live dashboards
+        self.processor.live_bus = LiveBus(LiveStreamHub())
+        if not store:
+            self.processor.patient_service = ReplayPatientService()
+
+        # Metrics
+        self.replayed = 0
+        self.failed = 0
+        self.lag_ms_max = 0.0
+
+    async def _pace(self, epoch: float, first_epoch: float, wall_start: float):
+        """Sleep until a reading's warped time; track how far behind we run."""
+        if not self.speed:
+            return
+        due = wall_start + (epoch - first_epoch) / self.speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            self.lag_ms_max = max(self.lag_ms_max, -delay * 1000)
+
+    async def run(self, history: pd.DataFrame) -> Dict[str, Any]:
+        """Replay ``history`` (see load_history) and return the report."""
+        if history.empty:
+            return self.report(0.0, None, None)
+
+        first_epoch = float(history['_epoch'].iloc[0])
+        last_epoch = float(history['_epoch'].iloc[-1])
+        wall_start = time.monotonic()
+        started = time.perf_counter()
+
+        batch: List[Dict[str, Any]] = []
+        for record in _records(history):
+            epoch = record.pop('_epoch')
+            if self.batch_size == 1:
+                await self._pace(epoch, first_epoch, wall_start)
+                try:
+                    await self.processor.process_vitals(record)
+                    self.replayed += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.debug(f"Replay failed for {record.get('patient_id')}: {e}")
+                continue
+
+            if not batch:
+                await self._pace(epoch, first_epoch, wall_start)
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                await self._process_batch(batch)
+                batch = []
+        if batch:
+            await self._process_batch(batch)
+
+        return self.report(time.perf_counter() - started, first_epoch, last_epoch)
+
+    async def _process_batch(self, batch: List[Dict[str, Any]]):
+        try:
+            timings = await self.processor.process_batch(batch)
+            failed = len(timings.get("failed_rows", {}))
+            self.failed += failed
+            self.replayed += len(batch) - failed
+        except Exception as e:
+            self.failed += len(batch)
+            logger.debug(f"Replay batch of {len(batch)} failed: {e}")
+
+    def report(self, elapsed: float, first_epoch: Optional[float], last_epoch: Optional[float]) -> Dict[str, Any]:
+        """Throughput plus the alerts and agent analyses that would have fired."""
+        by_severity: Dict[str, int] = {}
+        for alert in self.alerts.alerts:
+            by_severity[alert["severity"]] = by_severity.get(alert["severity"], 0) + 1
+
+        def iso(epoch: Optional[float]) -> Optional[str]:
+            if epoch is None:
+                return None
+            return datetime.fromtimestamp(epoch, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+        span = (last_epoch - first_epoch) if first_epoch is not None else 0.0
+        return {
+            "readings": self.replayed + self.failed,
+            "replayed": self.replayed,
+            "failed": self.failed,
+            "elapsed_s": round(elapsed, 3),
+            "readings_per_sec": round((self.replayed + self.failed) / elapsed, 1) if elapsed else 0.0,
+            "speed": self.speed or "max",
+            "history_start": iso(first_epoch),
+            "history_end": iso(last_epoch),
+            "history_span_s": round(span, 1),
+            "max_lag_ms": round(self.lag_ms_max, 1),
+            "alerts": len(self.alerts.alerts),
+            "alerts_by_severity": by_severity,
+            "incident_updates": dict(self.alerts.incident_updates),
+            "agent_analyses": len(self.analyses.jobs),
+            "duplicates": self.processor.dedup.duplicates if self.processor.dedup else 0,
+        }
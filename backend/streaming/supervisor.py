@@ -0,0 +1,278 @@
+"""Multi-process supervisor for partition-parallel vitals consumers."""
+from typing import Dict, Any, Optional
+from pathlib import Path
+from backend.core.config import settings
+from loguru import logger
+import multiprocessing as mp
+import queue
+import signal
+import json
+import time
+import os
+
+
+def _worker_main(worker_id: int, reports, stop_event, report_interval: float):
+    """
+    Worker process entry point.
+
+    Runs one VitalsConsumer in the shared consumer group and reports its
+    stats to the supervisor every ``report_interval`` seconds.
+    """
+    # The supervisor owns shutdown; workers stop via ``stop_event``
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    import asyncio
+    from backend.streaming.consumer import VitalsConsumer
+    from backend.core.database import db, vitals_store
+    from backend.core.vitals_buffer import recent_vitals
+    from backend.core.vitals_trends import vitals_trends
+    from backend.core.baselines import vitals_baselines
+    from backend.core.risk_index import risk_index
+
+    consumer = VitalsConsumer()
+
+    def report(status: str):
+        reports.put({
+            "worker_id": worker_id,
+            "pid": os.getpid(),
+            "status": status,
+            "timestamp": time.time(),
+            **consumer.get_stats()
+        })
+
+    async def run():
+        task = asyncio.ensure_future(consumer.run([settings.KAFKA_TOPIC_PATIENT_VITALS]))
+        last_report = time.monotonic()
+        while not task.done():
+            await asyncio.wait([task], timeout=min(report_interval, 0.5))
+            if stop_event.is_set():
+                consumer.stop()
+            if time.monotonic() - last_report >= report_interval:
+                report("stopping" if stop_event.is_set() else "running")
+                last_report = time.monotonic()
+        task.result()
+
+    try:
+        recent_vitals.warm(vitals_store)
+        vitals_trends.restore(recent_vitals, name=f"consumer-{worker_id}")
+        vitals_baselines.restore(recent_vitals, name=f"consumer-{worker_id}")
+        risk_index.rebuild(recent_vitals)
+        report("starting")
+        asyncio.run(run())
+        report("stopped")
+    except Exception as e:
+        logger.error(f"Consumer worker {worker_id} failed: {e}")
+        report("failed")
+        raise
+    finally:
+        db.close()
+
+
+class ConsumerSupervisor:
+    """
+    Spawn and watch N consumer worker processes in one consumer group.
+
+    Kafka spreads the vitals topic's partitions across the workers (and
+    rebalances when one joins, leaves or dies). The supervisor restarts
+    dead or silent workers, aggregates their reports and writes a metrics
+    snapshot to ``metrics_path`` for the API process to serve.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = 2,
+        report_interval: float = 5.0,
+        heartbeat_timeout: float = 30.0,
+        metrics_path: str = "./data/streaming/consumer_workers.json",
+        max_restart_backoff: float = 60.0
+    ):
+        """Initialize consumer supervisor."""
+        self.num_workers = max(1, num_workers)
+        self.report_interval = report_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.metrics_path = Path(metrics_path)
+        self.max_restart_backoff = max_restart_backoff
+
+        # Spawn avoids forking the parent's Kafka/flusher threads
+        self._ctx = mp.get_context("spawn")
+        self._reports = self._ctx.Queue()
+        self._stop_event = self._ctx.Event()
+        self._processes: Dict[int, Any] = {}
+        self._workers: Dict[int, Dict[str, Any]] = {}
+        self._restarts: Dict[int, int] = {}
+        self._next_start: Dict[int, float] = {}
+        self.started_at: Optional[float] = None
+
+    def start(self):
+        """Spawn all worker processes."""
+        if settings.USE_CSV_DATABASE and self.num_workers > 1:
+            logger.warning(
+                "Multiple consumer workers append to shared CSV files; "
+                "set USE_CSV_DATABASE=false to use the per-patient columnar store"
+            )
+        self.started_at = time.time()
+        for worker_id in range(self.num_workers):
+            self._spawn(worker_id)
+
+    def _spawn(self, worker_id: int):
+        """Start (or restart) one worker process."""
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self._reports, self._stop_event, self.report_interval),
+            name=f"vitals-consumer-{worker_id}",
+            daemon=False
+        )
+        process.start()
+        self._processes[worker_id] = process
+        self._workers[worker_id] = {
+            "worker_id": worker_id,
+            "pid": process.pid,
+            "status": "starting",
+            "timestamp": time.time(),
+        }
+        logger.info(f"Started consumer worker {worker_id} (pid {process.pid})")
+
+    def run(self):
+        """Supervise workers until stopped (SIGINT/SIGTERM)."""
+        signal.signal(signal.SIGINT, lambda *_: self.stop())
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+
+        self.start()
+        try:
+            while not self._stop_event.is_set():
+                self._collect_reports(timeout=1.0)
+                self._check_workers()
+                self._write_metrics()
+        finally:
+            self.shutdown()
+
+    def stop(self):
+        """Ask workers to drain, commit and exit."""
+        if not self._stop_event.is_set():
+            logger.info("Stopping consumer workers...")
+            self._stop_event.set()
+
+    def shutdown(self, timeout: float = 60.0):
+        """Wait for workers to exit, terminating any that do not."""
+        self._stop_event.set()
+        deadline = time.monotonic() + timeout
+        for worker_id, process in self._processes.items():
+            while process.is_alive() and time.monotonic() < deadline:
+                self._collect_reports(timeout=0.5)
+                process.join(0.1)
+            if process.is_alive():
+                logger.warning(f"Consumer worker {worker_id} did not stop in time; terminating")
+                process.terminate()
+                process.join(5)
+        self._collect_reports(timeout=0)
+        self._write_metrics()
+        logger.info("Consumer supervisor stopped")
+
+    def _collect_reports(self, timeout: float):
+        """Drain worker reports from the queue."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                report = self._reports.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return
+            worker_id = report.get("worker_id")
+            # Ignore late reports from a process that has been replaced
+            process = self._processes.get(worker_id)
+            if process is not None and report.get("pid") == process.pid:
+                self._workers[worker_id] = report
+
+    def _check_workers(self):
+        """Restart workers that exited or stopped reporting."""
+        now = time.time()
+        for worker_id, process in list(self._processes.items()):
+            report = self._workers.get(worker_id, {})
+            silent_for = now - report.get("timestamp", now)
+
+            if process.is_alive() and silent_for <= self.heartbeat_timeout:
+                continue
+            if process.is_alive():
+                logger.warning(f"Consumer worker {worker_id} silent for {silent_for:.0f}s; restarting")
+                process.terminate()
+                process.join(5)
+            elif worker_id not in self._next_start:
+                logger.warning(f"Consumer worker {worker_id} exited with code {process.exitcode}")
+
+            # Exponential backoff so a crash loop does not spin
+            restarts = self._restarts.get(worker_id, 0)
+            self._next_start.setdefault(worker_id, now + min(self.max_restart_backoff, 2 ** restarts))
+            if now >= self._next_start[worker_id]:
+                del self._next_start[worker_id]
+                self._restarts[worker_id] = restarts + 1
+                self._spawn(worker_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Aggregated throughput, lag and per-worker health."""
+        now = time.time()
+        workers = []
+        for worker_id in sorted(self._workers):
+            report = self._workers[worker_id]
+            process = self._processes.get(worker_id)
+            alive = process is not None and process.is_alive()
+            age = now - report.get("timestamp", now)
+            workers.append({
+                **report,
+                "alive": alive,
+                "healthy": alive and age <= self.heartbeat_timeout,
+                "last_report_age_s": round(age, 1),
+                "restarts": self._restarts.get(worker_id, 0),
+            })
+
+        return {
+            "supervisor_pid": os.getpid(),
+            "updated_at": now,
+            "uptime_s": round(now - self.started_at, 1) if self.started_at else 0.0,
+            "workers": len(workers),
+            "healthy_workers": sum(1 for w in workers if w["healthy"]),
+            "processed": sum(w.get("processed", 0) for w in workers),
+            "failed": sum(w.get("failed", 0) for w in workers),
+            "dead_lettered": sum(w.get("dead_letter", {}).get("dead_lettered", 0) for w in workers),
+            "duplicates_dropped": sum(w.get("dedup", {}).get("duplicates", 0) for w in workers),
+            "messages_per_sec": round(sum(w.get("messages_per_sec", 0.0) for w in workers), 1),
+            "total_lag": sum(w.get("total_lag", 0) for w in workers),
+            "partitions": sum(len(w.get("partitions", [])) for w in workers),
+            "worker_stats": workers,
+        }
+
+    def _write_metrics(self):
+        """Atomically write the metrics snapshot for the API process."""
+        try:
+            self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.metrics_path.with_suffix(".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(self.get_stats(), f, default=str)
+            os.replace(tmp_path, self.metrics_path)
+        except Exception as e:
+            logger.error(f"Error writing consumer metrics: {e}")
+
+
+def read_worker_metrics(
+    metrics_path: str = settings.CONSUMER_METRICS_PATH,
+    stale_after: float = settings.CONSUMER_WORKER_HEARTBEAT_TIMEOUT_S
+) -> Dict[str, Any]:
+    """
+    Load the supervisor's latest metrics snapshot.
+
+    Returns:
+        Snapshot dict with a ``status`` of "running", "stale" or "not_running"
+    """
+    path = Path(metrics_path)
+    if not path.exists():
+        return {"status": "not_running"}
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except Exception as e:
+        logger.error(f"Error reading consumer metrics: {e}")
+        return {"status": "not_running"}
+
+    age = time.time() - snapshot.get("updated_at", 0)
+    snapshot["status"] = "running" if age <= stale_after else "stale"
+    snapshot["snapshot_age_s"] = round(age, 1)
+    return snapshot
@@ -8,6 +8,11 @@ class TopicManager:
 
     TOPICS = {
         'vitals': settings.KAFKA_TOPIC_PATIENT_VITALS,
+        **{
+            f'vitals_retry_{delay}s': f"{settings.KAFKA_TOPIC_PATIENT_VITALS}-retry-{delay}s"
+            for delay in settings.vitals_retry_delays
+        },
+        'vitals_dlq': settings.KAFKA_TOPIC_VITALS_DLQ,
         'alerts': settings.KAFKA_TOPIC_ALERTS,
         'agent_logs': settings.KAFKA_TOPIC_AGENT_LOGS
     }
@@ -17,6 +22,11 @@ class TopicManager:
         """Get topic name by key."""
         return cls.TOPICS.get(topic_name, '')
 
+    @classmethod
+    def retry_tiers(cls) -> list:
+        """(delay seconds, topic) for each vitals retry tier, shortest first."""
+        return [(delay, cls.TOPICS[f'vitals_retry_{delay}s']) for delay in settings.vitals_retry_delays]
+
     @classmethod
     def list_topics(cls) -> dict:
         """List all configured topics."""
@@ -0,0 +1,61 @@
+"""Kafka transports: how StreamingService builds producers and consumers."""
+from typing import Dict, Any
+from confluent_kafka import Producer, Consumer
+from backend.core.config import settings
+
+
+class ConfluentTransport:
+    """librdkafka clients talking to the configured cluster."""
+
+    name = "confluent"
+
+    def create_producer(self, config: Dict[str, Any]):
+        return Producer(config)
+
+    def create_consumer(self, config: Dict[str, Any]):
+        return Consumer(config)
+
+
+class MemoryTransport:
+    """
+    Clients over the in-process broker (backend.streaming.memory_broker).
+
+    Connection and security settings are ignored; group.id,
+    auto.offset.reset, enable.auto.commit, statistics callbacks and
+    queue.buffering.max.messages behave as with librdkafka.
+    """
+
+    name = "memory"
+
+    def __init__(self, broker=None):
+        """Initialize memory transport."""
+        if broker is None:
+            from backend.streaming.memory_broker import memory_broker
+            broker = memory_broker
+        self.broker = broker
+
+    def create_producer(self, config: Dict[str, Any]):
+        from backend.streaming.memory_broker import MemoryProducer
+        return MemoryProducer(
+            self.broker,
+            queue_size=config.get('queue.buffering.max.messages', 100000),
+            ack_ms=settings.KAFKA_MEMORY_ACK_MS
+        )
+
+    def create_consumer(self, config: Dict[str, Any]):
+        from backend.streaming.memory_broker import MemoryConsumer
+        return MemoryConsumer(self.broker, config)
+
+
+TRANSPORTS = {
+    ConfluentTransport.name: ConfluentTransport,
+    MemoryTransport.name: MemoryTransport,
+}
+
+
+def get_transport(name: str = None):
+    """Transport by name (default KAFKA_TRANSPORT)."""
+    name = (name or settings.KAFKA_TRANSPORT).lower()
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown Kafka transport '{name}' (available: {', '.join(TRANSPORTS)})")
+    return TRANSPORTS[name]()
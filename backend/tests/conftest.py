@@ -0,0 +1,7 @@
+"""Shared pytest setup."""
+import tempfile
+import os
+
+# Data and log paths in settings are relative to the working directory;
+# keep everything the backend writes at import time out of the checkout.
+os.chdir(tempfile.mkdtemp(prefix="monit-tests-"))
@@ -0,0 +1,125 @@
+"""Tests for alert incident hysteresis, cooldown and revert."""
+from backend.core.alert_state import AlertStateMachine
+from backend.streaming.processor import VitalsProcessor
+import asyncio
+import pytest
+
+THRESHOLDS = {'heart_rate': {'min': 50, 'max': 120}}
+
+
+def make_machine(**kwargs):
+    # Hysteresis margin: 0.05 * (120 - 50) = 3.5, so heart_rate_high clears at <= 116.5
+    return AlertStateMachine(THRESHOLDS, hysteresis=0.05, cooldown_s=600, **kwargs)
+
+
+def step(machine, heart_rate, severity, now, patient_id="P001"):
+    transitions = machine.evaluate(patient_id, {"heart_rate": heart_rate}, severity, now)
+    return [transition for transition, _ in transitions]
+
+
+def test_repeated_breaches_update_one_incident():
+    machine = make_machine()
+    assert step(machine, 130, "medium", 0) == ["open"]
+    assert step(machine, 135, "medium", 10) == ["update"]
+    assert step(machine, 132, "low", 20) == ["update"]
+    assert machine.get_stats()["suppressed"] == 2
+    assert len(machine.get_incidents("P001")) == 1
+
+
+def test_below_min_severity_does_not_open():
+    machine = make_machine()
+    assert step(machine, 130, "low", 0) == []
+    assert not machine.tracks("P001")
+
+
+def test_hysteresis_band_keeps_incident_open():
+    machine = make_machine()
+    step(machine, 130, "medium", 0)
+    # Back under the threshold but inside the band: no transition
+    assert step(machine, 118, "low", 10) == []
+    assert machine.get_incidents("P001")[0]["state"] == "open"
+    assert step(machine, 116, "low", 20) == ["clear"]
+
+
+def test_escalate_on_higher_severity():
+    machine = make_machine()
+    step(machine, 130, "medium", 0)
+    assert step(machine, 150, "critical", 10) == ["escalate"]
+    assert step(machine, 140, "high", 20) == ["update"]
+    assert machine.get_incidents("P001")[0]["severity"] == "critical"
+
+
+def test_reopen_within_cooldown_and_new_incident_after():
+    machine = make_machine()
+    step(machine, 130, "medium", 0)
+    step(machine, 100, "low", 10)
+    incident_id = machine.get_incidents("P001")[0]["incident_id"]
+
+    assert step(machine, 130, "medium", 100) == ["reopen"]
+    assert machine.get_incidents("P001")[0]["incident_id"] == incident_id
+
+    step(machine, 100, "low", 200)
+    assert step(machine, 130, "medium", 200 + 601) == ["open"]
+    assert machine.get_incidents("P001")[0]["incident_id"] != incident_id
+
+
+def test_revert_open_forgets_the_incident():
+    machine = make_machine()
+    [(transition, incident)] = machine.evaluate("P001", {"heart_rate": 130}, "medium", 0)
+    machine.revert(incident)
+    assert not machine.tracks("P001")
+    assert machine.get_stats()["open"] == 0
+    assert step(machine, 130, "medium", 1) == ["open"]
+
+
+def test_revert_escalate_restores_previous_state():
+    machine = make_machine()
+    step(machine, 130, "medium", 0)
+    [(transition, incident)] = machine.evaluate("P001", {"heart_rate": 150}, "critical", 10)
+    assert transition == "escalate"
+
+    machine.revert(incident)
+    assert incident.severity == "medium"
+    assert incident.value == 130
+    assert incident.updates == 0
+    assert machine.get_stats()["escalate"] == 0
+    assert step(machine, 150, "critical", 11) == ["escalate"]
+
+
+class FailingAlertService:
+    """Alert service whose first ``failures`` create_alert calls raise."""
+
+    def __init__(self, failures=1):
+        self.failures = failures
+        self.created = []
+        self.updates = []
+
+    async def create_alert(self, **alert):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("alert store unavailable")
+        self.created.append(alert)
+        return {"alert_id": f"A{len(self.created)}"}
+
+    async def update_incident(self, incident, transition):
+        self.updates.append(transition)
+
+    def supersede_alert(self, alert_id):
+        pass
+
+
+def test_processor_retry_raises_the_alert_after_a_failure():
+    processor = VitalsProcessor()
+    processor.alert_state = AlertStateMachine(processor.thresholds)
+    processor.alert_service = FailingAlertService(failures=1)
+    processor.analysis_queue.submit = lambda *args: None
+    vitals_data = {"patient_id": "P001", "timestamp": "2024-01-01T00:00:00", "heart_rate": 140}
+    risk_data = {"risk_level": "medium", "risk_score": 40}
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(processor._apply_alert_state("P001", vitals_data, ["heart_rate high"], risk_data))
+    assert not processor.alert_state.tracks("P001")
+
+    asyncio.run(processor._apply_alert_state("P001", vitals_data, ["heart_rate high"], risk_data))
+    assert len(processor.alert_service.created) == 1
+    assert processor.alert_state.get_incidents("P001")[0]["alert_id"] == "A1"
@@ -0,0 +1,51 @@
+"""Tests for the alert store index across processes sharing the files."""
+from backend.core.alert_store import AlertStore
+
+
+def alert(alert_id, patient_id="P001", timestamp="2024-01-01T00:00:00"):
+    return {
+        "alert_id": alert_id,
+        "patient_id": patient_id,
+        "alert_type": "vitals_anomaly",
+        "severity": "high",
+        "message": "heart_rate too high",
+        "timestamp": timestamp,
+        "status": "active",
+    }
+
+
+def test_alerts_written_by_another_process_are_visible(tmp_path):
+    # Two stores over the same files stand in for two processes
+    api, worker = AlertStore(str(tmp_path)), AlertStore(str(tmp_path))
+    assert api.get_active() == []
+
+    worker.append(alert("A1"))
+    worker.append(alert("A2", patient_id="P002", timestamp="2024-01-01T00:01:00"))
+    assert [record["alert_id"] for record in api.get_active()] == ["A2", "A1"]
+    assert api.get("A1")["patient_id"] == "P001"
+
+
+def test_status_changes_from_another_process_are_applied(tmp_path):
+    api, worker = AlertStore(str(tmp_path)), AlertStore(str(tmp_path))
+    worker.append(alert("A1"))
+    worker.append(alert("A2", timestamp="2024-01-01T00:01:00"))
+
+    assert api.update_status("A1", "acknowledged")
+    assert [record["alert_id"] for record in worker.get_active()] == ["A2"]
+    assert worker.get("A1")["status"] == "acknowledged"
+
+
+def test_index_is_rebuilt_after_another_process_compacts(tmp_path):
+    api, worker = AlertStore(str(tmp_path), compact_after=2), AlertStore(str(tmp_path))
+    for i in range(3):
+        worker.append(alert(f"A{i}", timestamp=f"2024-01-01T00:0{i}:00"))
+    worker.get_active()
+
+    api.update_status("A0", "resolved")
+    api.update_status("A1", "resolved")  # compacts: alert_history.csv is replaced
+    assert not api.events_path.exists()
+
+    assert [record["alert_id"] for record in worker.get_active()] == ["A2"]
+    assert worker.get("A0")["status"] == "resolved"
+    worker.append(alert("A3", timestamp="2024-01-01T00:04:00"))
+    assert [record["alert_id"] for record in api.get_active()] == ["A3", "A2"]
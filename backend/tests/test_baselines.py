@@ -0,0 +1,90 @@
+"""Tests for KLL quantile sketches and per-patient baselines."""
+from backend.core.baselines import KLLSketch, VitalsBaselines, MIN_BAND_MARGIN
+import random
+import json
+
+QS = (0.05, 0.25, 0.5, 0.75, 0.95)
+# Comfortably above the ~1.7/k rank error at k=128
+RANK_TOLERANCE = 0.03
+
+
+def true_rank(sorted_values, value):
+    return sum(1 for v in sorted_values if v <= value) / len(sorted_values)
+
+
+def assert_quantiles_close(sketch, values):
+    ordered = sorted(values)
+    for q, estimate in zip(QS, sketch.quantiles(QS)):
+        assert abs(true_rank(ordered, estimate) - q) <= RANK_TOLERANCE, (q, estimate)
+
+
+def test_quantiles_within_rank_error():
+    random.seed(1)
+    values = [random.gauss(80, 12) for _ in range(50000)]
+    sketch = KLLSketch(k=128)
+    for value in values:
+        sketch.add(value)
+
+    assert sketch.n == len(values)
+    assert sketch.retained < 1000
+    assert_quantiles_close(sketch, values)
+
+
+def test_merge_matches_the_combined_stream():
+    random.seed(2)
+    streams = [[random.gauss(mean, 5) for _ in range(8000)] for mean in (60, 75, 90, 110)]
+    merged = KLLSketch(k=128)
+    for stream in streams:
+        sketch = KLLSketch(k=128)
+        for value in stream:
+            sketch.add(value)
+        merged.merge(sketch)
+
+    combined = [value for stream in streams for value in stream]
+    assert merged.n == len(combined)
+    assert merged.retained < 1000
+    assert_quantiles_close(merged, combined)
+
+
+def test_compaction_preserves_total_weight():
+    random.seed(3)
+    sketch = KLLSketch(k=32)
+    for i in range(10001):
+        sketch.add(float(i))
+    weight = sum(len(level) << h for h, level in enumerate(sketch.compactors))
+    assert weight == sketch.n
+
+
+def test_serialization_round_trip():
+    random.seed(4)
+    sketch = KLLSketch(k=64)
+    for _ in range(5000):
+        sketch.add(random.uniform(35.0, 40.0))
+
+    restored = KLLSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+    assert restored.n == sketch.n
+    assert restored.retained == sketch.retained
+    assert restored.quantiles(QS) == sketch.quantiles(QS)
+
+    # A restored sketch keeps learning and merging
+    restored.add(38.0)
+    restored.merge(sketch)
+    assert restored.n == 2 * sketch.n + 1
+
+
+def test_empty_sketch():
+    sketch = KLLSketch()
+    assert sketch.quantiles(QS) == [None] * len(QS)
+    assert KLLSketch.from_dict(sketch.to_dict()).n == 0
+
+
+def test_band_established_after_min_readings():
+    baselines = VitalsBaselines(k=64, min_readings=50, refresh_every=1)
+    for i in range(49):
+        baselines.update({"patient_id": "P001", "heart_rate": 70 + i % 5})
+    assert "heart_rate" not in baselines.bands("P001")
+
+    baselines.update({"patient_id": "P001", "heart_rate": 72})
+    # Narrow spread: the minimum margin applies around the 70..74 band
+    margin = MIN_BAND_MARGIN["heart_rate"]
+    assert baselines.bands("P001")["heart_rate"] == (70 - margin, 74 + margin)
@@ -0,0 +1,51 @@
+"""Tests for the vitals wire codecs."""
+from backend.streaming.codecs import (
+    available_codecs, decode_vitals, encode_vitals, get_codec, register_codec, StructCodecV1
+)
+import json
+import pytest
+
+READING = {
+    "patient_id": "P001",
+    "timestamp": "2024-01-01T08:00:00",
+    "heart_rate": 82,
+    "bp_systolic": 121,
+    "bp_diastolic": 79,
+    "o2_saturation": 97.5,
+    "temperature": 37.2,
+}
+
+
+@pytest.mark.parametrize("codec", available_codecs())
+def test_every_codec_round_trips_a_reading(codec):
+    assert decode_vitals(encode_vitals(READING, codec)) == READING
+
+
+def test_struct_codec_keeps_integers_and_missing_channels():
+    decoded = decode_vitals(encode_vitals({"patient_id": "P001", "heart_rate": 82, "temperature": 37.2}, "struct"))
+    assert decoded == {"patient_id": "P001", "heart_rate": 82, "temperature": 37.2}
+    assert isinstance(decoded["heart_rate"], int)
+
+
+def test_struct_codec_falls_back_to_json_for_extra_fields():
+    message = dict(READING, source="bedside-3")
+    encoded = encode_vitals(message, "struct")
+    assert encoded.startswith(b"{")
+    assert decode_vitals(encoded) == message
+
+
+def test_legacy_json_without_a_header_byte_is_decoded():
+    legacy = json.dumps(READING).encode()
+    assert decode_vitals(legacy) == READING
+    assert decode_vitals(b"  " + legacy) == READING
+    assert decode_vitals(json.dumps(READING)) == READING
+
+
+def test_header_bytes_cannot_be_reused():
+    class Clash(StructCodecV1):
+        name = "clash"
+
+    with pytest.raises(ValueError):
+        register_codec(Clash())
+    with pytest.raises(ValueError):
+        get_codec("clash")
@@ -0,0 +1,97 @@
+"""Tests for vitals deduplication around failed processing."""
+from backend.core.dedup import VitalsDeduplicator
+from backend.streaming.processor import VitalsProcessor
+import asyncio
+import pytest
+
+
+def reading(patient_id="P001", timestamp="2024-01-01T00:00:00", heart_rate=80):
+    return {
+        "patient_id": patient_id,
+        "timestamp": timestamp,
+        "heart_rate": heart_rate,
+        "bp_systolic": 120,
+        "bp_diastolic": 80,
+        "o2_saturation": 98,
+        "temperature": 37.0,
+    }
+
+
+class FlakyPatientService:
+    """Vitals storage whose first ``failures`` writes fail."""
+
+    def __init__(self, failures=1):
+        self.failures = failures
+        self.stored = []
+
+    async def add_vital_signs(self, vitals_data):
+        if self.failures:
+            self.failures -= 1
+            return False
+        self.stored.append(vitals_data)
+        return True
+
+    def add_vital_signs_batch(self, vitals_list):
+        if self.failures:
+            self.failures -= 1
+            return 0
+        self.stored.extend(vitals_list)
+        return len(vitals_list)
+
+
+def make_processor(failures=1):
+    processor = VitalsProcessor()
+    processor.dedup = VitalsDeduplicator(window_s=600)
+    processor.alert_state = None
+    processor.patient_service = FlakyPatientService(failures)
+    return processor
+
+
+def test_is_duplicate_only_checks():
+    dedup = VitalsDeduplicator(window_s=600)
+    assert not dedup.is_duplicate(reading())
+    assert not dedup.is_duplicate(reading())
+    dedup.remember(reading())
+    assert dedup.is_duplicate(reading())
+
+
+def test_filter_drops_batch_duplicates_without_recording():
+    dedup = VitalsDeduplicator(window_s=600)
+    kept = dedup.filter([reading(), reading(), reading(timestamp="2024-01-01T00:01:00")])
+    assert len(kept) == 2
+    assert dedup.filter([reading()]) == [reading()]
+
+
+def test_bloom_backend_remembers():
+    dedup = VitalsDeduplicator(window_s=600, backend="bloom", max_entries=1000)
+    dedup.remember_many([reading(timestamp=f"2024-01-01T00:{i:02d}:00") for i in range(10)])
+    assert dedup.is_duplicate(reading(timestamp="2024-01-01T00:05:00"))
+
+
+def test_failed_reading_is_processed_on_redelivery():
+    processor = make_processor(failures=1)
+    with pytest.raises(RuntimeError):
+        asyncio.run(processor.process_vitals(reading()))
+
+    asyncio.run(processor.process_vitals(reading()))
+    assert processor.patient_service.stored == [reading()]
+
+    # Now processed: a further re-delivery is dropped
+    asyncio.run(processor.process_vitals(reading()))
+    assert processor.patient_service.stored == [reading()]
+
+
+def test_failed_batch_is_processed_on_redelivery():
+    processor = make_processor(failures=1)
+    records = [reading(), reading(timestamp="2024-01-01T00:01:00"), reading()]
+    with pytest.raises(RuntimeError):
+        asyncio.run(processor.process_batch(records))
+
+    timings = asyncio.run(processor.process_batch(records))
+    assert timings["rows"] == 2
+    assert timings["duplicates"] == 1
+    assert len(processor.patient_service.stored) == 2
+
+    timings = asyncio.run(processor.process_batch(records))
+    assert timings["rows"] == 0
+    assert timings["duplicates"] == 3
@@ -0,0 +1,46 @@
+"""Tests for early warning risk levels and the 0-100 risk score."""
+from backend.core.early_warning import get_scorer, LEVEL_ORDER
+
+STABLE = {
+    "heart_rate": 75, "bp_systolic": 125, "o2_saturation": 97,
+    "temperature": 37.0, "respiratory_rate": 16,
+}
+
+
+def scored(**changes):
+    """Score a stable reading with some vitals changed, both ways."""
+    scorer = get_scorer("news2")
+    reading = dict(STABLE, **changes)
+    result = scorer.score_records([reading])[0]
+    total, level_code, risk_score = scorer.score_values(reading)
+    assert (total, LEVEL_ORDER[level_code], risk_score) == (
+        result["early_warning_score"], result["risk_level"], result["risk_score"]
+    )
+    return result
+
+
+def test_news2_levels_follow_the_clinical_response():
+    assert scored()["risk_level"] == "low"
+    # Aggregate 5: urgent ward review
+    assert scored(heart_rate=115, temperature=38.5, respiratory_rate=22)["risk_level"] == "medium"
+    # A single red parameter (SpO2 <= 91) with an aggregate of 3
+    assert scored(o2_saturation=90)["risk_level"] == "high"
+    # Aggregate 7+: emergency response
+    result = scored(heart_rate=135, o2_saturation=92, temperature=39.5)
+    assert result["early_warning_score"] == 7
+    assert result["risk_level"] == "critical"
+
+
+def test_risk_score_keeps_its_points_per_abnormal_vital():
+    assert scored()["risk_score"] == 0
+    assert scored(o2_saturation=90)["risk_score"] == 35
+    assert scored(heart_rate=130, bp_systolic=85, o2_saturation=88, temperature=39.0)["risk_score"] == 100
+    # Not measured is not abnormal
+    assert scored(heart_rate=None, temperature=None)["risk_score"] == 0
+
+
+def test_risk_score_uses_every_vital_under_models_that_do_not_score_it():
+    scorer = get_scorer("mews")
+    result = scorer.score_records([dict(STABLE, o2_saturation=88)])[0]
+    assert "o2_saturation" not in result["components"]
+    assert result["risk_score"] == 35
@@ -0,0 +1,60 @@
+"""Tests for consumer groups on the in-memory broker."""
+from backend.streaming.memory_broker import MemoryBroker, MemoryConsumer
+
+TOPIC = "test-vitals"
+CONFIG = {'group.id': "test-group", 'auto.offset.reset': 'earliest', 'enable.auto.commit': False}
+
+
+def fill(broker, per_partition=3):
+    for partition in range(broker.partitions_for(TOPIC)):
+        for i in range(per_partition):
+            broker.append(TOPIC, value=f"{partition}-{i}".encode(), partition=partition)
+
+
+def values(messages):
+    return sorted(msg.value().decode() for msg in messages)
+
+
+def test_second_member_takes_over_partitions_from_committed_offsets():
+    broker = MemoryBroker(num_partitions=2)
+    broker.create_topic(TOPIC)
+    fill(broker)
+    revoked = []
+
+    first = MemoryConsumer(broker, CONFIG)
+    first.subscribe([TOPIC], on_revoke=lambda consumer, partitions: revoked.extend(
+        (tp.topic, tp.partition) for tp in partitions
+    ))
+    # Read two messages of each partition, commit only those
+    read = first.consume(num_messages=2, timeout=1) + first.consume(num_messages=2, timeout=1)
+    assert values(read) == ["0-0", "0-1", "1-0", "1-1"]
+    first.commit(asynchronous=False)
+
+    second = MemoryConsumer(broker, CONFIG)
+    second.subscribe([TOPIC])
+    assert values(first.consume(num_messages=10, timeout=0.2)) == ["0-2"]
+    assert values(second.consume(num_messages=10, timeout=0.2)) == ["1-2"]
+    assert revoked == [(TOPIC, 0), (TOPIC, 1)]
+    assert [tp.partition for tp in first.assignment()] == [0]
+    assert [tp.partition for tp in second.assignment()] == [1]
+
+
+def test_uncommitted_messages_are_redelivered_after_a_member_leaves():
+    broker = MemoryBroker(num_partitions=2)
+    broker.create_topic(TOPIC)
+    fill(broker)
+
+    first = MemoryConsumer(broker, CONFIG)
+    second = MemoryConsumer(broker, CONFIG)
+    first.subscribe([TOPIC])
+    second.subscribe([TOPIC])
+    assert values(second.consume(num_messages=1, timeout=1)) == ["1-0"]
+    second.commit(asynchronous=False)
+    # Read but never committed
+    assert values(second.consume(num_messages=10, timeout=0.2)) == ["1-1", "1-2"]
+    second.close()
+
+    assert values(first.consume(num_messages=10, timeout=1) + first.consume(num_messages=10, timeout=0.2)) == [
+        "0-0", "0-1", "0-2", "1-1", "1-2"
+    ]
+    assert broker.committed("test-group", (TOPIC, 1)) == 1
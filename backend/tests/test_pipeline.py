@@ -0,0 +1,74 @@
+"""Tests for offset tracking and commit points of the consumer pipelines."""
+from backend.services.streaming_service import StreamingService
+from backend.streaming.transport import MemoryTransport
+from backend.streaming.memory_broker import MemoryBroker
+from backend.streaming.pipeline import OffsetTracker, ConsumerPipeline
+import asyncio
+import json
+
+TP = ("test-vitals", 0)
+
+
+def test_commit_point_waits_for_the_oldest_in_flight_offset():
+    tracker = OffsetTracker()
+    for offset in range(3):
+        tracker.track(TP, offset)
+
+    tracker.complete(TP, 2)
+    assert tracker.committable() == [(TP, 0)]
+    tracker.complete(TP, 0)
+    assert tracker.committable() == [(TP, 1)]
+    tracker.mark_committed(TP, 1)
+    assert tracker.committable() == []
+
+    tracker.complete(TP, 1)
+    assert tracker.committable() == [(TP, 3)]
+
+
+def test_forgotten_partition_is_no_longer_committable():
+    tracker = OffsetTracker()
+    tracker.track(TP, 5)
+    tracker.complete(TP, 5)
+    tracker.forget(TP)
+    assert not tracker.tracks(TP)
+    assert tracker.committable() == []
+
+
+def test_pipeline_commits_only_below_a_slow_message():
+    broker = MemoryBroker(num_partitions=1)
+    service = StreamingService(transport=MemoryTransport(broker))
+    # P0's first reading is slow; P1 and P0's second reading are queued behind it
+    for patient_id in ("P0", "P1", "P0"):
+        broker.append("test-vitals", value=json.dumps({"patient_id": patient_id}).encode(), key=patient_id.encode())
+
+    release = asyncio.Event()
+    handled = []
+
+    async def handler(vitals_data):
+        if not handled:
+            handled.append(vitals_data["patient_id"])
+            await release.wait()
+        else:
+            handled.append(vitals_data["patient_id"])
+
+    consumer = service.get_consumer(
+        ["test-vitals"], auto_commit=False,
+        config_overrides={'group.id': "test-vitals-group", 'auto.offset.reset': 'earliest'}
+    )
+    pipeline = ConsumerPipeline(consumer, handler, commit_interval_ms=0, poll_timeout=0.05)
+
+    async def run():
+        task = asyncio.ensure_future(pipeline.run())
+        while pipeline.dispatched < 3:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        # Offset 1 finished out of order; offset 0 (and its key successor 2) did not
+        assert handled == ["P0", "P1"]
+        assert broker.committed("test-vitals-group", TP) in (None, 0)
+        release.set()
+        pipeline.stop()
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(run())
+    assert handled == ["P0", "P1", "P0"]
+    assert broker.committed("test-vitals-group", TP) == 3
@@ -0,0 +1,41 @@
+"""Tests for the deterioration task's trend input."""
+from backend.agents.tasks import predict_deterioration as task
+from backend.core.vitals_trends import VitalsTrendTracker
+import asyncio
+import sys
+import types
+
+
+class StubBuffer:
+    def __init__(self, recent):
+        self.recent = recent
+
+    def get_fresh(self, patient_id, limit, store):
+        return list(self.recent)
+
+
+class StubGemini:
+    async def generate_response(self, **kwargs):
+        return "ok"
+
+
+def test_readings_loaded_for_an_unseen_patient_do_not_reach_the_shared_tracker(monkeypatch):
+    # Most recent first, as the buffer returns them
+    recent = [
+        {"patient_id": "P001", "timestamp": f"2024-01-01T08:{minute:02d}:00", "heart_rate": 80 + minute}
+        for minute in (20, 10, 0)
+    ]
+    shared = VitalsTrendTracker()
+    monkeypatch.setattr(task, "vitals_trends", shared)
+    monkeypatch.setattr(task, "recent_vitals", StubBuffer(recent))
+    monkeypatch.setitem(
+        sys.modules, "backend.services.gemini_service", types.SimpleNamespace(gemini_service=StubGemini())
+    )
+
+    for _ in range(2):
+        result = asyncio.run(task.predict_deterioration("outlook?", {"patient_id": "P001"}, "model"))
+        assert result["trends_analyzed"]["heart_rate"]["count"] == 3
+        assert result["trends_analyzed"]["heart_rate"]["trend"] == "increasing"
+        assert result["vitals_data_points"] == 3
+
+    assert shared.get_trends("P001") == {}
@@ -0,0 +1,75 @@
+"""Tests for the recent vitals buffer staying fresh over the CSV store."""
+from backend.core.database import CSVDatabase, CSVVitalsStore
+from backend.core.vitals_buffer import RecentVitalsBuffer
+
+
+class CountingStore(CSVVitalsStore):
+    """CSV store that counts full reads."""
+
+    reads = 0
+
+    def read_all(self):
+        self.reads += 1
+        return super().read_all()
+
+
+def reading(patient_id, minute, heart_rate=80):
+    return {"patient_id": patient_id, "timestamp": f"2024-01-01T08:{minute:02d}:00", "heart_rate": heart_rate}
+
+
+def write(buffer, store, vitals_data):
+    """What PatientService.add_vital_signs does in this process."""
+    version_before = store.version(vitals_data["patient_id"])
+    assert store.append(vitals_data)
+    buffer.record(vitals_data, store, version_before)
+
+
+def make(tmp_path):
+    store = CountingStore(CSVDatabase(str(tmp_path)))
+    buffer = RecentVitalsBuffer(capacity=16)
+    buffer.warm(store)
+    store.reads = 0
+    return store, buffer
+
+
+def test_interleaved_patients_are_served_from_memory(tmp_path):
+    store, buffer = make(tmp_path)
+    for minute in range(6):
+        write(buffer, store, reading(f"P{minute % 3}", minute, 70 + minute))
+        for patient_id in ("P0", "P1", "P2"):
+            buffer.get_fresh(patient_id, 10, store)
+
+    assert store.reads == 0
+    assert buffer.get_stats()["misses"] == 0
+    assert [row["heart_rate"] for row in buffer.get_fresh("P1", 10, store)] == [74, 71]
+
+
+def test_another_process_writing_only_reloads_that_patient(tmp_path):
+    store, buffer = make(tmp_path)
+    write(buffer, store, reading("P0", 0))
+    write(buffer, store, reading("P1", 1))
+
+    other_process = CSVVitalsStore(CSVDatabase(str(tmp_path)))
+    other_process.append(reading("P1", 2, heart_rate=99))
+
+    assert [row["heart_rate"] for row in buffer.get_fresh("P0", 10, store)] == [80]
+    assert store.reads == 0
+    assert [row["heart_rate"] for row in buffer.get_fresh("P1", 10, store)] == [99, 80]
+    assert store.reads == 1
+    # Reloaded: fresh again
+    buffer.get_fresh("P1", 10, store)
+    assert store.reads == 1
+
+
+def test_rewritten_file_invalidates_every_patient(tmp_path):
+    store, buffer = make(tmp_path)
+    write(buffer, store, reading("P0", 0))
+    write(buffer, store, reading("P1", 1))
+
+    history = store.read_all()
+    store.database.write_csv(store.file_path, history[history["patient_id"] == "P1"])
+    store.reads = 0
+
+    assert buffer.get_fresh("P0", 10, store) == []
+    assert [row["patient_id"] for row in buffer.get_fresh("P1", 10, store)] == ["P1"]
+    assert store.reads == 1
@@ -0,0 +1,81 @@
+"""Tests for vitals timestamp validation on the ingest paths."""
+from backend.schemas.patient_schema import VitalsCreate
+from backend.api.routes.patients import _validate_vitals_batch
+from backend.core.vitals_buffer import RecentVitalsBuffer
+from backend.streaming.processor import VitalsProcessor
+from pydantic import ValidationError
+import asyncio
+import pytest
+
+
+def row(timestamp=None, patient_id="P001"):
+    return {
+        "patient_id": patient_id,
+        "heart_rate": 80,
+        "bp_systolic": 120,
+        "bp_diastolic": 80,
+        "o2_saturation": 98,
+        "temperature": 37.0,
+        "timestamp": timestamp,
+    }
+
+
+def test_timestamp_must_be_iso_8601():
+    with pytest.raises(ValidationError):
+        VitalsCreate(**row("yesterday"))
+    assert VitalsCreate(**row()).timestamp is None
+
+
+def test_timestamp_is_normalized_to_naive_utc():
+    assert VitalsCreate(**row("2024-01-01T10:00:00+02:00")).timestamp == "2024-01-01T08:00:00"
+    assert VitalsCreate(**row("2024-01-01T08:00:00Z")).timestamp == "2024-01-01T08:00:00"
+
+
+def test_batch_rejects_only_the_bad_rows():
+    valid, errors = _validate_vitals_batch([
+        row("2024-01-01T08:00:00"), row("yesterday", "P002"), row(None, "P003")
+    ])
+    assert [vitals["patient_id"] for vitals in valid] == ["P001", "P003"]
+    assert [(error.row, error.field) for error in errors] == [(1, "timestamp")]
+
+
+class RecordingPatientService:
+    def __init__(self):
+        self.stored = []
+
+    def add_vital_signs_batch(self, vitals_list):
+        self.stored.extend(vitals_list)
+        return len(vitals_list)
+
+
+def test_processor_fails_rows_with_bad_timestamps():
+    processor = VitalsProcessor()
+    processor.alert_state = None
+    processor.patient_service = RecordingPatientService()
+    records = [row("2024-01-01T08:00:00Z"), row("yesterday", "P002")]
+
+    timings = asyncio.run(processor.process_batch(records))
+
+    assert list(timings["failed_rows"]) == [1]
+    assert isinstance(timings["failed_rows"][1], ValueError)
+    assert [vitals["timestamp"] for vitals in processor.patient_service.stored] == ["2024-01-01T08:00:00"]
+
+
+class StubStore:
+    def __init__(self, recent):
+        self.recent = recent
+
+    def iter_recent(self, limit):
+        yield "P001", self.recent
+
+    def version(self, patient_id):
+        return 1
+
+
+def test_buffer_skips_unreadable_stored_timestamps():
+    buffer = RecentVitalsBuffer(capacity=8)
+    # Most recent first, as stores return them
+    buffer.warm(StubStore([row("2024-01-01T09:00:00"), row("yesterday"), row("2024-01-01T08:00:00")]))
+    assert [vitals["timestamp"] for vitals in buffer.get_recent("P001", 8)] == [
+        "2024-01-01T09:00:00", "2024-01-01T08:00:00"
+    ]
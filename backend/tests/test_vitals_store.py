@@ -0,0 +1,136 @@
+"""Tests for the columnar vitals store."""
+from backend.core.vitals_store import ColumnarVitalsStore, LOG_FILE, RECORD_DTYPE
+import numpy as np
+import threading
+import shutil
+
+
+def reading(timestamp, heart_rate=80, patient_id="P001"):
+    return {"patient_id": patient_id, "timestamp": timestamp, "heart_rate": heart_rate}
+
+
+def segments(store, patient_id="P001"):
+    return store._segment_dirs(store._patient_dir(patient_id))
+
+
+def heart_rates(rows):
+    return [row["heart_rate"] for row in rows]
+
+
+def test_segments_starting_at_the_same_time_do_not_collide(tmp_path):
+    store = ColumnarVitalsStore(str(tmp_path), segment_rows=2)
+    # A burst with one timestamp fills several segments
+    store.append_many([reading("2024-01-01T08:00:00", heart_rate=60 + i) for i in range(5)])
+    store.seal_all()
+
+    names = [segment.name for segment in segments(store)]
+    assert len(names) == 3 == len(set(names))
+    assert sorted(heart_rates(store.get_recent("P001", 10))) == [60, 61, 62, 63, 64]
+
+
+def test_recent_readings_are_ordered_by_time_not_arrival(tmp_path):
+    store = ColumnarVitalsStore(str(tmp_path), segment_rows=2)
+    store.append_many([reading("2024-01-02T08:00:00", 70), reading("2024-01-02T09:00:00", 71)])
+    store.append_many([reading("2024-01-02T10:00:00", 72)])
+    # Late readings for an earlier day and an earlier hour of the same day
+    store.append_many([reading("2024-01-01T23:00:00", 69), reading("2024-01-02T09:30:00", 99)])
+
+    assert heart_rates(store.get_recent("P001", 3)) == [72, 99, 71]
+    assert heart_rates(store.get_recent("P001", 10)) == [72, 99, 71, 70, 69]
+    assert list(store.get_history("P001")["heart_rate"]) == [69, 70, 71, 99, 72]
+
+
+def test_older_days_are_skipped_once_the_limit_is_reached(tmp_path, monkeypatch):
+    store = ColumnarVitalsStore(str(tmp_path), segment_rows=100)
+    store.append_many([reading(f"2024-01-0{day}T08:00:00", 60 + day) for day in range(1, 5)])
+    store.append_many([reading("2024-01-04T09:00:00", 80)])
+
+    loaded = []
+    load_segment = store._load_segment
+
+    def counting_load(segment):
+        loaded.append(segment.parent.name)
+        return load_segment(segment)
+
+    monkeypatch.setattr(store, "_load_segment", counting_load)
+
+    assert heart_rates(store.get_recent("P001", 2)) == [80, 64]
+    assert loaded == []
+    assert heart_rates(store.get_recent("P001", 3)) == [80, 64, 63]
+    assert loaded == ["20240103"]
+
+
+def test_sealed_log_left_behind_by_a_crash_is_not_read_twice(tmp_path):
+    store = ColumnarVitalsStore(str(tmp_path), segment_rows=100)
+    store.append_many([reading(f"2024-01-01T08:0{i}:00", 60 + i) for i in range(3)])
+    log_path = store._patient_dir("P001") / LOG_FILE
+    saved = tmp_path / "saved.log"
+    shutil.copy(log_path, saved)
+    store.seal_all()
+    # Crash between writing the segment and removing the log
+    shutil.copy(saved, log_path)
+    saved.unlink()
+
+    reopened = ColumnarVitalsStore(str(tmp_path), segment_rows=100)
+    assert heart_rates(reopened.get_recent("P001", 10)) == [62, 61, 60]
+    assert not log_path.exists()
+
+
+def test_torn_trailing_record_is_dropped(tmp_path):
+    store = ColumnarVitalsStore(str(tmp_path), segment_rows=100)
+    store.append_many([reading("2024-01-01T08:00:00", 60), reading("2024-01-01T08:01:00", 61)])
+    log_path = store._patient_dir("P001") / LOG_FILE
+    with open(log_path, "ab") as f:
+        f.write(b"\x00" * (RECORD_DTYPE.itemsize // 2))
+
+    reopened = ColumnarVitalsStore(str(tmp_path), segment_rows=100)
+    reopened.append(reading("2024-01-01T08:02:00", 62))
+    assert heart_rates(reopened.get_recent("P001", 10)) == [62, 61, 60]
+
+
+def test_version_changes_on_append_and_seal(tmp_path):
+    store = ColumnarVitalsStore(str(tmp_path), segment_rows=100)
+    assert store.version("P001") is None
+
+    store.append(reading("2024-01-01T08:00:00"))
+    appended = store.version("P001")
+    assert appended is not None
+
+    store.seal_all()
+    sealed = store.version("P001")
+    assert sealed not in (None, appended)
+
+
+def test_two_writers_on_one_patient_lose_and_repeat_nothing(tmp_path):
+    # Two store instances stand in for two consumer processes
+    writers = [ColumnarVitalsStore(str(tmp_path), segment_rows=3) for _ in range(2)]
+
+    def write(store, offset):
+        for i in range(40):
+            store.append(reading(f"2024-01-01T08:{i:02d}:{offset:02d}", heart_rate=offset * 100 + i))
+
+    threads = [threading.Thread(target=write, args=(store, n)) for n, store in enumerate(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writers[0].seal_all()
+
+    reader = ColumnarVitalsStore(str(tmp_path), segment_rows=3)
+    assert sorted(heart_rates(reader.get_recent("P001", 100))) == list(range(40)) + list(range(100, 140))
+    sealed = segments(reader)
+    assert len({segment.name for segment in sealed}) == len(sealed)
+    assert all(len(np.load(segment / "timestamp.npy")) <= 3 for segment in sealed)
+
+
+def test_readings_with_unstored_fields_are_rejected(tmp_path):
+    store = ColumnarVitalsStore(str(tmp_path), segment_rows=100)
+    written = store.append_many([
+        reading("2024-01-01T08:00:00", 60),
+        dict(reading("2024-01-01T08:01:00", 61), pain_score=4),
+        dict(reading("2024-01-01T08:02:00", 62), pain_score=None),
+    ])
+
+    assert written == 2
+    assert heart_rates(store.get_recent("P001", 10)) == [62, 60]
+    assert not store.append(dict(reading("2024-01-01T08:03:00"), device="bedside-3"))
@@ -0,0 +1,60 @@
+"""Tests for the write-behind CSV append buffer."""
+from backend.core.database import CSVDatabase, CSVVitalsStore
+from backend.core.write_behind import WriteBehindBuffer
+import asyncio
+import time
+
+
+def reading(patient_id, minute):
+    return {"patient_id": patient_id, "timestamp": f"2024-01-01T08:{minute:02d}:00", "heart_rate": 60 + minute}
+
+
+def test_concurrent_durable_vitals_appends_share_flushes(tmp_path):
+    database = CSVDatabase(str(tmp_path))
+    store = CSVVitalsStore(database)
+
+    async def ingest():
+        return await asyncio.gather(*(store.append_durable(reading(f"P{i % 5}", i)) for i in range(50)))
+
+    try:
+        assert all(asyncio.run(ingest()))
+        # Resolved only once on disk: visible to a reader that bypasses the queue
+        lines = (tmp_path / store.file_path).read_text().splitlines()
+        assert len(lines) == 51
+        stats = database.get_write_stats()
+        assert stats["rows_written"] == 50
+        assert stats["flushes"] < 50
+    finally:
+        database.close()
+
+
+def test_buffer_flushes_a_full_file_without_waiting_for_its_age(tmp_path):
+    buffer = WriteBehindBuffer(max_rows=3, max_age_ms=60000)
+    path = tmp_path / "vitals.csv"
+    try:
+        futures = [buffer.enqueue(path, reading("P0", minute)) for minute in range(3)]
+        assert all(future.result(timeout=5) for future in futures)
+        assert len(path.read_text().splitlines()) == 4
+
+        # One more row waits for the next trigger
+        pending = buffer.enqueue(path, reading("P0", 3))
+        time.sleep(0.1)
+        assert not pending.done()
+        assert buffer.get_stats()["queue_depth"] == 1
+    finally:
+        buffer.close()
+
+
+def test_buffer_writes_pending_rows_at_shutdown(tmp_path):
+    buffer = WriteBehindBuffer(max_rows=100, max_age_ms=60000)
+    path = tmp_path / "vitals.csv"
+    futures = [buffer.enqueue(path, reading(f"P{minute}", minute)) for minute in range(5)]
+    assert not path.exists()
+
+    buffer.close()
+
+    assert all(future.result(timeout=0) for future in futures)
+    assert [line.split(",")[0] for line in path.read_text().splitlines()] == [
+        "patient_id", "P0", "P1", "P2", "P3", "P4"
+    ]
+    assert buffer.get_stats()["flushes"] == 1
@@ -3,7 +3,7 @@ export const APP_CONFIG = {
   tagline: 'Predict the future where uncertainty is the enemy',
   version: '1.0.0',
   apiBaseUrl: import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000',
-  wsUrl: import.meta.env.VITE_WS_URL || 'ws://localhost:8000/ws',
+  wsUrl: import.meta.env.VITE_WS_URL || 'ws://localhost:8000/ws/stream',
 }
 
 export default APP_CONFIG
@@ -1,7 +1,7 @@
 import { useEffect, useRef, useState, useCallback } from 'react'
 import { WebSocketConfig, StreamMessage } from '../types/streaming.types'
 
-const WS_URL = import.meta.env.VITE_WS_URL || 'ws://localhost:8000/ws'
+const WS_URL = import.meta.env.VITE_WS_URL || 'ws://localhost:8000/ws/stream'
 
 export function useWebSocket(onMessage?: (message: StreamMessage) => void) {
   const [isConnected, setIsConnected] = useState(false)
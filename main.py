@@ -8,9 +8,16 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.core.config import settings
 from backend.core.logging_config import app_logger
-from backend.api.routes import agents, patients, chat, alerts
+from backend.api.routes import agents, patients, chat, alerts, system, stream
 from contextlib import asynccontextmanager
 from backend.services.agent_service import AgentService
+from backend.core.database import db, vitals_store
+from backend.core.vitals_buffer import recent_vitals
+from backend.core.vitals_trends import vitals_trends
+from backend.core.baselines import vitals_baselines
+from backend.core.risk_index import risk_index
+from backend.core.alert_store import alert_store
+from backend.streaming.live_bus import live_bus
 
 # Initialize agent service
 agent_service = AgentService()
@@ -24,6 +31,31 @@ async def lifespan(app: FastAPI):
     # Startup
     app_logger.info("Starting Monit Patient application...")
 
+    # Warm the in-memory recent vitals buffer from storage
+    try:
+        recent_vitals.warm(vitals_store)
+    except Exception as e:
+        app_logger.error(f"Error warming recent vitals buffer: {e}")
+
+    # Restore trend statistics from checkpoints, then catch up from the buffer
+    try:
+        vitals_trends.restore(recent_vitals, name="api")
+    except Exception as e:
+        app_logger.error(f"Error restoring vitals trends: {e}")
+    try:
+        vitals_baselines.restore(recent_vitals, name="api")
+    except Exception as e:
+        app_logger.error(f"Error restoring vitals baselines: {e}")
+
+    # Index every patient's latest score for /api/patients/top-risk
+    try:
+        risk_index.rebuild(recent_vitals)
+    except Exception as e:
+        app_logger.error(f"Error building risk index: {e}")
+
+    # Share live events with the other workers and the consumers
+    await live_bus.start()
+
     # Initialize agent system with default configuration
     try:
         config = agent_service.load_configuration()
@@ -42,6 +74,14 @@ async def lifespan(app: FastAPI):
     # Shutdown
     app_logger.info("Shutting down Monit Patient application...")
 
+    await live_bus.stop()
+    vitals_trends.checkpoint()
+    vitals_baselines.checkpoint()
+
+    # Fold pending alert status events and write any buffered CSV rows
+    alert_store.compact()
+    db.close()
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -65,6 +105,8 @@ app.include_router(agents.router)
 app.include_router(patients.router)
 app.include_router(chat.router)
 app.include_router(alerts.router)
+app.include_router(system.router)
+app.include_router(stream.router)
 
 
 @app.get("/")
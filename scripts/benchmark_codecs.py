@@ -0,0 +1,87 @@
+"""Benchmark vitals wire codecs: bytes/message and encode/decode cost vs JSON.
+
+Also checks that every codec round-trips the payloads and that the
+decoder still reads legacy JSON messages.
+
+Usage:
+    python scripts/benchmark_codecs.py [--messages 100000]
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.streaming.codecs import available_codecs, encode_vitals, decode_vitals  # noqa: E402
+
+
+def make_vitals(count, patients=500):
+    """Synthetic vitals payloads shaped like the simulator's."""
+    start = datetime(2025, 1, 1)
+    vitals_list = []
+    for i in range(count):
+        vitals = {
+            "patient_id": f"P{random.randrange(patients):05d}",
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+            "heart_rate": random.randint(50, 130),
+            "bp_systolic": random.randint(85, 180),
+            "bp_diastolic": random.randint(50, 110),
+            "o2_saturation": round(random.uniform(88, 100), 1),
+            "temperature": round(random.uniform(36, 39.5), 1),
+        }
+        if random.random() < 0.5:
+            vitals["respiratory_rate"] = random.randint(10, 28)
+        vitals_list.append(vitals)
+    return vitals_list
+
+
+def bench(codec, vitals_list):
+    """Encode and decode every payload; returns (bytes/msg, encode us, decode us, mismatches)."""
+    started = time.perf_counter()
+    encoded = [encode_vitals(vitals, codec) for vitals in vitals_list]
+    encode_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    decoded = [decode_vitals(value) for value in encoded]
+    decode_s = time.perf_counter() - started
+
+    mismatches = sum(1 for a, b in zip(vitals_list, decoded) if a != b)
+    count = len(vitals_list)
+    return (
+        sum(len(value) for value in encoded) / count,
+        encode_s / count * 1e6,
+        decode_s / count * 1e6,
+        mismatches,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vitals wire codec benchmark")
+    parser.add_argument("--messages", type=int, default=100000)
+    args = parser.parse_args()
+
+    random.seed(7)
+    vitals_list = make_vitals(args.messages)
+
+    results = {codec: bench(codec, vitals_list) for codec in available_codecs()}
+    json_bytes, json_encode, json_decode, _ = results["json"]
+
+    print(f"messages={args.messages}")
+    print(f"{'codec':<10}{'bytes/msg':>11}{'size':>8}{'encode us':>11}{'decode us':>11}{'mismatches':>12}")
+    for codec, (size, encode_us, decode_us, mismatches) in results.items():
+        print(
+            f"{codec:<10}{size:>11.1f}{size / json_bytes:>7.0%} "
+            f"{encode_us:>10.2f}{decode_us:>11.2f}{mismatches:>12}"
+        )
+
+    # Mixed topic: old JSON messages and new binary ones decode side by side
+    mixed = [encode_vitals(v, "json" if i % 2 else "struct") for i, v in enumerate(vitals_list[:1000])]
+    assert [decode_vitals(value) for value in mixed] == vitals_list[:1000]
+    print("mixed json/struct topic decodes: ok")
+
+
+if __name__ == "__main__":
+    main()
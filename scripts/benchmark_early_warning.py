@@ -0,0 +1,79 @@
+"""Benchmark early warning scoring cost for a whole ward.
+
+Compares, per 10k patients:
+- vectorized: one score_matrix() call over a (patients, channels) array
+  (what /api/patients/risk-scores does with the recent vitals buffer);
+- records: score_records() over vitals dicts (matrix build + per-row dicts);
+- per patient: one score_records([reading]) call per patient (what
+  calling calculate_risk_score N times amounts to, without storage reads).
+
+Usage:
+    python scripts/benchmark_early_warning.py [--patients 10000] [--model news2]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.core.early_warning import get_scorer, LEVEL_ORDER  # noqa: E402
+
+
+def make_readings(count):
+    """Latest reading per patient, a mix of stable and deteriorating."""
+    readings = []
+    for i in range(count):
+        unwell = random.random() < 0.2
+        readings.append({
+            "patient_id": f"P{i:05d}",
+            "heart_rate": random.randint(95, 140) if unwell else random.randint(55, 95),
+            "bp_systolic": random.randint(80, 110) if unwell else random.randint(105, 160),
+            "bp_diastolic": random.randint(50, 90),
+            "o2_saturation": round(random.uniform(86, 95) if unwell else random.uniform(94, 100), 1),
+            "temperature": round(random.uniform(37.5, 39.8) if unwell else random.uniform(36.1, 37.8), 1),
+            "respiratory_rate": random.randint(20, 30) if unwell else random.randint(12, 20),
+        })
+    return readings
+
+
+def timed(fn, repeat):
+    """Best wall time of ``repeat`` runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Early warning score benchmark")
+    parser.add_argument("--patients", type=int, default=10000)
+    parser.add_argument("--model", default="news2")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(7)
+    scorer = get_scorer(args.model)
+    readings = make_readings(args.patients)
+    matrix = scorer.matrix_from_records(readings)
+    per_10k = 10000 / args.patients
+
+    vectorized = timed(lambda: scorer.score_matrix(matrix), args.repeat)
+    records = timed(lambda: scorer.score_records(readings), args.repeat)
+    per_patient = timed(lambda: [scorer.score_records([reading]) for reading in readings], 1)
+
+    scored = scorer.score_matrix(matrix)
+    levels = {LEVEL_ORDER[code]: int((scored["level_code"] == code).sum()) for code in range(len(LEVEL_ORDER))}
+
+    print(f"model={scorer.name} patients={args.patients} channels={len(scorer.scored_channels)}")
+    print(f"vectorized matrix: {vectorized * per_10k * 1000:9.2f} ms per 10k patients")
+    print(f"from records:      {records * per_10k * 1000:9.2f} ms per 10k patients")
+    print(f"one call each:     {per_patient * per_10k * 1000:9.2f} ms per 10k patients")
+    print(f"risk levels: {levels}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""End-to-end streaming benchmark on the in-memory transport (no network).
+
+Produces synthetic vitals through StreamingService.produce_vitals_batch and
+consumes them with a group of ConsumerPipeline consumers sharing the topic's
+partitions, all over backend.streaming.memory_broker. Reports throughput and
+produce-to-handle latency, and checks that every partition was committed.
+
+Usage:
+    python scripts/benchmark_streaming.py [--messages 20000] [--consumers 3]
+                                          [--partitions 6] [--codec struct]
+                                          [--io-ms 1]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.core.config import settings  # noqa: E402
+from backend.core.vitals_store import to_epoch  # noqa: E402
+from backend.services.streaming_service import StreamingService  # noqa: E402
+from backend.streaming.codecs import decode_vitals  # noqa: E402
+from backend.streaming.memory_broker import MemoryBroker  # noqa: E402
+from backend.streaming.pipeline import ConsumerPipeline  # noqa: E402
+from backend.streaming.transport import MemoryTransport  # noqa: E402
+
+
+def make_vitals(count, patients=500):
+    """Synthetic vitals payloads (timestamps are filled in at send time)."""
+    return [{
+        "patient_id": f"P{random.randrange(patients):05d}",
+        "heart_rate": random.randint(50, 130),
+        "bp_systolic": random.randint(85, 180),
+        "bp_diastolic": random.randint(50, 110),
+        "o2_saturation": round(random.uniform(88, 100), 1),
+        "temperature": round(random.uniform(36, 39.5), 1),
+    } for _ in range(count)]
+
+
+async def run(args):
+    topic = settings.KAFKA_TOPIC_PATIENT_VITALS
+    broker = MemoryBroker(num_partitions=args.partitions)
+    broker.create_topic(topic)
+    transport = MemoryTransport(broker)
+
+    latencies_ms = []
+    done = asyncio.Event()
+
+    async def handler(record):
+        latencies_ms.append((time.time() - to_epoch(record["timestamp"])) * 1000)
+        await asyncio.sleep(args.io_ms / 1000.0)
+        if len(latencies_ms) >= args.messages:
+            done.set()
+
+    consumers, pipelines = [], []
+    for _ in range(args.consumers):
+        consumer = StreamingService(transport=transport).get_consumer(
+            [topic], auto_commit=False, config_overrides={'auto.offset.reset': 'earliest'}
+        )
+        pipeline = ConsumerPipeline(
+            consumer, handler, max_in_flight=256, commit_interval_ms=100,
+            poll_timeout=0.05, decoder=decode_vitals
+        )
+        consumers.append(consumer)
+        pipelines.append(pipeline)
+    runners = [asyncio.ensure_future(pipeline.run()) for pipeline in pipelines]
+
+    producer = StreamingService(transport=transport)
+    vitals_list = make_vitals(args.messages)
+    started = time.perf_counter()
+    for i in range(0, len(vitals_list), args.send_batch):
+        chunk = vitals_list[i:i + args.send_batch]
+        now = datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+        for vitals in chunk:
+            vitals["timestamp"] = now
+        await producer.produce_vitals_batch(chunk)
+    produced_s = time.perf_counter() - started
+
+    await asyncio.wait_for(done.wait(), timeout=max(60, args.messages / 100))
+    elapsed = time.perf_counter() - started
+
+    for pipeline in pipelines:
+        pipeline.stop()
+    await asyncio.gather(*runners)
+    for consumer in consumers:
+        consumer.close()
+    producer.get_async_producer().close()
+
+    end_offsets = broker.end_offsets(topic)
+    fully_committed = all(
+        broker.committed(settings.KAFKA_CONSUMER_GROUP, (topic, partition)) == end
+        for partition, end in enumerate(end_offsets)
+    )
+    latencies_ms.sort()
+    return {
+        "produce_rate": args.messages / produced_s,
+        "end_to_end_rate": args.messages / elapsed,
+        "p50_ms": latencies_ms[len(latencies_ms) // 2],
+        "p99_ms": latencies_ms[min(len(latencies_ms) - 1, int(0.99 * len(latencies_ms)))],
+        "per_consumer": [pipeline.processed for pipeline in pipelines],
+        "fully_committed": fully_committed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory end-to-end streaming benchmark")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--consumers", type=int, default=3)
+    parser.add_argument("--partitions", type=int, default=6)
+    parser.add_argument("--send-batch", type=int, default=500)
+    parser.add_argument("--codec", default=settings.KAFKA_VITALS_CODEC)
+    parser.add_argument("--io-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    settings.KAFKA_VITALS_CODEC = args.codec
+    random.seed(7)
+    result = asyncio.run(run(args))
+
+    print(f"messages={args.messages} consumers={args.consumers} partitions={args.partitions} "
+          f"codec={args.codec} io={args.io_ms}ms")
+    print(f"produce:     {result['produce_rate']:10.1f} msgs/sec")
+    print(f"end to end:  {result['end_to_end_rate']:10.1f} msgs/sec")
+    print(f"latency p50={result['p50_ms']:.1f}ms p99={result['p99_ms']:.1f}ms")
+    print(f"messages per consumer: {result['per_consumer']}  all partitions committed: {result['fully_committed']}")
+
+
+if __name__ == "__main__":
+    main()
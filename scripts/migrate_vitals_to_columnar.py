@@ -0,0 +1,93 @@
+"""Migrate vitals_history.csv into the columnar vitals store.
+
+Usage:
+    python scripts/migrate_vitals_to_columnar.py [--source data/vitals/vitals_history.csv]
+                                                 [--target data/vitals/columnar]
+                                                 [--segment-rows 4096]
+                                                 [--drop-extra-columns]
+
+Then set USE_CSV_DATABASE=false to serve vitals from the columnar store.
+
+The columnar store keeps patient_id, timestamp and the channels in
+VITALS_CHANNELS only. A CSV with other columns holding data is refused
+unless --drop-extra-columns is given, so nothing is lost silently.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.core.config import settings  # noqa: E402
+from backend.core.vitals_store import ColumnarVitalsStore, STORED_FIELDS  # noqa: E402
+
+
+def migrate(
+    source: str,
+    target: str,
+    segment_rows: int,
+    chunk_size: int = 100_000,
+    drop_extra_columns: bool = False
+) -> int:
+    """Stream a vitals CSV into a columnar store and return the rows migrated."""
+    store = ColumnarVitalsStore(root_path=target, segment_rows=segment_rows)
+    if store.patient_ids():
+        raise SystemExit(f"Target {target} already contains vitals; refusing to migrate twice")
+
+    # Group rows per patient across chunks so each patient's history is
+    # written in timestamp order (the append log expects ascending time).
+    pending = {}
+    total = 0
+    for chunk in pd.read_csv(source, chunksize=chunk_size):
+        if 'patient_id' not in chunk.columns:
+            raise SystemExit(f"{source} has no patient_id column")
+        extra = [column for column in chunk.columns if column not in STORED_FIELDS]
+        if extra:
+            used = [column for column in extra if chunk[column].notna().any()]
+            if used and not drop_extra_columns:
+                raise SystemExit(
+                    f"{source} has columns the columnar store does not keep: {used}; "
+                    f"re-run with --drop-extra-columns to migrate without them"
+                )
+            chunk = chunk.drop(columns=extra)
+        for patient_id, rows in chunk.groupby('patient_id', sort=False):
+            pending.setdefault(str(patient_id), []).append(rows)
+        total += len(chunk)
+
+    migrated = 0
+    for patient_id, frames in pending.items():
+        rows = pd.concat(frames, ignore_index=True)
+        rows['patient_id'] = patient_id
+        if 'timestamp' in rows.columns:
+            rows = rows.sort_values('timestamp', kind='stable')
+        migrated += store.append_many(rows.to_dict('records'))
+
+    store.seal_all()
+    if migrated != total:
+        print(f"Warning: {total - migrated} of {total} rows could not be migrated")
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default=settings.CSV_VITALS_DATA_PATH)
+    parser.add_argument("--target", default=settings.VITALS_STORE_PATH)
+    parser.add_argument("--segment-rows", type=int, default=settings.VITALS_SEGMENT_ROWS)
+    parser.add_argument("--drop-extra-columns", action="store_true",
+                        help="Migrate even if the CSV has columns the columnar store does not keep")
+    args = parser.parse_args()
+
+    if not Path(args.source).exists():
+        raise SystemExit(f"Source file not found: {args.source}")
+
+    started = time.perf_counter()
+    migrated = migrate(args.source, args.target, args.segment_rows, drop_extra_columns=args.drop_extra_columns)
+    elapsed = time.perf_counter() - started
+    print(f"✓ Migrated {migrated} vitals rows to {args.target} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Run the vitals consumer as N worker processes under a supervisor.
+
+All workers join settings.KAFKA_CONSUMER_GROUP, so Kafka splits the vitals
+topic's partitions between them. Aggregated throughput/lag metrics are
+written to settings.CONSUMER_METRICS_PATH and served by the API at
+GET /api/system/metrics.
+
+Usage:
+    python scripts/run_consumer_workers.py [--workers 4]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.core.config import settings  # noqa: E402
+from backend.streaming.supervisor import ConsumerSupervisor  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition-parallel vitals consumer supervisor")
+    parser.add_argument("--workers", type=int, default=settings.CONSUMER_WORKERS)
+    parser.add_argument("--report-interval", type=float, default=settings.CONSUMER_WORKER_REPORT_INTERVAL_S)
+    parser.add_argument("--heartbeat-timeout", type=float, default=settings.CONSUMER_WORKER_HEARTBEAT_TIMEOUT_S)
+    parser.add_argument("--metrics-path", default=settings.CONSUMER_METRICS_PATH)
+    args = parser.parse_args()
+
+    supervisor = ConsumerSupervisor(
+        num_workers=args.workers,
+        report_interval=args.report_interval,
+        heartbeat_timeout=args.heartbeat_timeout,
+        metrics_path=args.metrics_path
+    )
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    main()